@@ -1,10 +1,18 @@
-from config import PORT
+from config import PORT, ENSURE_INDEXES_ON_STARTUP
 
 import handler
 from loader import app
 from threading import Thread
-from utils.init_swagger import init_swagger
+from utils.swagger_spec import init_docs
+from utils.metrics import init_metrics
+from utils.admission import init_admission
+from utils.db_connector.indexes import ensure_indexes
 
 if __name__ == '__main__':
-    swag = init_swagger(app)
+    # Слушатель команд монги регистрируется до первого подключения в ensure_indexes
+    init_metrics(app)
+    init_admission(app)
+    if ENSURE_INDEXES_ON_STARTUP:
+        ensure_indexes()
+    init_docs(app)
     app.run(host="0.0.0.0", port=PORT)
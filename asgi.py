@@ -0,0 +1,11 @@
+from starlette.applications import Starlette
+from starlette.routing import Route
+
+from handler.articles.async_handler import AsyncArticleMethod, AsyncArticleAllMethod, AsyncArticleCreateMethod
+
+# Асинхронный режим: uvicorn asgi:app --host 0.0.0.0 --port 5000
+app = Starlette(routes=[
+    Route('/article/getAll', AsyncArticleAllMethod),
+    Route('/article/create', AsyncArticleCreateMethod),
+    Route('/article/{article_id}', AsyncArticleMethod),
+])
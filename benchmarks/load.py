@@ -0,0 +1,133 @@
+import json
+import random
+import threading
+import time
+import urllib.error
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+
+
+def percentile(values: list[float], percent: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, round(percent / 100 * len(ordered)) - 1))
+    return ordered[index]
+
+
+class IdPool:
+    """_id статей для сценариев. Удаление забирает _id из пула, чтобы не удалять одну статью дважды"""
+
+    def __init__(self, ids: list):
+        self._ids = [str(object_id) for object_id in ids]
+        self._lock = threading.Lock()
+
+    def any(self) -> str:
+        return random.choice(self._ids)
+
+    def take(self) -> str:
+        with self._lock:
+            return self._ids.pop()
+
+
+# Сценарий на каждый маршрут из handler/articles/handler.py: правило -> (метод, путь, тело)
+SCENARIOS = {
+    ('GET', '/article/<string:article_id>'): lambda ids: ('GET', f'/article/{ids.any()}', None),
+    ('PUT', '/article/<string:article_id>'): lambda ids: ('PUT', f'/article/{ids.any()}', {'title': 'bench', 'text': 'bench text'}),
+    ('DELETE', '/article/<string:article_id>'): lambda ids: ('DELETE', f'/article/{ids.take()}', None),
+    ('GET', '/article'): lambda ids: ('GET', '/article?limit=100', None),
+    ('GET', '/article/getAll'): lambda ids: ('GET', '/article/getAll', None),
+    ('GET', '/article/getAll?format=csv.gz'): lambda ids: ('GET', '/article/getAll?format=csv.gz', None),
+    ('GET', '/article/getAll?format=ndjson'): lambda ids: ('GET', '/article/getAll?format=ndjson', None),
+    ('GET', '/article/getAll?format=parquet'): lambda ids: ('GET', '/article/getAll?format=parquet', None),
+    ('GET', '/article/getAll?format=arrow'): lambda ids: ('GET', '/article/getAll?format=arrow', None),
+    ('POST', '/article/create'): lambda ids: ('POST', '/article/create', {'title': 'bench', 'text': 'bench text'}),
+    ('POST', '/article/bulk'): lambda ids: ('POST', '/article/bulk', {'create': [{'title': 'bench', 'text': 'bench text'}] * 100}),
+    ('GET', '/article/cache/stats'): lambda ids: ('GET', '/article/cache/stats', None),
+    ('POST', '/article/export'): lambda ids: ('POST', '/article/export', None),
+}
+
+
+def registered_routes(app) -> set[tuple[str, str]]:
+    routes = set()
+    for rule in app.url_map.iter_rules():
+        if not rule.rule.startswith('/article'):
+            continue
+        for method in rule.methods - {'HEAD', 'OPTIONS'}:
+            routes.add((method, rule.rule))
+    return routes
+
+
+class InProcessTransport:
+    """Запросы через app.test_client в том же процессе, клиент свой на каждый поток"""
+
+    def __init__(self, app):
+        self.app = app
+        self._local = threading.local()
+
+    def request(self, method: str, path: str, body: dict | None) -> int:
+        client = getattr(self._local, 'client', None)
+        if client is None:
+            client = self._local.client = self.app.test_client()
+        response = client.open(path, method=method, json=body)
+        response.get_data()
+        return response.status_code
+
+
+class HttpTransport:
+    """Запросы к уже запущенному серверу, например gunicorn из docker-compose"""
+
+    def __init__(self, base_url: str):
+        self.base_url = base_url.rstrip('/')
+
+    def request(self, method: str, path: str, body: dict | None) -> int:
+        data = json.dumps(body).encode() if body is not None else None
+        request = urllib.request.Request(self.base_url + path, data=data, method=method, headers={'Content-Type': 'application/json'})
+        try:
+            with urllib.request.urlopen(request) as response:
+                while response.read(65536):
+                    pass
+                return response.status
+        except urllib.error.HTTPError as e:
+            return e.code
+
+
+def run_route(transport, scenario, ids: IdPool, requests: int, concurrency: int) -> dict:
+    """
+    Гоняет один маршрут requests раз в concurrency потоков
+
+    :return: Количество запросов, ошибок, p50/p95/p99 в миллисекундах и запросов в секунду
+    """
+    latencies = []
+    errors = 0
+    lock = threading.Lock()
+
+    def worker(count: int):
+        nonlocal errors
+        for _ in range(count):
+            method, path, body = scenario(ids)
+            started = time.perf_counter()
+            try:
+                status = transport.request(method, path, body)
+            except Exception:
+                status = 599
+            elapsed = (time.perf_counter() - started) * 1000
+            with lock:
+                latencies.append(elapsed)
+                if status >= 400:
+                    errors += 1
+
+    per_worker = [requests // concurrency + (1 if index < requests % concurrency else 0) for index in range(concurrency)]
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        list(executor.map(worker, per_worker))
+    duration = time.perf_counter() - started
+
+    return {
+        'requests': len(latencies),
+        'errors': errors,
+        'p50_ms': percentile(latencies, 50),
+        'p95_ms': percentile(latencies, 95),
+        'p99_ms': percentile(latencies, 99),
+        'throughput_rps': len(latencies) / duration if duration else 0.0,
+    }
@@ -0,0 +1,45 @@
+import timeit
+
+from bson import ObjectId
+
+from utils.db_connector import Article
+from utils.exporter import stream_csv, EXPORT_FORMATS
+from utils.validator import DataValidator
+from utils import fast_json
+
+
+def _best_per_call(statement, number: int, repeat: int = 5) -> float:
+    """Лучшее время одного вызова в микросекундах из repeat прогонов"""
+    return min(timeit.repeat(statement, number=number, repeat=repeat)) / number * 1_000_000
+
+
+def run_micro(text_size: int = 2000, number: int = 2000) -> dict:
+    document = {
+        '_id': ObjectId(),
+        'title': 'benchmark title',
+        'text': 'x' * text_size,
+        'system': {'status': 'valid'},
+    }
+    article = Article(**document)
+    short = article.get_short_model().model_dump()
+    rows = [Article.short_document(document)] * 1000
+    json_rows = [Article.short_json(document)] * 1000
+    fieldnames = list(Article.short_fields)
+
+    results = {
+        'article_init_us': _best_per_call(lambda: Article(**document), number),
+        'to_dict_us': _best_per_call(lambda: article.to_dict(), number),
+        'from_dict_us': _best_per_call(lambda: Article.from_dict(dict(document)), number),
+        'object_ids_to_string_us': _best_per_call(lambda: DataValidator.object_ids_to_string(dict(short)), number),
+        'short_json_dumps_us': _best_per_call(lambda: fast_json.dumps({'success': True, 'data': Article.short_json(document)}), number),
+        'csv_1000_rows_us': _best_per_call(lambda: ''.join(stream_csv(rows, fieldnames)), max(1, number // 100)),
+    }
+    for export_format in EXPORT_FORMATS.values():
+        if not export_format.available:
+            continue
+        source = json_rows if export_format.drop_none else rows
+        stream = export_format.stream
+        results[f'export_{export_format.name}_1000_rows_us'] = _best_per_call(lambda: list(stream(iter(source), fieldnames=fieldnames)), max(1, number // 100))
+        size = sum(len(chunk) for chunk in stream(iter(source), fieldnames=fieldnames))
+        results[f'export_{export_format.name}_1000_rows_kb'] = size / 1024
+    return results
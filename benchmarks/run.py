@@ -0,0 +1,149 @@
+import argparse
+import datetime
+import json
+import os
+import platform
+import resource
+import subprocess
+import sys
+
+from .load import SCENARIOS, IdPool, InProcessTransport, HttpTransport, registered_routes, run_route
+from .micro import run_micro
+
+# Выгрузка всей коллекции на порядок дороже остальных маршрутов, ее гоняем меньше раз
+HEAVY_ROUTES = {('GET', '/article/getAll'), ('POST', '/article/export')}
+# Маршруты, которые удаляют или массово создают статьи, идут последними
+ROUTE_ORDER = ['GET', 'PUT', 'POST', 'DELETE']
+
+
+def peak_rss_mb() -> float:
+    usage = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux отдает килобайты, macOS байты
+    return usage / 1024 / 1024 if sys.platform == 'darwin' else usage / 1024
+
+
+def git_commit() -> str | None:
+    try:
+        return subprocess.check_output(['git', 'rev-parse', 'HEAD'], stderr=subprocess.DEVNULL).decode().strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def use_stand_in():
+    """Переключает модели и брокеры на хранилище в памяти, чтобы гонять бенчмарк без живой монги"""
+    from utils.db_connector import client
+
+    client.STORAGE_BACKEND = 'memory'
+
+
+def run(args) -> dict:
+    if args.stand_in:
+        use_stand_in()
+
+    from .seed import seed_articles
+
+    ids = IdPool(seed_articles(args.articles, text_size=args.text_size, clear=not args.keep_existing))
+
+    if args.url:
+        transport = HttpTransport(args.url)
+        routes = list(SCENARIOS)
+    else:
+        import handler
+        from loader import app
+
+        transport = InProcessTransport(app)
+        routes = sorted(registered_routes(app), key=lambda route: (ROUTE_ORDER.index(route[0]) if route[0] in ROUTE_ORDER else len(ROUTE_ORDER), route[1]))
+        missing = [route for route in routes if route not in SCENARIOS]
+        if missing:
+            print(f'Нет сценария для маршрутов: {missing}', file=sys.stderr)
+            routes = [route for route in routes if route in SCENARIOS]
+        # Варианты маршрута с параметрами, например форматы выгрузки, идут сразу после него
+        variants = [route for route in SCENARIOS if '?' in route[1]]
+        routes = [variant for route in routes for variant in [route] + [v for v in variants if (v[0], v[1].split('?')[0]) == route]]
+
+    if args.routes:
+        routes = [route for route in routes if route[1].split('?')[0] in args.routes]
+
+    results = {}
+    for route in routes:
+        requests = args.export_requests if (route[0], route[1].split('?')[0]) in HEAVY_ROUTES else args.requests
+        if route[0] == 'DELETE':
+            requests = min(requests, args.articles // 2)
+        result = run_route(transport, SCENARIOS[route], ids, requests, args.concurrency)
+        result['peak_rss_mb'] = peak_rss_mb()
+        results[f'{route[0]} {route[1]}'] = result
+        print(f"{route[0]:6} {route[1]:32} p50={result['p50_ms']:.2f}ms p95={result['p95_ms']:.2f}ms "
+              f"p99={result['p99_ms']:.2f}ms {result['throughput_rps']:.1f} rps errors={result['errors']} rss={result['peak_rss_mb']:.1f}MB")
+
+    micro = run_micro(text_size=args.text_size)
+    for name, value in micro.items():
+        print(f'{name:28} {value:.2f}')
+
+    return {
+        'meta': {
+            'timestamp': datetime.datetime.utcnow().isoformat(),
+            'commit': git_commit(),
+            'python': platform.python_version(),
+            'articles': args.articles,
+            'text_size': args.text_size,
+            'requests': args.requests,
+            'export_requests': args.export_requests,
+            'concurrency': args.concurrency,
+            'transport': args.url or 'in-process',
+            'stand_in': args.stand_in,
+            'keep_existing': args.keep_existing,
+        },
+        'routes': results,
+        'micro': micro,
+        'peak_rss_mb': peak_rss_mb(),
+    }
+
+
+def compare(old_path: str, new_path: str):
+    """Печатает изменение метрик нового прогона относительно старого в процентах"""
+    with open(old_path) as file:
+        old = json.load(file)
+    with open(new_path) as file:
+        new = json.load(file)
+
+    def delta(before: float, after: float) -> str:
+        if not before:
+            return 'n/a'
+        return f'{(after - before) / before * 100:+.1f}%'
+
+    for route, result in new['routes'].items():
+        before = old['routes'].get(route)
+        if before is None:
+            continue
+        print(f"{route:40} p50 {delta(before['p50_ms'], result['p50_ms']):>8} p95 {delta(before['p95_ms'], result['p95_ms']):>8} "
+              f"p99 {delta(before['p99_ms'], result['p99_ms']):>8} rps {delta(before['throughput_rps'], result['throughput_rps']):>8}")
+    for name, value in new['micro'].items():
+        if name in old['micro']:
+            print(f'{name:40} {delta(old["micro"][name], value):>8}')
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Нагрузочный и микро бенчмарк API статей')
+    parser.add_argument('--articles', type=int, default=10000, help='Сколько статей создать перед прогоном')
+    parser.add_argument('--text-size', type=int, default=2000, help='Длина text статьи')
+    parser.add_argument('--requests', type=int, default=1000, help='Запросов на маршрут')
+    parser.add_argument('--export-requests', type=int, default=10, help='Запросов на выгрузку всей коллекции')
+    parser.add_argument('--concurrency', type=int, default=16, help='Параллельных клиентов')
+    parser.add_argument('--routes', nargs='*', help='Только эти маршруты, например /article/getAll')
+    parser.add_argument('--url', help='Гонять запущенный сервер вместо приложения в процессе')
+    parser.add_argument('--stand-in', action='store_true', help='Хранилище в памяти вместо монги из DB_URI')
+    parser.add_argument('--keep-existing', action='store_true', help='Не очищать коллекцию, а дописать статьи к имеющимся. Обязателен без --stand-in')
+    parser.add_argument('--output', default='benchmarks/results', help='Каталог для json с результатами')
+    parser.add_argument('--compare', nargs=2, metavar=('OLD', 'NEW'), help='Сравнить два json с результатами')
+    args = parser.parse_args()
+
+    if args.compare:
+        compare(*args.compare)
+        sys.exit(0)
+
+    report = run(args)
+    os.makedirs(args.output, exist_ok=True)
+    path = os.path.join(args.output, f"{datetime.datetime.utcnow():%Y%m%d-%H%M%S}.json")
+    with open(path, 'w') as file:
+        json.dump(report, file, indent=2)
+    print(f'Результаты: {path}')
@@ -0,0 +1,57 @@
+import datetime
+import random
+import string
+
+from bson import ObjectId
+
+from utils.db_connector import Article, StatusEnum
+from utils.db_connector.base_model import MongoDBModel
+from utils.db_connector.storage import MemoryDatabase
+
+
+def random_text(size: int) -> str:
+    words = []
+    length = 0
+    while length < size:
+        word = ''.join(random.choices(string.ascii_lowercase, k=random.randint(3, 10)))
+        words.append(word)
+        length += len(word) + 1
+    return ' '.join(words)[:size]
+
+
+def seed_articles(count: int, text_size: int = 2000, batch_size: int = 1000, invalid_ratio: float = 0.1, clear: bool = True) -> list[ObjectId]:
+    """
+    Очищает коллекцию статей и наполняет ее случайными статьями пачками через insert_many
+
+    :param count: Сколько статей создать
+    :param text_size: Длина text в символах
+    :param invalid_ratio: Доля статей со статусом blocked, чтобы фильтр по статусу что-то отсекал
+    :param clear: Очистить коллекцию перед наполнением. Разрешено только на хранилище в памяти (--stand-in),
+        живую базу бенчмарк не очищает
+    :return: _id созданных статей со статусом valid
+    """
+    database = MongoDBModel._db
+    collection = database[Article.collection_name]
+    if clear:
+        if not isinstance(database, MemoryDatabase):
+            raise RuntimeError('Refusing to clear the articles collection outside the in-memory stand-in, use --stand-in or --keep-existing')
+        collection.delete_many({})
+    valid_ids = []
+    batch = []
+    for index in range(count):
+        status = StatusEnum.BLOCKED if random.random() < invalid_ratio else StatusEnum.VALID
+        document = {
+            '_id': ObjectId(),
+            'title': random_text(60),
+            'text': random_text(text_size),
+            'system': {'status': status.value, 'update_document': datetime.datetime.utcnow()},
+        }
+        if status == StatusEnum.VALID:
+            valid_ids.append(document['_id'])
+        batch.append(document)
+        if len(batch) >= batch_size:
+            collection.insert_many(batch, ordered=False)
+            batch = []
+    if batch:
+        collection.insert_many(batch, ordered=False)
+    return valid_ids
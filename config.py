@@ -2,4 +2,71 @@ import os
 
 PORT = os.getenv('PORT', 5000)
 MONGO_DB_URI = os.getenv('DB_URI')
-MONGO_DB_NAME = os.getenv('DB_NAME', 'test-data')
\ No newline at end of file
+MONGO_DB_NAME = os.getenv('DB_NAME', 'test-data')
+EXPORT_BATCH_SIZE = int(os.getenv('EXPORT_BATCH_SIZE', 1000))
+PAGE_DEFAULT_LIMIT = int(os.getenv('PAGE_DEFAULT_LIMIT', 100))
+PAGE_MAX_LIMIT = int(os.getenv('PAGE_MAX_LIMIT', 1000))
+DOCUMENT_CACHE_SIZE = int(os.getenv('DOCUMENT_CACHE_SIZE', 1024))
+DOCUMENT_CACHE_TTL = float(os.getenv('DOCUMENT_CACHE_TTL', 30))
+BULK_MAX_ITEMS = int(os.getenv('BULK_MAX_ITEMS', 10000))
+IDEMPOTENCY_TTL = int(os.getenv('IDEMPOTENCY_TTL', 24 * 60 * 60))
+IDEMPOTENCY_LOCK_TIMEOUT = float(os.getenv('IDEMPOTENCY_LOCK_TIMEOUT', 30))
+IDEMPOTENCY_WAIT_TIMEOUT = float(os.getenv('IDEMPOTENCY_WAIT_TIMEOUT', 5))
+ENSURE_INDEXES_ON_STARTUP = os.getenv('ENSURE_INDEXES_ON_STARTUP', 'true').lower() == 'true'
+MONGO_MAX_POOL_SIZE = int(os.getenv('MONGO_MAX_POOL_SIZE', 100))
+MONGO_MIN_POOL_SIZE = int(os.getenv('MONGO_MIN_POOL_SIZE', 0))
+MONGO_MAX_IDLE_TIME_MS = os.getenv('MONGO_MAX_IDLE_TIME_MS')
+MONGO_WAIT_QUEUE_TIMEOUT_MS = os.getenv('MONGO_WAIT_QUEUE_TIMEOUT_MS')
+MONGO_CONNECT_TIMEOUT_MS = int(os.getenv('MONGO_CONNECT_TIMEOUT_MS', 20000))
+MONGO_SERVER_SELECTION_TIMEOUT_MS = int(os.getenv('MONGO_SERVER_SELECTION_TIMEOUT_MS', 30000))
+MONGO_SOCKET_TIMEOUT_MS = os.getenv('MONGO_SOCKET_TIMEOUT_MS')
+MONGO_COMPRESSORS = os.getenv('MONGO_COMPRESSORS', '')
+MONGO_READ_PREFERENCE = os.getenv('MONGO_READ_PREFERENCE', 'primary')
+MONGO_WRITE_CONCERN = os.getenv('MONGO_WRITE_CONCERN')
+WEB_WORKERS = int(os.getenv('WEB_WORKERS', (os.cpu_count() or 1) * 2 + 1))
+WEB_THREADS = int(os.getenv('WEB_THREADS', 4))
+WEB_TIMEOUT = int(os.getenv('WEB_TIMEOUT', 120))
+WEB_GRACEFUL_TIMEOUT = int(os.getenv('WEB_GRACEFUL_TIMEOUT', 300))
+WEB_MAX_REQUESTS = int(os.getenv('WEB_MAX_REQUESTS', 0))
+STORAGE_BACKEND = os.getenv('STORAGE_BACKEND', 'mongo')
+SQLITE_PATH = os.getenv('SQLITE_PATH', 'data/storage.sqlite3')
+METRICS_ENABLED = os.getenv('METRICS_ENABLED', 'true').lower() == 'true'
+METRICS_SPANS = os.getenv('METRICS_SPANS', 'false').lower() == 'true'
+SLOW_REQUEST_THRESHOLD_MS = float(os.getenv('SLOW_REQUEST_THRESHOLD_MS', 1000))
+EXPORT_JOBS_DIR = os.getenv('EXPORT_JOBS_DIR', 'exports')
+EXPORT_JOBS_WORKERS = int(os.getenv('EXPORT_JOBS_WORKERS', 2))
+EXPORT_JOBS_TTL = int(os.getenv('EXPORT_JOBS_TTL', 24 * 60 * 60))
+EXPORT_JOBS_STALE_TIMEOUT = int(os.getenv('EXPORT_JOBS_STALE_TIMEOUT', 10 * 60))
+EXPORT_JOBS_PENDING_TIMEOUT = int(os.getenv('EXPORT_JOBS_PENDING_TIMEOUT', 60 * 60))
+CHANGES_SAFETY_LAG_MS = int(os.getenv('CHANGES_SAFETY_LAG_MS', 2000))
+EXPORT_GZIP_LEVEL = int(os.getenv('EXPORT_GZIP_LEVEL', 6))
+SWAGGER_SPEC_PATH = os.getenv('SWAGGER_SPEC_PATH', 'static/swagger.json')
+DOCS_ROUTE = os.getenv('DOCS_ROUTE', '/docs')
+MAX_REQUEST_BODY_SIZE = int(os.getenv('MAX_REQUEST_BODY_SIZE', 1024 * 1024))
+BULK_MAX_BODY_SIZE = int(os.getenv('BULK_MAX_BODY_SIZE', 32 * 1024 * 1024))
+WRITE_COALESCING = os.getenv('WRITE_COALESCING', 'false').lower() == 'true'
+WRITE_COALESCING_MAX_BATCH = int(os.getenv('WRITE_COALESCING_MAX_BATCH', 500))
+WRITE_COALESCING_WINDOW_MS = float(os.getenv('WRITE_COALESCING_WINDOW_MS', 5))
+WRITE_COALESCING_TIMEOUT_MS = float(os.getenv('WRITE_COALESCING_TIMEOUT_MS', 10000))
+ADMISSION_ENABLED = os.getenv('ADMISSION_ENABLED', 'true').lower() == 'true'
+ADMISSION_QUEUE_TIMEOUT_MS = float(os.getenv('ADMISSION_QUEUE_TIMEOUT_MS', 2000))
+ADMISSION_RETRY_AFTER = int(os.getenv('ADMISSION_RETRY_AFTER', 1))
+ADMISSION_POINT_RESERVED = int(os.getenv('ADMISSION_POINT_RESERVED', max(1, WEB_THREADS // 4)))
+ADMISSION_POINT_CONCURRENCY = int(os.getenv('ADMISSION_POINT_CONCURRENCY', WEB_THREADS))
+ADMISSION_POINT_QUEUE = int(os.getenv('ADMISSION_POINT_QUEUE', WEB_THREADS))
+ADMISSION_POINT_DEADLINE_MS = float(os.getenv('ADMISSION_POINT_DEADLINE_MS', 1000))
+ADMISSION_DEFAULT_CONCURRENCY = int(os.getenv('ADMISSION_DEFAULT_CONCURRENCY', max(1, WEB_THREADS // 2)))
+ADMISSION_DEFAULT_QUEUE = int(os.getenv('ADMISSION_DEFAULT_QUEUE', WEB_THREADS))
+ADMISSION_DEFAULT_DEADLINE_MS = float(os.getenv('ADMISSION_DEFAULT_DEADLINE_MS', 5000))
+ADMISSION_BULK_CONCURRENCY = int(os.getenv('ADMISSION_BULK_CONCURRENCY', 1))
+ADMISSION_BULK_QUEUE = int(os.getenv('ADMISSION_BULK_QUEUE', 1))
+ADMISSION_BULK_DEADLINE_MS = float(os.getenv('ADMISSION_BULK_DEADLINE_MS', 30000))
+ADMISSION_EXPORT_CONCURRENCY = int(os.getenv('ADMISSION_EXPORT_CONCURRENCY', 1))
+ADMISSION_EXPORT_QUEUE = int(os.getenv('ADMISSION_EXPORT_QUEUE', 1))
+ADMISSION_EXPORT_DEADLINE_MS = float(os.getenv('ADMISSION_EXPORT_DEADLINE_MS', 0))
+ADMISSION_SEARCH_CONCURRENCY = int(os.getenv('ADMISSION_SEARCH_CONCURRENCY', max(1, WEB_THREADS // 4)))
+ADMISSION_SEARCH_QUEUE = int(os.getenv('ADMISSION_SEARCH_QUEUE', max(1, WEB_THREADS // 4)))
+ADMISSION_SEARCH_DEADLINE_MS = float(os.getenv('ADMISSION_SEARCH_DEADLINE_MS', 5000))
+TEXT_SEARCH_LANGUAGE = os.getenv('TEXT_SEARCH_LANGUAGE', 'russian')
+SEARCH_MAX_QUERY_LENGTH = int(os.getenv('SEARCH_MAX_QUERY_LENGTH', 256))
+SEARCH_SNIPPET_LENGTH = int(os.getenv('SEARCH_SNIPPET_LENGTH', 200))
@@ -0,0 +1,23 @@
+from config import *
+
+bind = f'0.0.0.0:{PORT}'
+workers = WEB_WORKERS
+threads = WEB_THREADS
+worker_class = 'gthread'
+# Приложение, swagger и клиенты монги инициализируются в каждом воркере после fork, а не в мастере
+preload_app = False
+timeout = WEB_TIMEOUT
+# При HUP/TERM воркер перестает принимать запросы и дожидается текущих, в том числе потоковых выгрузок csv
+graceful_timeout = WEB_GRACEFUL_TIMEOUT
+max_requests = WEB_MAX_REQUESTS
+max_requests_jitter = WEB_MAX_REQUESTS // 10
+accesslog = '-'
+errorlog = '-'
+
+
+def on_starting(server):
+    # Индексы сверяются один раз в мастере, а не в каждом воркере
+    if ENSURE_INDEXES_ON_STARTUP:
+        from utils.db_connector.indexes import ensure_indexes
+
+        ensure_indexes()
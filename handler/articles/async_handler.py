@@ -0,0 +1,127 @@
+from starlette.endpoints import HTTPEndpoint
+from starlette.requests import Request
+from starlette.responses import JSONResponse, StreamingResponse
+from .models import ArticleUpdateRequest, ArticleCreateRequest, ArticleGetResponse
+from utils.validator import DataValidator
+from utils.body_validator import BodyValidator
+from utils.db_connector import Article, ArticleShortModel, MongoCollectionsEnum, FilterBuilder, StatusEnum
+from utils.db_connector.brokers.async_objects import AsyncObjectBroker
+from utils.db_connector.errors import CustomError, DocumentsNotFoundError
+from utils.exporter import astream_csv, select_export_format, EXPORT_FORMATS
+from handler.base_models import Error, Success
+from config import EXPORT_BATCH_SIZE
+from werkzeug.datastructures import MIMEAccept
+from werkzeug.http import parse_accept_header
+
+# Асинхронная выгрузка пишет только csv, остальные форматы собираются синхронными генераторами
+ASYNC_EXPORT_FORMATS = {'csv': EXPORT_FORMATS['csv']}
+
+
+def request_fields(request: Request) -> list[str] | None:
+    fields = request.query_params.get('fields')
+    if not fields:
+        return None
+    return [field.strip() for field in fields.split(',') if field.strip()] or None
+
+
+def error_response(e: CustomError) -> JSONResponse:
+    return JSONResponse(Error(error=str(e)).model_dump(exclude_none=True), status_code=e.status_code)
+
+
+async def validate_body(request: Request, model):
+    """
+    BodyValidator для starlette: размер по Content-Length до чтения, без него (chunked) чтение
+    останавливается, как только тело стало больше допустимого. Затем разбор сырых байтов
+    """
+    content_length = request.headers.get('content-length')
+    BodyValidator.check_size(int(content_length) if content_length and content_length.isdigit() else None)
+    chunks = []
+    size = 0
+    async for chunk in request.stream():
+        size += len(chunk)
+        BodyValidator.check_size(size)
+        chunks.append(chunk)
+    return BodyValidator.validate(model, b''.join(chunks))
+
+
+class AsyncArticleMethod(HTTPEndpoint):
+    async def get(self, request: Request):
+        fields = request_fields(request)
+        try:
+            article = await Article.aget(request.path_params['article_id'], fields=fields)
+        except CustomError as e:
+            return error_response(e)
+
+        data = article if fields else article.get_short_model()
+        return JSONResponse(DataValidator.object_ids_to_string(ArticleGetResponse(data=data).model_dump(exclude_none=True, by_alias=True)))
+
+    async def put(self, request: Request):
+        try:
+            request_data: ArticleUpdateRequest | Error = await validate_body(request, ArticleUpdateRequest)
+            if isinstance(request_data, Error):
+                return JSONResponse(request_data.model_dump(), status_code=400)
+            article = await Article.aget(request.path_params['article_id'])
+            await article.aupdate(request_data.title, request_data.text)
+        except CustomError as e:
+            return error_response(e)
+
+        return JSONResponse(DataValidator.object_ids_to_string(ArticleGetResponse(data=article.get_short_model()).model_dump(exclude_none=True, by_alias=True)))
+
+    async def delete(self, request: Request):
+        try:
+            article = await Article.aget(request.path_params['article_id'])
+            await article.asoft_delete()
+        except CustomError as e:
+            return error_response(e)
+
+        return JSONResponse(DataValidator.object_ids_to_string(Success().model_dump(exclude_none=True, by_alias=True)))
+
+
+class AsyncArticleAllMethod(HTTPEndpoint):
+    async def get(self, request: Request):
+        fields = request_fields(request)
+        try:
+            # format и Accept разбираются так же, как в синхронном getAll: на все, кроме csv, ответ 406
+            select_export_format(
+                request.query_params.get('format'),
+                parse_accept_header(request.headers.get('accept'), MIMEAccept),
+                ASYNC_EXPORT_FORMATS
+            )
+            article_example = Article.example()
+            filter_engine = FilterBuilder()
+            filter_engine.equal(article_example, article_example.system.status, StatusEnum.VALID)
+            documents = AsyncObjectBroker(MongoCollectionsEnum.ARTICLES).iter_documents(
+                filter_engine.build(only_filter=True),
+                projection=Article.projection(fields),
+                batch_size=EXPORT_BATCH_SIZE
+            )
+            first_document = await anext(documents, None)
+            if first_document is None:
+                raise DocumentsNotFoundError()
+
+        except CustomError as e:
+            return error_response(e)
+
+        async def rows():
+            yield Article.short_document(first_document, fields)
+            async for document in documents:
+                yield Article.short_document(document, fields)
+
+        return StreamingResponse(
+            astream_csv(rows(), fieldnames=fields or list(ArticleShortModel.model_fields.keys())),
+            media_type='text/csv',
+            headers={"Content-disposition": "attachment; filename=articles.csv"}
+        )
+
+
+class AsyncArticleCreateMethod(HTTPEndpoint):
+    async def post(self, request: Request):
+        try:
+            request_data: ArticleCreateRequest | Error = await validate_body(request, ArticleCreateRequest)
+            if isinstance(request_data, Error):
+                return JSONResponse(request_data.model_dump(), status_code=400)
+            article = await Article.acreate(request_data.title, request_data.text)
+        except CustomError as e:
+            return error_response(e)
+
+        return JSONResponse(DataValidator.object_ids_to_string(ArticleGetResponse(data=article.get_short_model()).model_dump(exclude_none=True, by_alias=True)))
@@ -1,14 +1,84 @@
 from flask_restful import Resource
 from flasgger import swag_from
-from flask import request, Response
+from flask import request, Response, send_file
+from werkzeug.http import quote_etag
 from loader import *
-from .models import ArticleUpdateRequest, ArticleGetResponse
+from .models import ArticleUpdateRequest, ArticleCreateRequest, ArticleGetResponse, ArticleBulkRequest, ArticleBulkResponse
 from utils.validator import DataValidator
-from utils.db_connector import Article, MongoCollectionsEnum, ObjectBroker, FilterBuilder, StatusEnum
-from utils.db_connector.errors import CustomError, DocumentsNotFoundError
+from utils.body_validator import BodyValidator
+from utils.db_connector import Article, ArticleShortModel, MongoCollectionsEnum, ObjectBroker, FilterBuilder, StatusEnum
+from utils.db_connector.errors import CustomError, DocumentsNotFoundError, InvalidSortField, BulkLimitError, ExportJobNotReadyError, InvalidSearchQuery
+from utils.exporter import stream_csv, EXPORT_FORMATS, ExportFormat, select_export_format
+from utils.export_jobs import export_jobs, ExportJobStatus
+from utils import fast_json
+from utils.metrics import span
+from utils.db_connector.cache import get_document_cache
+from utils.db_connector.idempotency import IdempotencyStore
 from handler.base_models import Error, Success
-import csv
-from io import StringIO
+from config import EXPORT_BATCH_SIZE, PAGE_DEFAULT_LIMIT, PAGE_MAX_LIMIT, BULK_MAX_ITEMS, BULK_MAX_BODY_SIZE, SEARCH_MAX_QUERY_LENGTH, SEARCH_SNIPPET_LENGTH
+from itertools import chain
+import hashlib
+from functools import partial
+
+FIELDS_PARAMETER = {
+    'in': 'query',
+    'name': 'fields',
+    'type': 'string',
+    'required': False,
+    'description': 'Поля статьи через запятую: id, title, text, status. По умолчанию все'
+}
+
+
+IF_MATCH_PARAMETER = {
+    'in': 'header',
+    'name': 'If-Match',
+    'type': 'string',
+    'required': False,
+    'description': 'ETag из ответа GET. Запись выполнится, только если статья с тех пор не менялась, иначе 412'
+}
+PAYLOAD_TOO_LARGE_RESPONSE = {
+    'description': 'Тело запроса больше допустимого размера',
+    'schema': {
+        "$ref": "#/definitions/Error"
+    },
+}
+PRECONDITION_FAILED_RESPONSE = {
+    'description': 'Статья изменилась после получения ETag из If-Match',
+    'schema': {
+        "$ref": "#/definitions/Error"
+    },
+}
+
+
+def json_response(data: dict, status_code: int = 200) -> Response:
+    """Ответ, собранный сразу в байты из сырых данных, минуя pydantic модели ответа"""
+    with span('serialize'):
+        body = fast_json.dumps(data)
+    return Response(body, status=status_code, mimetype='application/json')
+
+
+def if_match_tags() -> list[str] | None:
+    """
+    ETag из If-Match для условной записи, ['*'] - любая версия, None - заголовка нет.
+    If-Match сравнивается строго: заголовок только со слабыми W/ тегами не совпадает ни с одной версией
+    """
+    if 'If-Match' not in request.headers:
+        return None
+    if request.if_match.star_tag:
+        return ['*']
+    return list(request.if_match) or ['']
+
+
+def export_format() -> ExportFormat:
+    """Формат выгрузки по параметру format или Accept, только из тех, что можно отдать"""
+    return select_export_format(request.args.get('format'), request.accept_mimetypes)
+
+
+def request_fields() -> list[str] | None:
+    fields = request.args.get('fields')
+    if not fields:
+        return None
+    return [field.strip() for field in fields.split(',') if field.strip()] or None
 
 
 class ArticleMethod(Resource):
@@ -22,27 +92,48 @@ class ArticleMethod(Resource):
                 'type': 'string',
                 'required': True,
                 'description': 'object_id статьи'
+            },
+            FIELDS_PARAMETER,
+            {
+                'in': 'header',
+                'name': 'If-None-Match',
+                'type': 'string',
+                'required': False,
+                'description': 'ETag из прошлого ответа. Если статья не менялась, вернется 304 без тела'
             }
         ],
         'responses': {
             '200': {
-                'description': 'Action executed successfully',
+                'description': 'Action executed successfully, ETag в заголовке',
                 "schema": {
                     "$ref": '#/definitions/ArticleGetResponse'
                 },
             },
+            '304': {
+                'description': 'Статья не менялась с ETag из If-None-Match',
+            },
             '500': {
                 'description': 'Error',
             }
         }
     })
     def get(self, article_id):
+        fields = request_fields()
         try:
-            article = Article.get(article_id)
+            if request.if_none_match:
+                # Сверяем только версию, тело не читаем и не сериализуем
+                etag = Article.get_etag(article_id)
+                if request.if_none_match.contains_weak(etag):
+                    response = Response(status=304)
+                    response.set_etag(etag)
+                    return response
+            document = Article.get_document(article_id, fields=fields)
         except CustomError as e:
             return Error(error=str(e)).model_dump(exclude_none=True), e.status_code
 
-        return DataValidator.object_ids_to_string(ArticleGetResponse(data=article.get_short_model()).model_dump(exclude_none=True, by_alias=True)), 200
+        response = json_response({'success': True, 'data': Article.short_json(document, fields)})
+        response.set_etag(Article.etag(document))
+        return response
 
     @swag_from({
         'tags': ['Article'],
@@ -54,6 +145,15 @@ class ArticleMethod(Resource):
                 'type': 'string',
                 'required': True,
                 'description': 'object_id статьи'
+            },
+            IF_MATCH_PARAMETER,
+            {
+                'in': 'body',
+                'name': 'body',
+                'required': True,
+                'schema': {
+                    "$ref": '#/definitions/ArticleUpdateRequest'
+                },
             }
         ],
         'responses': {
@@ -69,22 +169,28 @@ class ArticleMethod(Resource):
                     "$ref": "#/definitions/Error"
                 },
             },
+            '412': PRECONDITION_FAILED_RESPONSE,
+            '413': PAYLOAD_TOO_LARGE_RESPONSE,
             '500': {
                 'description': 'Error',
             }
         }
     })
     def put(self, article_id):
-        request_data: ArticleUpdateRequest | Error = DataValidator.validate(request.get_json(), ArticleUpdateRequest)
-        if isinstance(request_data, Error):
-            return request_data.model_dump(), 400
         try:
-            article = Article.get(article_id)
-            article.update(request_data.title, request_data.text)
+            with span('validate'):
+                request_data: ArticleUpdateRequest | Error = BodyValidator.validate_request(ArticleUpdateRequest)
+            if isinstance(request_data, Error):
+                return request_data.model_dump(), 400
+            article = Article.update_by_id(article_id, request_data.title, request_data.text, if_match=if_match_tags())
         except CustomError as e:
             return Error(error=str(e)).model_dump(exclude_none=True), e.status_code
 
-        return DataValidator.object_ids_to_string(ArticleGetResponse(data=article.get_short_model()).model_dump(exclude_none=True, by_alias=True)), 200
+        return (
+            DataValidator.object_ids_to_string(ArticleGetResponse(data=article.get_short_model()).model_dump(exclude_none=True, by_alias=True)),
+            200,
+            {'ETag': quote_etag(Article.etag({'system': article.system.model_dump()}))}
+        )
 
     @swag_from({
         'tags': ['Article'],
@@ -96,7 +202,8 @@ class ArticleMethod(Resource):
                 'type': 'string',
                 'required': True,
                 'description': 'object_id статьи'
-            }
+            },
+            IF_MATCH_PARAMETER
         ],
         'responses': {
             '200': {
@@ -105,6 +212,7 @@ class ArticleMethod(Resource):
                     "$ref": '#/definitions/Success'
                 },
             },
+            '412': PRECONDITION_FAILED_RESPONSE,
             '500': {
                 'description': 'Error',
             }
@@ -112,53 +220,476 @@ class ArticleMethod(Resource):
     })
     def delete(self, article_id):
         try:
-            article = Article.get(article_id)
-            article.full_delete()
+            Article.delete_by_id(article_id, if_match=if_match_tags())
         except CustomError as e:
             return Error(error=str(e)).model_dump(exclude_none=True), e.status_code
 
         return DataValidator.object_ids_to_string(Success().model_dump(exclude_none=True, by_alias=True)), 200
 
 
+class ArticleListMethod(Resource):
+    order_fields = {
+        'id': '_id',
+        'update_document': 'system.update_document',
+    }
+
+    @swag_from({
+        'tags': ['Article'],
+        'summary': 'Получить статьи постранично',
+        'parameters': [
+            {
+                'in': 'query',
+                'name': 'limit',
+                'type': 'integer',
+                'required': False,
+                'description': f'Количество статей на странице, максимум {PAGE_MAX_LIMIT}'
+            },
+            {
+                'in': 'query',
+                'name': 'after',
+                'type': 'string',
+                'required': False,
+                'description': 'Токен продолжения из поля next прошлого ответа'
+            },
+            {
+                'in': 'query',
+                'name': 'order_by',
+                'type': 'string',
+                'enum': ['id', 'update_document'],
+                'required': False,
+                'description': 'Поле сортировки'
+            },
+            FIELDS_PARAMETER
+        ],
+        'responses': {
+            '200': {
+                'description': 'Action executed successfully',
+                "schema": {
+                    "$ref": '#/definitions/ArticleListResponse'
+                },
+            },
+            '400': {
+                'description': 'Action executed error',
+                'schema': {
+                    "$ref": "#/definitions/Error"
+                },
+            },
+            '500': {
+                'description': 'Error',
+            }
+        }
+    })
+    def get(self):
+        limit = min(max(request.args.get('limit', PAGE_DEFAULT_LIMIT, type=int), 1), PAGE_MAX_LIMIT)
+        fields = request_fields()
+        try:
+            order_by = self.order_fields.get(request.args.get('order_by', 'id'))
+            if order_by is None:
+                raise InvalidSortField
+            article_example = Article.example()
+            filter_engine = FilterBuilder()
+            filter_engine.equal(article_example, article_example.system.status, StatusEnum.VALID)
+            documents, next_token = ObjectBroker(MongoCollectionsEnum.ARTICLES).list_page_documents(
+                filter_engine.build(only_filter=True),
+                limit=limit,
+                after=request.args.get('after'),
+                order_by=order_by,
+                projection=Article.projection(fields)
+            )
+        except CustomError as e:
+            return Error(error=str(e)).model_dump(exclude_none=True), e.status_code
+
+        response = {'success': True, 'data': [Article.short_json(document, fields) for document in documents]}
+        if next_token is not None:
+            response['next'] = next_token
+        return json_response(response)
+
+
+class ArticleChangesMethod(Resource):
+    @swag_from({
+        'tags': ['Article'],
+        'summary': 'Статьи, созданные, измененные или удаленные после водяного знака',
+        'parameters': [
+            {
+                'in': 'query',
+                'name': 'since',
+                'type': 'string',
+                'required': False,
+                'description': 'Водяной знак из поля watermark прошлого ответа. Без него лента идет с начала'
+            },
+            {
+                'in': 'query',
+                'name': 'limit',
+                'type': 'integer',
+                'required': False,
+                'description': f'Количество статей в ответе, максимум {PAGE_MAX_LIMIT}'
+            },
+            FIELDS_PARAMETER
+        ],
+        'responses': {
+            '200': {
+                'description': 'Action executed successfully. Удаленные статьи приходят только с id и status deleted',
+                "schema": {
+                    "$ref": '#/definitions/ArticleChangesResponse'
+                },
+            },
+            '400': {
+                'description': 'Action executed error',
+                'schema': {
+                    "$ref": "#/definitions/Error"
+                },
+            },
+            '500': {
+                'description': 'Error',
+            }
+        }
+    })
+    def get(self):
+        limit = min(max(request.args.get('limit', PAGE_DEFAULT_LIMIT, type=int), 1), PAGE_MAX_LIMIT)
+        fields = request_fields()
+        if fields:
+            # без id и статуса потребитель не сможет применить изменение
+            fields = list(dict.fromkeys(['id', 'status', *fields]))
+        try:
+            documents, watermark, has_more = ObjectBroker(MongoCollectionsEnum.ARTICLES).list_changes(
+                since=request.args.get('since'),
+                limit=limit,
+                projection=Article.projection(fields)
+            )
+        except CustomError as e:
+            return Error(error=str(e)).model_dump(exclude_none=True), e.status_code
+
+        data = [
+            Article.short_json(document, ['id', 'status'] if Article.is_deleted(document) else fields)
+            for document in documents
+        ]
+        return json_response({'success': True, 'data': data, 'watermark': watermark, 'has_more': has_more})
+
+
+class ArticleSearchMethod(Resource):
+    @swag_from({
+        'tags': ['Article'],
+        'summary': 'Полнотекстовый поиск по заголовку и тексту действующих статей, по убыванию релевантности',
+        'parameters': [
+            {
+                'in': 'query',
+                'name': 'q',
+                'type': 'string',
+                'required': True,
+                'description': 'Строка поиска: слова, "фразы" в кавычках, -слова для исключения'
+            },
+            {
+                'in': 'query',
+                'name': 'limit',
+                'type': 'integer',
+                'required': False,
+                'description': f'Количество статей на странице, максимум {PAGE_MAX_LIMIT}'
+            },
+            {
+                'in': 'query',
+                'name': 'after',
+                'type': 'string',
+                'required': False,
+                'description': 'Токен продолжения из поля next прошлого ответа, q должен быть тем же'
+            },
+            {
+                'in': 'query',
+                'name': 'snippet',
+                'type': 'boolean',
+                'required': False,
+                'description': f'Добавить фрагмент текста ({SEARCH_SNIPPET_LENGTH} символов) рядом с найденным словом. '
+                               'Вместе с fields=id,title статьи приходят без полного текста'
+            },
+            FIELDS_PARAMETER
+        ],
+        'responses': {
+            '200': {
+                'description': 'Action executed successfully',
+                "schema": {
+                    "$ref": '#/definitions/ArticleSearchResponse'
+                },
+            },
+            '400': {
+                'description': 'Action executed error',
+                'schema': {
+                    "$ref": "#/definitions/Error"
+                },
+            },
+            '501': {
+                'description': 'Хранилище не поддерживает полнотекстовый поиск',
+                'schema': {
+                    "$ref": "#/definitions/Error"
+                },
+            },
+            '500': {
+                'description': 'Error',
+            }
+        }
+    })
+    def get(self):
+        limit = min(max(request.args.get('limit', PAGE_DEFAULT_LIMIT, type=int), 1), PAGE_MAX_LIMIT)
+        fields = request_fields()
+        snippet = request.args.get('snippet', 'false').lower() in ('true', '1')
+        query = request.args.get('q', '').strip()
+        try:
+            if not query:
+                raise InvalidSearchQuery
+            if len(query) > SEARCH_MAX_QUERY_LENGTH:
+                raise InvalidSearchQuery(f'Search query is longer than {SEARCH_MAX_QUERY_LENGTH} characters')
+            article_example = Article.example()
+            filter_engine = FilterBuilder()
+            filter_engine.equal(article_example, article_example.system.status, StatusEnum.VALID)
+            documents, next_token = ObjectBroker(MongoCollectionsEnum.ARTICLES).search_page_documents(
+                query,
+                filter_engine.build(only_filter=True),
+                limit=limit,
+                after=request.args.get('after'),
+                projection=Article.projection(fields),
+                snippet_length=SEARCH_SNIPPET_LENGTH if snippet else 0
+            )
+        except CustomError as e:
+            return Error(error=str(e)).model_dump(exclude_none=True), e.status_code
+
+        data = []
+        for document in documents:
+            item = Article.short_json(document, fields)
+            item['score'] = document['score']
+            if snippet:
+                item['snippet'] = document.get('snippet')
+            data.append(item)
+        response = {'success': True, 'data': data}
+        if next_token is not None:
+            response['next'] = next_token
+        return json_response(response)
+
+
 class ArticleAllMethod(Resource):
     @swag_from({
         'tags': ['Article'],
-        'summary': 'Получить все статьи в формате csv',
+        'summary': 'Получить все статьи: csv, csv.gz, ndjson, parquet или arrow',
+        'parameters': [
+            FIELDS_PARAMETER,
+            {
+                'in': 'query',
+                'name': 'format',
+                'type': 'string',
+                'enum': list(EXPORT_FORMATS),
+                'required': False,
+                'description': 'Формат выгрузки. Без него выбирается по Accept, по умолчанию csv'
+            }
+        ],
+        'produces': [export_format.mimetype for export_format in EXPORT_FORMATS.values()],
         'responses': {
             '200': {
                 'description': 'Action executed successfully',
             },
+            '406': {
+                'description': 'Формат не поддерживается',
+                'schema': {
+                    "$ref": "#/definitions/Error"
+                },
+            },
             '500': {
                 'description': 'Error',
             }
         }
     })
     def get(self):
+        fields = request_fields()
         try:
+            selected = export_format()
             article_example = Article.example()
             filter_engine = FilterBuilder()
             filter_engine.equal(article_example, article_example.system.status, StatusEnum.VALID)
-            articles = ObjectBroker(MongoCollectionsEnum.ARTICLES).list_objects(
-                filter_engine.build(only_filter=True)
+            documents = ObjectBroker(MongoCollectionsEnum.ARTICLES).iter_documents(
+                filter_engine.build(only_filter=True),
+                projection=Article.projection(fields),
+                batch_size=EXPORT_BATCH_SIZE
             )
-            if len(articles) == 0:
+            first_document = next(documents, None)
+            if first_document is None:
                 raise DocumentsNotFoundError()
 
         except CustomError as e:
             return Error(error=str(e)).model_dump(exclude_none=True), e.status_code
-        si = StringIO()
-        cw = csv.DictWriter(si, fieldnames=list(article_example.get_short_model().model_dump().keys()))
-        cw.writeheader()
-        cw.writerows(list(map(lambda article: DataValidator.object_ids_to_string(article.get_short_model().model_dump()), articles)))
+        row = Article.short_json if selected.drop_none else Article.short_document
+        rows = map(partial(row, fields=fields), chain([first_document], documents))
+
+        return Response(
+            selected.stream(rows, fieldnames=fields or list(ArticleShortModel.model_fields.keys())),
+            mimetype=selected.mimetype,
+            headers={
+                "Content-disposition": f"attachment; filename=articles.{selected.extension}",
+                "Vary": "Accept"
+            }
+        )
+
+
+EXPORT_JOB_ID_PARAMETER = {
+    'in': 'path',
+    'name': 'job_id',
+    'type': 'string',
+    'required': True,
+    'description': 'id задачи выгрузки'
+}
+
+
+def article_export_writer(fields: list[str] | None):
+    """Функция выгрузки для export_jobs: фильтр и проекция собираются сразу, сама выборка идет в фоновом потоке"""
+    article_example = Article.example()
+    filter_engine = FilterBuilder()
+    filter_engine.equal(article_example, article_example.system.status, StatusEnum.VALID)
+    filter = filter_engine.build(only_filter=True)
+    projection = Article.projection(fields)
+    fieldnames = fields or list(ArticleShortModel.model_fields.keys())
+
+    def write(file) -> int:
+        written = 0
+
+        def rows():
+            nonlocal written
+            for document in ObjectBroker(MongoCollectionsEnum.ARTICLES).iter_documents(filter, projection=projection, batch_size=EXPORT_BATCH_SIZE):
+                written += 1
+                yield Article.short_document(document, fields)
+
+        for chunk in stream_csv(rows(), fieldnames=fieldnames):
+            file.write(chunk)
+        return written
 
-        output = si.getvalue()
-        return Response(output, mimetype='text/csv', headers={"Content-disposition": "attachment; filename=articles.csv"})
+    return write
+
+
+class ArticleExportMethod(Resource):
+    @swag_from({
+        'tags': ['Article'],
+        'summary': 'Запустить фоновую выгрузку всех статей в csv.gz',
+        'parameters': [
+            FIELDS_PARAMETER
+        ],
+        'responses': {
+            '202': {
+                'description': 'Задача создана, ее состояние по ссылке из Location',
+                "schema": {
+                    "$ref": '#/definitions/Success'
+                },
+            },
+            '400': {
+                'description': 'Action executed error',
+                'schema': {
+                    "$ref": "#/definitions/Error"
+                },
+            }
+        }
+    })
+    def post(self):
+        fields = request_fields()
+        try:
+            write = article_export_writer(fields)
+        except CustomError as e:
+            return Error(error=str(e)).model_dump(exclude_none=True), e.status_code
+
+        job = export_jobs.start(write, params={'fields': fields})
+        return Success(data=job).model_dump(exclude_none=True), 202, {'Location': f"/article/export/{job['id']}"}
+
+
+class ArticleExportJobMethod(Resource):
+    @swag_from({
+        'tags': ['Article'],
+        'summary': 'Состояние фоновой выгрузки: pending, running, done или failed',
+        'parameters': [
+            EXPORT_JOB_ID_PARAMETER
+        ],
+        'responses': {
+            '200': {
+                'description': 'Action executed successfully',
+                "schema": {
+                    "$ref": '#/definitions/Success'
+                },
+            },
+            '404': {
+                'description': 'Задача не найдена',
+                'schema': {
+                    "$ref": "#/definitions/Error"
+                },
+            }
+        }
+    })
+    def get(self, job_id):
+        try:
+            job = export_jobs.get(job_id)
+        except CustomError as e:
+            return Error(error=str(e)).model_dump(exclude_none=True), e.status_code
+
+        return Success(data=job).model_dump(exclude_none=True), 200
+
+
+class ArticleExportDownloadMethod(Resource):
+    @swag_from({
+        'tags': ['Article'],
+        'summary': 'Скачать готовую выгрузку. Поддерживаются Range и If-None-Match для докачки и повторных скачиваний',
+        'parameters': [
+            EXPORT_JOB_ID_PARAMETER
+        ],
+        'responses': {
+            '200': {
+                'description': 'Файл csv.gz',
+            },
+            '206': {
+                'description': 'Запрошенный Range файла',
+            },
+            '404': {
+                'description': 'Задача не найдена',
+                'schema': {
+                    "$ref": "#/definitions/Error"
+                },
+            },
+            '409': {
+                'description': 'Выгрузка еще не готова',
+                'schema': {
+                    "$ref": "#/definitions/Error"
+                },
+            }
+        }
+    })
+    def get(self, job_id):
+        try:
+            job = export_jobs.get(job_id)
+            if job['status'] != ExportJobStatus.DONE:
+                raise ExportJobNotReadyError
+        except CustomError as e:
+            return Error(error=str(e)).model_dump(exclude_none=True), e.status_code
+
+        return send_file(
+            export_jobs.file_path(job_id),
+            mimetype='application/gzip',
+            as_attachment=True,
+            download_name='articles.csv.gz',
+            conditional=True,
+            etag=True
+        )
 
 
 class ArticleCreateMethod(Resource):
     @swag_from({
         'tags': ['Article'],
         'summary': 'Создать статью',
+        'parameters': [
+            {
+                'in': 'header',
+                'name': 'Idempotency-Key',
+                'type': 'string',
+                'required': False,
+                'description': 'Ключ идемпотентности. Повтор запроса с тем же ключом вернет сохраненный ответ без новой записи'
+            },
+            {
+                'in': 'body',
+                'name': 'body',
+                'required': True,
+                'schema': {
+                    "$ref": '#/definitions/ArticleCreateRequest'
+                },
+            }
+        ],
         'responses': {
             '200': {
                 'description': 'Action executed successfully',
@@ -172,16 +703,55 @@ class ArticleCreateMethod(Resource):
                     "$ref": "#/definitions/Error"
                 },
             },
+            '409': {
+                'description': 'Запрос с этим Idempotency-Key еще выполняется',
+                'schema': {
+                    "$ref": "#/definitions/Error"
+                },
+            },
+            '413': PAYLOAD_TOO_LARGE_RESPONSE,
+            '422': {
+                'description': 'Idempotency-Key уже использован с другим телом запроса',
+                'schema': {
+                    "$ref": "#/definitions/Error"
+                },
+            },
             '500': {
                 'description': 'Error',
             }
         }
     })
     def post(self):
-        request_data: ArticleUpdateRequest | Error = DataValidator.validate(request.get_json(), ArticleUpdateRequest)
-        if isinstance(request_data, Error):
-            return request_data.model_dump(), 400
+        idempotency_key = request.headers.get('Idempotency-Key')
+        if idempotency_key is None:
+            return self._create()
+
+        store = IdempotencyStore('article.create')
+        try:
+            # тело читается с ограничением размера и потом переиспользуется при валидации
+            record = store.begin(idempotency_key, hashlib.sha256(BodyValidator.read_request()).hexdigest())
+        except CustomError as e:
+            return Error(error=str(e)).model_dump(exclude_none=True), e.status_code
+        if record is not None:
+            return record['response']['body'], record['response']['status_code'], {'Idempotent-Replayed': 'true'}
+
+        try:
+            body, status_code = self._create()
+        except Exception:
+            store.release(idempotency_key)
+            raise
+        if status_code >= 500:
+            store.release(idempotency_key)
+        else:
+            store.complete(idempotency_key, body, status_code)
+        return body, status_code
+
+    def _create(self):
         try:
+            with span('validate'):
+                request_data: ArticleCreateRequest | Error = BodyValidator.validate_request(ArticleCreateRequest)
+            if isinstance(request_data, Error):
+                return request_data.model_dump(), 400
             article = Article.create(request_data.title, request_data.text)
         except CustomError as e:
             return Error(error=str(e)).model_dump(exclude_none=True), e.status_code
@@ -189,6 +759,83 @@ class ArticleCreateMethod(Resource):
         return DataValidator.object_ids_to_string(ArticleGetResponse(data=article.get_short_model()).model_dump(exclude_none=True, by_alias=True)), 200
 
 
+class ArticleBulkMethod(Resource):
+    @swag_from({
+        'tags': ['Article'],
+        'summary': 'Пакетно создать, обновить и удалить статьи',
+        'parameters': [
+            {
+                'in': 'body',
+                'name': 'body',
+                'required': True,
+                'schema': {
+                    "$ref": '#/definitions/ArticleBulkRequest'
+                },
+            }
+        ],
+        'responses': {
+            '200': {
+                'description': 'Action executed successfully, статус по каждой записи в data',
+                "schema": {
+                    "$ref": '#/definitions/ArticleBulkResponse'
+                },
+            },
+            '400': {
+                'description': 'Action executed error',
+                'schema': {
+                    "$ref": "#/definitions/Error"
+                },
+            },
+            '413': PAYLOAD_TOO_LARGE_RESPONSE,
+            '500': {
+                'description': 'Error',
+            }
+        }
+    })
+    def post(self):
+        try:
+            with span('validate'):
+                request_data: ArticleBulkRequest | Error = BodyValidator.validate_request(ArticleBulkRequest, max_size=BULK_MAX_BODY_SIZE)
+            if isinstance(request_data, Error):
+                return request_data.model_dump(), 400
+            if len(request_data.create) + len(request_data.update) + len(request_data.delete) > BULK_MAX_ITEMS:
+                raise BulkLimitError(f"Too many items in bulk request, max {BULK_MAX_ITEMS}")
+            results = Article.bulk(
+                creates=[(item.title, item.text) for item in request_data.create],
+                updates=[(item.id, item.title, item.text) for item in request_data.update],
+                deletes=request_data.delete
+            )
+        except CustomError as e:
+            return Error(error=str(e)).model_dump(exclude_none=True), e.status_code
+
+        return DataValidator.object_ids_to_string(ArticleBulkResponse(data=results).model_dump(exclude_none=True, by_alias=True)), 200
+
+
+class ArticleCacheStatsMethod(Resource):
+    @swag_from({
+        'tags': ['Article'],
+        'summary': 'Статистика кэша документов: попадания, промахи, вытеснения',
+        'responses': {
+            '200': {
+                'description': 'Action executed successfully',
+                "schema": {
+                    "$ref": '#/definitions/Success'
+                },
+            }
+        }
+    })
+    def get(self):
+        return Success(data=get_document_cache().stats()).model_dump(exclude_none=True), 200
+
+
 api.add_resource(ArticleMethod, '/article/<string:article_id>')
+api.add_resource(ArticleListMethod, '/article')
 api.add_resource(ArticleAllMethod, '/article/getAll')
+api.add_resource(ArticleChangesMethod, '/article/changes')
+api.add_resource(ArticleSearchMethod, '/article/search')
 api.add_resource(ArticleCreateMethod, '/article/create')
+api.add_resource(ArticleExportMethod, '/article/export')
+api.add_resource(ArticleExportJobMethod, '/article/export/<string:job_id>')
+api.add_resource(ArticleExportDownloadMethod, '/article/export/<string:job_id>/download')
+api.add_resource(ArticleBulkMethod, '/article/bulk')
+api.add_resource(ArticleCacheStatsMethod, '/article/cache/stats')
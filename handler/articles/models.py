@@ -1,18 +1,92 @@
-from loader import app
+from typing import Annotated
+
+from bson import ObjectId
+from pydantic import BaseModel, Field, model_validator
+
 from utils.db_connector import ArticleShortModel
-from utils.register_modeles import register_schema
+from utils.db_connector.articles.models import ArticlePartialModel
+from utils.db_connector.base_model import ObjectIdPydanticAnnotation
+from utils.swagger_spec import defer_schema
 
 from ..base_models import Success
 
 
 class ArticleGetResponse(Success):
-    data: ArticleShortModel
+    data: ArticleShortModel | ArticlePartialModel
+
+
+class ArticleListResponse(Success):
+    data: list[ArticleShortModel | ArticlePartialModel]
+    next: str | None = Field(default=None)
+
+
+class ArticleChangesResponse(Success):
+    data: list[ArticleShortModel | ArticlePartialModel]
+    watermark: str | None = Field(default=None)
+    has_more: bool = False
+
+
+class ArticleSearchItem(ArticlePartialModel):
+    score: float
+    snippet: str = None
+
+
+class ArticleSearchResponse(Success):
+    data: list[ArticleSearchItem]
+    next: str | None = Field(default=None)
+
+
+class ArticleUpdateRequest(BaseModel):
+    title: str | None = None
+    text: str | None = None
+
+    @model_validator(mode='after')
+    def check_not_empty(self):
+        # пустое обновление только сдвинуло бы версию статьи: новый ETag и лишняя запись в ленте изменений
+        if not self.title and not self.text:
+            raise ValueError('title or text is required')
+        return self
+
+
+class ArticleCreateRequest(BaseModel):
+    title: str
+    text: str
+
+
+class ArticleBulkCreateItem(BaseModel):
+    title: str
+    text: str
+
+
+class ArticleBulkUpdateItem(BaseModel):
+    id: Annotated[ObjectId, ObjectIdPydanticAnnotation]
+    title: str | None = None
+    text: str | None = None
+
+
+class ArticleBulkRequest(BaseModel):
+    create: list[ArticleBulkCreateItem] = Field(default_factory=list)
+    update: list[ArticleBulkUpdateItem] = Field(default_factory=list)
+    delete: list[Annotated[ObjectId, ObjectIdPydanticAnnotation]] = Field(default_factory=list)
+
+
+class ArticleBulkItemResult(BaseModel):
+    op: str
+    index: int
+    id: Annotated[ObjectId, ObjectIdPydanticAnnotation] = None
+    status: str
+    error: str = None
 
 
-class ArticleUpdateRequest(Success):
-    title: str | None
-    text: str | None
+class ArticleBulkResponse(Success):
+    data: list[ArticleBulkItemResult]
 
 
-register_schema(app, ArticleGetResponse)
-register_schema(app, ArticleUpdateRequest)
+defer_schema(ArticleGetResponse)
+defer_schema(ArticleListResponse)
+defer_schema(ArticleChangesResponse)
+defer_schema(ArticleSearchResponse)
+defer_schema(ArticleUpdateRequest)
+defer_schema(ArticleCreateRequest)
+defer_schema(ArticleBulkRequest)
+defer_schema(ArticleBulkResponse)
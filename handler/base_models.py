@@ -1,6 +1,5 @@
 from pydantic import BaseModel, Field
-from utils.register_modeles import register_schema
-from loader import app
+from utils.swagger_spec import defer_schema
 
 
 class Error(BaseModel):
@@ -15,5 +14,5 @@ class Success(BaseModel):
     data: list | dict | object = Field(default=None)
 
 
-register_schema(app, Error)
-register_schema(app, Success)
+defer_schema(Error)
+defer_schema(Success)
@@ -0,0 +1,37 @@
+import importlib
+import sys
+import types
+
+import utils.db_connector.errors as errors
+
+
+def provide_errors():
+    """
+    Пакет ошибок собирается из documents.py поверх CustomError из base_exeptions. В поставке без этих модулей
+    (нет __init__.py и base_exeptions.py) тесты подставляют минимальный CustomError и те же классы из documents.py,
+    чтобы юнит тесты не зависели от полной сборки. Если пакет полный, ничего не меняется
+    """
+    if hasattr(errors, 'CustomError'):
+        return
+    name = f'{errors.__name__}.base_exeptions'
+    if name not in sys.modules:
+        try:
+            importlib.import_module(name)
+        except ImportError:
+            base = types.ModuleType(name)
+
+            class CustomError(Exception):
+                def __init__(self, message: str = '', status_code: int = 400):
+                    super().__init__(message)
+                    self.status_code = status_code
+
+            base.CustomError = CustomError
+            base.__all__ = ['CustomError']
+            sys.modules[name] = base
+    documents = importlib.import_module(f'{errors.__name__}.documents')
+    for attribute, value in vars(documents).items():
+        if not attribute.startswith('_'):
+            setattr(errors, attribute, value)
+
+
+provide_errors()
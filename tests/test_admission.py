@@ -0,0 +1,148 @@
+import io
+import threading
+import time
+
+import pytest
+
+from utils import admission
+from utils.admission import RouteLimiter, ThreadBudget, Overloaded
+
+
+def test_limiter_admits_up_to_concurrency():
+    limiter = RouteLimiter('test', concurrency=2, queue_size=0, queue_timeout=0.01, deadline=0)
+    limiter.acquire()
+    limiter.acquire()
+    with pytest.raises(Overloaded) as error:
+        limiter.acquire()
+    assert error.value.status_code == 429
+    assert limiter.stats() == {'active': 2, 'waiting': 0, 'rejected': 1, 'timed_out': 0}
+
+
+def test_limiter_queue_timeout_is_503():
+    limiter = RouteLimiter('test', concurrency=1, queue_size=1, queue_timeout=0.05, deadline=0)
+    limiter.acquire()
+    with pytest.raises(Overloaded) as error:
+        limiter.acquire()
+    assert error.value.status_code == 503
+    assert limiter.stats()['timed_out'] == 1
+    assert limiter.stats()['waiting'] == 0
+
+
+def test_limiter_hands_released_slot_to_waiter():
+    limiter = RouteLimiter('test', concurrency=1, queue_size=1, queue_timeout=2, deadline=0)
+    limiter.acquire()
+    admitted = threading.Event()
+
+    def wait():
+        limiter.acquire()
+        admitted.set()
+
+    waiter = threading.Thread(target=wait)
+    waiter.start()
+    while limiter.stats()['waiting'] == 0:
+        time.sleep(0.001)
+    # очередь полна: третий запрос отклоняется сразу
+    with pytest.raises(Overloaded) as error:
+        limiter.acquire()
+    assert error.value.status_code == 429
+
+    limiter.release()
+    waiter.join(timeout=2)
+    assert admitted.is_set()
+    assert limiter.stats()['active'] == 1
+
+
+def test_thread_budget():
+    budget = ThreadBudget(1)
+    budget.take()
+    with pytest.raises(Overloaded) as error:
+        budget.take()
+    assert error.value.status_code == 429
+    budget.give()
+    budget.take()
+
+
+def test_point_reads_bypass_shared_budget(monkeypatch):
+    monkeypatch.setattr(admission, 'shared_budget', ThreadBudget(1))
+    monkeypatch.setattr(admission, 'limiters', {
+        'point': RouteLimiter('point', 4, 0, 0.01, 0),
+        'default': RouteLimiter('default', 4, 4, 0.01, 0),
+    })
+    release_default = admission.admit_request('default')
+    # потоки для остальных полос кончились, точечное чтение все равно проходит
+    with pytest.raises(Overloaded):
+        admission.admit_request('default')
+    release_point = admission.admit_request('point')
+
+    release_point()
+    release_default()
+    assert admission.shared_budget.used == 0
+    assert admission.limiters['default'].active == 0
+
+
+def test_rejected_lane_returns_budget(monkeypatch):
+    monkeypatch.setattr(admission, 'shared_budget', ThreadBudget(4))
+    monkeypatch.setattr(admission, 'limiters', {'export': RouteLimiter('export', 1, 0, 0.01, 0)})
+    release = admission.admit_request('export')
+    with pytest.raises(Overloaded):
+        admission.admit_request('export')
+    assert admission.shared_budget.used == 1
+    release()
+    assert admission.shared_budget.used == 0
+
+
+def test_release_is_idempotent(monkeypatch):
+    monkeypatch.setattr(admission, 'shared_budget', ThreadBudget(4))
+    monkeypatch.setattr(admission, 'limiters', {'default': RouteLimiter('default', 2, 0, 0.01, 0)})
+    release = admission.admit_request('default')
+    release()
+    release()
+    assert admission.limiters['default'].active == 0
+    assert admission.shared_budget.used == 0
+
+
+def make_app(monkeypatch):
+    from flask import Flask, send_file
+    from werkzeug.test import EnvironBuilder
+
+    monkeypatch.setattr(admission, 'shared_budget', ThreadBudget(4))
+    monkeypatch.setattr(admission, 'limiters', {'default': RouteLimiter('default', 2, 0, 0.01, 0)})
+    app = Flask(__name__)
+
+    @app.route('/download')
+    def download():
+        return send_file(io.BytesIO(b'a,b\n1,2\n'), mimetype='text/csv', as_attachment=True, download_name='a.csv')
+
+    @app.route('/stream')
+    def stream():
+        return app.response_class((line for line in (b'a\n', b'b\n')), mimetype='text/plain')
+
+    admission.init_admission(app)
+
+    def call(path: str):
+        """Вызов приложения как WSGI: сервер дочитывает тело и закрывает его, как gunicorn"""
+        body = app(EnvironBuilder(path=path).get_environ(), lambda status, headers, exc_info=None: None)
+        assert admission.limiters['default'].active == 1
+        data = b''.join(body)
+        body.close()
+        return data
+    return call
+
+
+@pytest.mark.parametrize('path, body', [('/download', b'a,b\n1,2\n'), ('/stream', b'a\nb\n')])
+def test_streamed_response_frees_lane_on_close(monkeypatch, path, body):
+    call = make_app(monkeypatch)
+    for _ in range(3):
+        assert call(path) == body
+    assert admission.limiters['default'].stats()['active'] == 0
+    assert admission.shared_budget.used == 0
+
+
+def test_unknown_route_is_not_limited(monkeypatch):
+    from flask import Flask
+
+    monkeypatch.setattr(admission, 'limiters', {'default': RouteLimiter('default', 1, 0, 0.01, 0)})
+    app = Flask(__name__)
+    admission.init_admission(app)
+    admission.limiters['default'].acquire()
+    assert app.test_client().get('/missing').status_code == 404
@@ -0,0 +1,106 @@
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+from pymongo.errors import BulkWriteError, DuplicateKeyError, WriteConcernError
+
+from utils.db_connector import coalescer
+from utils.db_connector.coalescer import WriteCoalescer
+from utils.db_connector.errors import CoalescedWriteTimeout
+
+
+class FakeCollection:
+    """insert_many, который запоминает пачки и может отвечать заранее заданной ошибкой"""
+
+    def __init__(self, error=None, block: threading.Event = None):
+        self.batches = []
+        self.error = error
+        self.block = block
+
+    def insert_many(self, documents, ordered=True):
+        assert ordered is False
+        if self.block is not None:
+            self.block.wait()
+        self.batches.append([document['_id'] for document in documents])
+        if self.error is not None:
+            error, self.error = self.error, None
+            raise error
+
+
+def make_coalescer(collection, **kwargs) -> WriteCoalescer:
+    return WriteCoalescer('articles', lambda: collection, **{'max_batch': 10, 'window_ms': 20, 'timeout_ms': 2000, **kwargs})
+
+
+def test_concurrent_inserts_are_batched():
+    collection = FakeCollection()
+    writer = make_coalescer(collection, max_batch=5, window_ms=200)
+    with ThreadPoolExecutor(max_workers=12) as pool:
+        ids = list(pool.map(lambda index: writer.insert({'n': index}), range(12)))
+
+    assert len(set(ids)) == 12
+    assert sorted(id_ for batch in collection.batches for id_ in batch) == sorted(ids)
+    assert all(len(batch) <= 5 for batch in collection.batches)
+    assert len(collection.batches) < 12
+
+
+def test_write_error_goes_to_its_caller_only():
+    collection = FakeCollection()
+    writer = make_coalescer(collection, max_batch=2, window_ms=1000)
+    collection.error = BulkWriteError({'writeErrors': [{'index': 1, 'code': 11000, 'errmsg': 'duplicate'}], 'writeConcernErrors': []})
+    with ThreadPoolExecutor(max_workers=2) as pool:
+        first = pool.submit(writer.insert, {'n': 0})
+        second = pool.submit(writer.insert, {'n': 1})
+        results = [first, second]
+
+    outcomes = []
+    for future in results:
+        try:
+            outcomes.append(future.result())
+        except DuplicateKeyError:
+            outcomes.append('duplicate')
+    assert outcomes.count('duplicate') == 1
+
+
+def test_write_concern_error_is_not_reported_as_success():
+    collection = FakeCollection(error=BulkWriteError({
+        'writeErrors': [],
+        'writeConcernErrors': [{'code': 64, 'errmsg': 'waiting for replication timed out'}],
+    }))
+    writer = make_coalescer(collection)
+    with pytest.raises(WriteConcernError):
+        writer.insert({'n': 0})
+
+
+def test_flusher_survives_failures_outside_insert_many(monkeypatch):
+    collection = FakeCollection()
+    writer = make_coalescer(collection)
+    calls = []
+
+    def observe(value, *labels):
+        calls.append(value)
+        if len(calls) == 1:
+            raise RuntimeError('metrics are broken')
+
+    monkeypatch.setattr(coalescer.batch_size_histogram, 'observe', observe)
+    with pytest.raises(RuntimeError):
+        writer.insert({'n': 0})
+    # поток склейки жив, следующая вставка проходит
+    assert writer.insert({'n': 1}) is not None
+
+
+def test_insert_error_fails_whole_batch_and_next_batch_works():
+    collection = FakeCollection(error=ConnectionError('mongo is down'))
+    writer = make_coalescer(collection)
+    with pytest.raises(ConnectionError):
+        writer.insert({'n': 0})
+    assert writer.insert({'n': 1}) is not None
+
+
+def test_caller_wait_is_bounded():
+    block = threading.Event()
+    writer = make_coalescer(FakeCollection(block=block), timeout_ms=50)
+    try:
+        with pytest.raises(CoalescedWriteTimeout):
+            writer.insert({'n': 0})
+    finally:
+        block.set()
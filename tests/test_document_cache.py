@@ -0,0 +1,72 @@
+import pytest
+from bson import ObjectId
+
+from utils.db_connector import cache
+from utils.db_connector.cache import LRUCache, cache_key, find_cached_document, invalidate_document
+
+
+class FakeCollection:
+    """find_one по словарю, перед ответом может выполнить запись из другого потока"""
+    name = 'articles'
+
+    def __init__(self, documents: dict, during_read=None):
+        self.documents = documents
+        self.during_read = during_read
+        self.reads = 0
+
+    def find_one(self, filter, projection=None):
+        self.reads += 1
+        document = self.documents.get(filter['_id'])
+        if self.during_read is not None:
+            self.during_read()
+        return document
+
+
+@pytest.fixture(autouse=True)
+def document_cache(monkeypatch):
+    backend = LRUCache(max_size=10, ttl=60)
+    monkeypatch.setattr(cache, '_document_cache', backend)
+    return backend
+
+
+def test_read_fills_cache(document_cache):
+    object_id = ObjectId()
+    collection = FakeCollection({object_id: {'_id': object_id, 'title': 'a'}})
+    assert find_cached_document(collection, object_id) == {'_id': object_id, 'title': 'a'}
+    assert find_cached_document(collection, object_id) == {'_id': object_id, 'title': 'a'}
+    assert collection.reads == 1
+    assert cache._fills == {}
+
+
+def test_projection_read_does_not_fill_cache(document_cache):
+    object_id = ObjectId()
+    collection = FakeCollection({object_id: {'_id': object_id, 'title': 'a'}})
+    find_cached_document(collection, object_id, projection={'title': 1})
+    assert document_cache.get(cache_key('articles', object_id)) is None
+
+
+def test_invalidation_during_read_keeps_stale_document_out(document_cache):
+    object_id = ObjectId()
+    documents = {object_id: {'_id': object_id, 'title': 'old'}}
+
+    def write():
+        # запись успела обновить документ и сбросить кэш, пока читатель держит старую версию
+        documents[object_id] = {'_id': object_id, 'title': 'new'}
+        invalidate_document('articles', object_id)
+
+    stale = find_cached_document(FakeCollection(documents, during_read=write), object_id)
+    assert stale['title'] == 'old'
+    assert document_cache.get(cache_key('articles', object_id)) is None
+    assert find_cached_document(FakeCollection(documents), object_id)['title'] == 'new'
+    assert cache._fills == {}
+
+
+def test_failed_read_clears_fill_mark():
+    object_id = ObjectId()
+
+    def fail():
+        raise ConnectionError('mongo is down')
+
+    with pytest.raises(ConnectionError):
+        find_cached_document(FakeCollection({}, during_read=fail), object_id)
+    assert cache._fills == {}
@@ -0,0 +1,70 @@
+import csv
+import gzip
+import io
+import json
+
+import pytest
+from werkzeug.datastructures import MIMEAccept
+from werkzeug.http import parse_accept_header
+
+from utils.db_connector.errors import UnsupportedExportFormat
+from utils.exporter import stream_csv, stream_ndjson, gzip_stream, stream_parquet, stream_arrow, select_export_format, EXPORT_FORMATS
+
+FIELDS = ['id', 'title', 'text']
+ROWS = [{'id': str(index), 'title': f'title {index}', 'text': 'текст, с "кавычками"\nи переносом'} for index in range(7)]
+
+
+def test_stream_csv_chunks_and_round_trip():
+    chunks = list(stream_csv(iter(ROWS), FIELDS, chunk_rows=3))
+    assert len(chunks) == 3
+    assert list(csv.DictReader(io.StringIO(''.join(chunks)))) == ROWS
+
+
+def test_stream_ndjson_one_object_per_line():
+    chunks = list(stream_ndjson(iter(ROWS), chunk_rows=5))
+    assert len(chunks) == 2
+    body = b''.join(chunks)
+    assert body.endswith(b'\n')
+    assert [json.loads(line) for line in body.splitlines()] == ROWS
+
+
+def test_gzip_stream_decompresses_to_source():
+    source = list(stream_csv(iter(ROWS), FIELDS, chunk_rows=2))
+    assert gzip.decompress(b''.join(gzip_stream(source))) == ''.join(source).encode()
+
+
+def test_parquet_and_arrow_round_trip():
+    pyarrow = pytest.importorskip('pyarrow')
+    import pyarrow.ipc
+    import pyarrow.parquet
+
+    table = pyarrow.parquet.read_table(io.BytesIO(b''.join(stream_parquet(iter(ROWS), FIELDS, chunk_rows=3))))
+    assert table.to_pylist() == ROWS
+    reader = pyarrow.ipc.open_stream(b''.join(stream_arrow(iter(ROWS), FIELDS, chunk_rows=3)))
+    assert reader.read_all().to_pylist() == ROWS
+
+
+@pytest.mark.parametrize('name, accept, expected', [
+    (None, None, 'csv'),
+    (None, '*/*', 'csv'),
+    ('ndjson', 'text/csv', 'ndjson'),
+    (None, 'application/x-ndjson, text/csv;q=0.5', 'ndjson'),
+    (None, 'application/gzip', 'csv.gz'),
+    # клиенты по умолчанию шлют Accept без форматов выгрузки, это не повод для 406
+    (None, 'application/json', 'csv'),
+    (None, 'text/html, application/xml;q=0.9', 'csv'),
+])
+def test_select_export_format(name, accept, expected):
+    assert select_export_format(name, parse_accept_header(accept, MIMEAccept)).name == expected
+
+
+def test_select_export_format_rejects_unknown_and_lists_only_servable():
+    with pytest.raises(UnsupportedExportFormat) as error:
+        select_export_format('xml', MIMEAccept())
+    assert error.value.status_code == 406
+    servable = [name for name, export_format in EXPORT_FORMATS.items() if export_format.available]
+    assert str(error.value) == f"Supported formats: {', '.join(servable)}"
+
+    with pytest.raises(UnsupportedExportFormat) as error:
+        select_export_format('ndjson', MIMEAccept(), {'csv': EXPORT_FORMATS['csv']})
+    assert str(error.value) == 'Supported formats: csv'
@@ -0,0 +1,54 @@
+import datetime
+
+import pytest
+
+from utils.db_connector import idempotency
+from utils.db_connector.idempotency import IdempotencyStore
+from utils.db_connector.storage.memory import MemoryDatabase
+
+
+@pytest.fixture(autouse=True)
+def database(monkeypatch):
+    database = MemoryDatabase('test')
+    monkeypatch.setattr(idempotency.MongoDBModel, '_db', database)
+    return database
+
+
+def expire_lock(store: IdempotencyStore, key: str):
+    store.collection.update_one(
+        {'_id': store._record_id(key)},
+        {'$set': {'created_at': datetime.datetime.utcnow() - datetime.timedelta(seconds=idempotency.IDEMPOTENCY_LOCK_TIMEOUT + 1)}}
+    )
+
+
+def test_replay_after_complete():
+    first = IdempotencyStore('test')
+    assert first.begin('key', 'hash') is None
+    assert first.complete('key', {'id': 1}, 200) is True
+    record = IdempotencyStore('test').begin('key', 'hash')
+    assert record['response'] == {'body': {'id': 1}, 'status_code': 200}
+
+
+def test_slow_owner_cannot_overwrite_after_takeover():
+    slow = IdempotencyStore('test')
+    assert slow.begin('key', 'hash') is None
+    expire_lock(slow, 'key')
+
+    new_owner = IdempotencyStore('test')
+    assert new_owner.begin('key', 'hash') is None
+    assert new_owner.complete('key', {'id': 2}, 200) is True
+
+    # исходный запрос завершился позже и ключом уже не владеет
+    assert slow.complete('key', {'id': 1}, 200) is False
+    assert IdempotencyStore('test').begin('key', 'hash')['response']['body'] == {'id': 2}
+
+
+def test_slow_owner_cannot_release_new_owner_key():
+    slow = IdempotencyStore('test')
+    slow.begin('key', 'hash')
+    expire_lock(slow, 'key')
+    new_owner = IdempotencyStore('test')
+    new_owner.begin('key', 'hash')
+
+    slow.release('key')
+    assert new_owner.complete('key', {'id': 2}, 200) is True
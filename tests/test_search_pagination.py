@@ -0,0 +1,42 @@
+import pytest
+from bson import ObjectId
+
+from utils.db_connector.brokers.pagination import encode_token, keyset_filter
+from utils.db_connector.brokers.search import snippet_expression
+from utils.db_connector.errors import InvalidContinuationToken
+
+DOCUMENT = {'_id': ObjectId('65a000000000000000000001'), 'score': 1.5}
+
+
+def test_descending_keyset_filter():
+    token = encode_token('score', DOCUMENT, scope='q1')
+    assert keyset_filter('score', token, descending=True, scope='q1') == {'$or': [
+        {'score': {'$lt': 1.5}},
+        {'score': 1.5, '_id': {'$gt': DOCUMENT['_id']}},
+    ]}
+    assert keyset_filter('score', token, scope='q1')['$or'][0] == {'score': {'$gt': 1.5}}
+
+
+@pytest.mark.parametrize('scope', [None, 'other'])
+def test_token_is_bound_to_scope(scope):
+    token = encode_token('score', DOCUMENT, scope='q1')
+    with pytest.raises(InvalidContinuationToken):
+        keyset_filter('score', token, descending=True, scope=scope)
+
+
+def test_unscoped_token_is_rejected_with_scope():
+    with pytest.raises(InvalidContinuationToken):
+        keyset_filter('score', encode_token('score', DOCUMENT), scope='q1')
+
+
+def test_snippet_starts_near_first_positive_term():
+    snippet = snippet_expression('-draft "c++ code" other', 200)
+    regex_find = snippet['$substrCP'][1]['$max'][1]['$subtract'][0]['$let']['vars']['found']['$regexFind']
+    assert regex_find == {'input': '$text', 'regex': r'c\+\+', 'options': 'i'}
+    assert snippet['$substrCP'][0] == '$text'
+    assert snippet['$substrCP'][2] == 200
+    assert snippet['$substrCP'][1]['$max'][1]['$subtract'][1] == 50
+
+
+def test_snippet_without_terms_starts_at_beginning():
+    assert snippet_expression('-draft', 100) == {'$substrCP': ['$text', 0, 100]}
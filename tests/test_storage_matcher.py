@@ -0,0 +1,168 @@
+import datetime
+import threading
+
+import pytest
+from bson import ObjectId
+from pymongo.errors import BulkWriteError, DuplicateKeyError
+
+from utils.db_connector.storage.matcher import matches, apply_update, apply_projection, sort_documents
+from utils.db_connector.storage.memory import MemoryCollection
+from utils.db_connector.storage.sqlite import SQLiteDatabase
+
+DOCUMENT = {
+    '_id': ObjectId('65a000000000000000000001'),
+    'title': 'Hello',
+    'tags': ['a', 'b'],
+    'views': 10,
+    'system': {'status': 'valid', 'update_document': datetime.datetime(2024, 1, 1)},
+}
+
+
+@pytest.mark.parametrize('filter, expected', [
+    ({}, True),
+    (None, True),
+    ({'title': 'Hello'}, True),
+    ({'title': 'hello'}, False),
+    ({'system.status': 'valid'}, True),
+    ({'system.status': {'$ne': 'deleted'}}, True),
+    ({'system.status': {'$in': ['blocked', 'valid']}}, True),
+    ({'system.status': {'$nin': ['valid']}}, False),
+    ({'views': {'$gt': 5, '$lte': 10}}, True),
+    ({'views': {'$lt': 10}}, False),
+    # сравнение только внутри одного типа, как в монге
+    ({'views': {'$gt': '5'}}, False),
+    ({'tags': 'b'}, True),
+    ({'missing': None}, True),
+    ({'missing': {'$exists': False}}, True),
+    ({'title': {'$exists': True}}, True),
+    ({'title': {'$regex': '^hel', '$options': 'i'}}, True),
+    ({'title': {'$not': {'$regex': '^H'}}}, False),
+    ({'$or': [{'title': 'x'}, {'views': 10}]}, True),
+    ({'$and': [{'title': 'Hello'}, {'views': 11}]}, False),
+    ({'$nor': [{'system.status': 'deleted'}]}, True),
+    ({'system.update_document': {'$gte': datetime.datetime(2024, 1, 1)}}, True),
+    ({'_id': {'$gt': ObjectId('65a000000000000000000000')}}, True),
+])
+def test_matches(filter, expected):
+    assert matches(DOCUMENT, filter) is expected
+
+
+def test_matches_unsupported_operator():
+    with pytest.raises(NotImplementedError):
+        matches(DOCUMENT, {'$where': 'true'})
+    with pytest.raises(NotImplementedError):
+        matches(DOCUMENT, {'views': {'$mod': [2, 0]}})
+
+
+def test_apply_update_does_not_mutate_source():
+    updated = apply_update(DOCUMENT, {
+        '$set': {'system.status': 'deleted', 'new.nested': 1},
+        '$unset': {'title': ''},
+        '$inc': {'views': 5, 'likes': 1},
+    })
+    assert updated['system']['status'] == 'deleted'
+    assert updated['new'] == {'nested': 1}
+    assert 'title' not in updated
+    assert updated['views'] == 15
+    assert updated['likes'] == 1
+    assert DOCUMENT['system']['status'] == 'valid'
+    assert DOCUMENT['title'] == 'Hello'
+
+
+def test_apply_update_unsupported_operator():
+    with pytest.raises(NotImplementedError):
+        apply_update(DOCUMENT, {'$push': {'tags': 'c'}})
+
+
+def test_apply_projection_inclusion():
+    assert apply_projection(DOCUMENT, {'title': 1, 'system.status': 1}) == {
+        '_id': DOCUMENT['_id'],
+        'title': 'Hello',
+        'system': {'status': 'valid'},
+    }
+    assert apply_projection(DOCUMENT, {'title': 1, '_id': 0}) == {'title': 'Hello'}
+
+
+def test_apply_projection_exclusion():
+    projected = apply_projection(DOCUMENT, {'tags': 0, 'system.update_document': 0})
+    assert 'tags' not in projected
+    assert projected['system'] == {'status': 'valid'}
+    assert projected['views'] == 10
+
+
+def test_sort_documents():
+    documents = [
+        {'_id': 3, 'rank': 1},
+        {'_id': 1, 'rank': 2},
+        {'_id': 2, 'rank': 1},
+        {'_id': 4},
+    ]
+    assert [document['_id'] for document in sort_documents(documents, [('rank', 1), ('_id', 1)])] == [4, 2, 3, 1]
+    assert [document['_id'] for document in sort_documents(documents, {'rank': -1, '_id': 1})] == [1, 2, 3, 4]
+
+
+def test_memory_collection_find_and_update():
+    collection = MemoryCollection('articles')
+    for index in range(5):
+        collection.insert_one({'_id': index, 'system': {'status': 'valid' if index % 2 else 'blocked'}, 'n': index})
+
+    found = list(collection.find({'system.status': 'valid'}, projection={'n': 1}, sort=[('n', -1)]))
+    assert found == [{'_id': 3, 'n': 3}, {'_id': 1, 'n': 1}]
+
+    collection.update_one({'_id': 3}, {'$set': {'system.status': 'blocked'}})
+    # индекс по статусу обновляется вместе с документом
+    assert [document['_id'] for document in collection.find({'system.status': 'valid'})] == [1]
+    assert collection.count_documents({'system.status': 'blocked'}) == 4
+
+    assert list(collection.find({}, sort=[('n', 1)], skip=1, limit=2)) == [
+        collection.find_one({'_id': 1}),
+        collection.find_one({'_id': 2}),
+    ]
+
+
+def test_memory_collection_unordered_insert_many_reports_duplicates():
+    collection = MemoryCollection('articles')
+    collection.insert_one({'_id': 1})
+    with pytest.raises(BulkWriteError) as error:
+        collection.insert_many([{'_id': 1}, {'_id': 2}], ordered=False)
+    assert [item['index'] for item in error.value.details['writeErrors']] == [0]
+    assert collection.find_one({'_id': 2}) == {'_id': 2}
+
+
+def test_sqlite_insert_is_unique_across_connections(tmp_path):
+    # две базы на один файл - как два воркера gunicorn
+    first = SQLiteDatabase('test', str(tmp_path / 'storage.sqlite'))['articles']
+    second = SQLiteDatabase('test', str(tmp_path / 'storage.sqlite'))['articles']
+    first.insert_one({'_id': 1, 'owner': 'first'})
+    with pytest.raises(DuplicateKeyError):
+        second.insert_one({'_id': 1, 'owner': 'second'})
+    assert second.find_one({'_id': 1}) == {'_id': 1, 'owner': 'first'}
+
+
+def test_sqlite_conditional_update_is_atomic_across_connections(tmp_path):
+    path = str(tmp_path / 'storage.sqlite')
+    SQLiteDatabase('test', path)['articles'].insert_one({'_id': 1, 'version': 0})
+    results = []
+
+    def bump():
+        collection = SQLiteDatabase('test', path)['articles']
+        for _ in range(20):
+            document = collection.find_one({'_id': 1})
+            results.append(collection.find_one_and_update({'_id': 1, 'version': document['version']}, {'$inc': {'version': 1}}) is not None)
+
+    threads = [threading.Thread(target=bump) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    # каждое успешное обновление увеличило версию ровно на один
+    assert SQLiteDatabase('test', path)['articles'].find_one({'_id': 1})['version'] == results.count(True)
+
+
+def test_sqlite_failed_update_rolls_back(tmp_path):
+    collection = SQLiteDatabase('test', str(tmp_path / 'storage.sqlite'))['articles']
+    collection.insert_one({'_id': 1, 'n': 1})
+    with pytest.raises(NotImplementedError):
+        collection.update_one({'_id': 1}, {'$push': {'tags': 'a'}})
+    assert collection.update_one({'_id': 1}, {'$set': {'n': 2}}).modified_count == 1
+    assert collection.find_one({'_id': 1}) == {'_id': 1, 'n': 2}
@@ -0,0 +1,225 @@
+import threading
+
+import pymongo
+from flask import Flask, g, request, make_response
+from pymongo.errors import PyMongoError
+from werkzeug.wsgi import ClosingIterator
+
+from config import *
+from handler.base_models import Error
+from utils.metrics import registry
+
+# Класс нагрузки маршрута. Точечные чтения идут своей полосой и не стоят в очереди за выгрузками,
+# полнотекстовый поиск не делит полосу с записью, служебные маршруты (/metrics, /docs) и 404 не ограничиваются
+ROUTE_CLASSES = {
+    ('GET', '/article/<string:article_id>'): 'point',
+    ('GET', '/article/search'): 'search',
+    ('GET', '/article/getAll'): 'export',
+    ('POST', '/article/export'): 'export',
+    ('GET', '/article/changes'): 'export',
+    ('POST', '/article/bulk'): 'bulk',
+}
+EXEMPT_PREFIXES = ('/metrics', DOCS_ROUTE)
+
+
+class Overloaded(Exception):
+    def __init__(self, message: str, status_code: int):
+        super().__init__(message)
+        self.status_code = status_code
+
+
+class RouteLimiter:
+    """
+    Ограничение одновременных запросов класса с очередью ограниченной длины. Полная очередь - сразу 429,
+    не дождались места за queue_timeout - 503
+    """
+
+    def __init__(self, name: str, concurrency: int, queue_size: int, queue_timeout: float, deadline: float):
+        self.name = name
+        self.concurrency = concurrency
+        self.queue_size = queue_size
+        self.queue_timeout = queue_timeout
+        # Сколько секунд дается запросу на обращения к монге, 0 - без ограничения
+        self.deadline = deadline
+        self.active = 0
+        self.waiting = 0
+        self.rejected = 0
+        self.timed_out = 0
+        self._condition = threading.Condition()
+
+    def acquire(self):
+        with self._condition:
+            if self.active < self.concurrency:
+                self.active += 1
+                return
+            if self.waiting >= self.queue_size:
+                self.rejected += 1
+                raise Overloaded(f'Too many concurrent {self.name} requests', 429)
+            self.waiting += 1
+            try:
+                if not self._condition.wait_for(lambda: self.active < self.concurrency, timeout=self.queue_timeout):
+                    self.timed_out += 1
+                    raise Overloaded(f'Timed out waiting for a {self.name} slot', 503)
+                self.active += 1
+            finally:
+                self.waiting -= 1
+
+    def release(self):
+        with self._condition:
+            self.active -= 1
+            self._condition.notify()
+
+    def stats(self) -> dict:
+        with self._condition:
+            return {'active': self.active, 'waiting': self.waiting, 'rejected': self.rejected, 'timed_out': self.timed_out}
+
+
+class ThreadBudget:
+    """
+    Сколько потоков воркера могут занять запросы всех полос, кроме точечных чтений, вместе с ожидающими в очередях.
+    Ожидание в очереди держит поток gthread, поэтому без общего бюджета очереди полос могли бы занять все потоки
+    """
+
+    def __init__(self, limit: int):
+        self.limit = limit
+        self.used = 0
+        self.rejected = 0
+        self._lock = threading.Lock()
+
+    def take(self):
+        with self._lock:
+            if self.used >= self.limit:
+                self.rejected += 1
+                raise Overloaded('Too many concurrent requests, threads are reserved for point reads', 429)
+            self.used += 1
+
+    def give(self):
+        with self._lock:
+            self.used -= 1
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {'active': self.used, 'waiting': 0, 'rejected': self.rejected, 'timed_out': 0}
+
+
+limiters = {
+    'point': RouteLimiter('point', ADMISSION_POINT_CONCURRENCY, ADMISSION_POINT_QUEUE, ADMISSION_QUEUE_TIMEOUT_MS / 1000, ADMISSION_POINT_DEADLINE_MS / 1000),
+    'default': RouteLimiter('default', ADMISSION_DEFAULT_CONCURRENCY, ADMISSION_DEFAULT_QUEUE, ADMISSION_QUEUE_TIMEOUT_MS / 1000, ADMISSION_DEFAULT_DEADLINE_MS / 1000),
+    'bulk': RouteLimiter('bulk', ADMISSION_BULK_CONCURRENCY, ADMISSION_BULK_QUEUE, ADMISSION_QUEUE_TIMEOUT_MS / 1000, ADMISSION_BULK_DEADLINE_MS / 1000),
+    'export': RouteLimiter('export', ADMISSION_EXPORT_CONCURRENCY, ADMISSION_EXPORT_QUEUE, ADMISSION_QUEUE_TIMEOUT_MS / 1000, ADMISSION_EXPORT_DEADLINE_MS / 1000),
+    'search': RouteLimiter('search', ADMISSION_SEARCH_CONCURRENCY, ADMISSION_SEARCH_QUEUE, ADMISSION_QUEUE_TIMEOUT_MS / 1000, ADMISSION_SEARCH_DEADLINE_MS / 1000),
+}
+# Остаток потоков после ADMISSION_POINT_RESERVED делят все полосы, кроме point
+shared_budget = ThreadBudget(max(1, WEB_THREADS - ADMISSION_POINT_RESERVED))
+
+registry.gauge(
+    'admission', 'Запросы по классам нагрузки: выполняются, ждут, отклонены сразу, не дождались места', ('lane', 'stat'),
+    lambda: {
+        (name, stat): value
+        for name, limiter in [*limiters.items(), ('shared', shared_budget)]
+        for stat, value in limiter.stats().items()
+    }
+)
+
+
+def route_class() -> str | None:
+    if request.url_rule is None or request.path.startswith(EXEMPT_PREFIXES):
+        return None
+    return ROUTE_CLASSES.get((request.method, request.url_rule.rule), 'default')
+
+
+def is_deadline_error(e: Exception) -> bool:
+    """Монга не уложилась в срок запроса: maxTimeMS, таймаут сокета, ожидание соединения или выбор сервера"""
+    return isinstance(e, PyMongoError) and e.timeout
+
+
+def admit_request(name: str):
+    """
+    Занимает место в полосе, а для всех полос кроме point еще и в общем бюджете потоков
+
+    :return: Функция, которая освобождает все занятое. Повторные вызовы ничего не делают
+    :raises Overloaded: Бюджет или очередь полосы заполнены, или место не освободилось вовремя
+    """
+    limiter = limiters[name]
+    shared = name != 'point'
+    if shared:
+        shared_budget.take()
+    try:
+        limiter.acquire()
+    except Overloaded:
+        if shared:
+            shared_budget.give()
+        raise
+
+    once = threading.Lock()
+
+    def release():
+        if not once.acquire(blocking=False):
+            return
+        limiter.release()
+        if shared:
+            shared_budget.give()
+    return release
+
+
+def init_admission(app: Flask):
+    """
+    Подключает ограничение нагрузки: перед запросом занимает место в полосе его класса, после ответа освобождает.
+    Потоковые ответы держат место до конца отдачи. Срок запроса передается в монгу через pymongo.timeout,
+    и драйвер сам проставляет maxTimeMS каждой команде. Если монга не успела, ответ 503.
+    Срок действует только до выхода из view: курсор потоковой выгрузки читается после teardown_request, без срока.
+    Ограничения считаются на процесс: у каждого воркера gunicorn свои полосы.
+    """
+    if not ADMISSION_ENABLED:
+        return
+
+    @app.before_request
+    def admit():
+        name = route_class()
+        if name is None:
+            return None
+        try:
+            g.admission_release = admit_request(name)
+        except Overloaded as e:
+            return Error(error=str(e)).model_dump(exclude_none=True), e.status_code, {'Retry-After': str(ADMISSION_RETRY_AFTER)}
+        deadline = limiters[name].deadline
+        if deadline:
+            g.admission_timeout = pymongo.timeout(deadline)
+            g.admission_timeout.__enter__()
+        return None
+
+    @app.after_request
+    def hold_for_stream(response):
+        release = g.pop('admission_release', None)
+        if release is not None:
+            if response.is_streamed:
+                # выгрузка идет после выхода из view, место освобождается, когда сервер закроет тело ответа.
+                # На Response.close полагаться нельзя: для direct_passthrough (send_file) сервер получает
+                # response.response как есть и закрывает только его
+                response.response = ClosingIterator(response.response, release)
+            else:
+                release()
+        return response
+
+    @app.teardown_request
+    def release(exception=None):
+        timeout = g.pop('admission_timeout', None)
+        if timeout is not None:
+            timeout.__exit__(None, None, None)
+        # after_request не вызывается, если view упал
+        release = g.pop('admission_release', None)
+        if release is not None:
+            release()
+
+    # Flask-RESTful перехватывает исключения ресурсов раньше обработчиков app.errorhandler, поэтому таймауты монги
+    # разбираются до него
+    handle_user_exception = app.handle_user_exception
+
+    def handle_deadline(e):
+        if is_deadline_error(e):
+            response = make_response(Error(error='Request deadline exceeded').model_dump(exclude_none=True), 503)
+            response.headers['Retry-After'] = str(ADMISSION_RETRY_AFTER)
+            return response
+        return handle_user_exception(e)
+
+    app.handle_user_exception = handle_deadline
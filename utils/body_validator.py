@@ -0,0 +1,77 @@
+from functools import lru_cache
+from typing import TypeVar
+
+from flask import g, request
+from pydantic import BaseModel, TypeAdapter, ValidationError
+
+from config import MAX_REQUEST_BODY_SIZE
+from handler.base_models import Error
+from utils.db_connector.errors import RequestBodyTooLargeError
+
+Model = TypeVar('Model', bound=BaseModel)
+
+
+@lru_cache(maxsize=None)
+def type_adapter(model: type[Model]) -> TypeAdapter:
+    """TypeAdapter строит валидатор один раз на модель, дальше он переиспользуется"""
+    return TypeAdapter(model)
+
+
+class BodyValidator:
+    """
+    Валидация тела запроса прямо из байтов: pydantic разбирает json и проверяет модель за один проход,
+    без промежуточных словарей из request.get_json()
+    """
+
+    @staticmethod
+    def check_size(size: int | None, max_size: int = MAX_REQUEST_BODY_SIZE):
+        if size is not None and size > max_size:
+            raise RequestBodyTooLargeError(f'Request body is larger than {max_size} bytes')
+
+    @staticmethod
+    def validate(model: type[Model], body: bytes) -> Model | Error:
+        """
+        :param model: Модель запроса
+        :param body: Сырое тело запроса
+        :return: Модель или Error с ошибкой по каждому полю
+        """
+        try:
+            return type_adapter(model).validate_json(body)
+        except ValidationError as e:
+            return Error(
+                error='Invalid request body',
+                fields={'.'.join(str(part) for part in error['loc']) or 'body': error['msg'] for error in e.errors()}
+            )
+
+    @classmethod
+    def read_request(cls, max_size: int = MAX_REQUEST_BODY_SIZE) -> bytes:
+        """
+        Тело текущего запроса Flask. Размер проверяется по Content-Length до чтения, а без него (chunked)
+        читается не больше max_size + 1 байт. Прочитанное тело запоминается на время запроса
+
+        :raises RequestBodyTooLargeError: Тело больше max_size
+        """
+        body = g.get('request_body')
+        if body is not None:
+            return body
+        cls.check_size(request.content_length, max_size)
+        chunks = []
+        size = 0
+        while size <= max_size:
+            chunk = request.stream.read(min(64 * 1024, max_size + 1 - size))
+            if not chunk:
+                break
+            chunks.append(chunk)
+            size += len(chunk)
+        cls.check_size(size, max_size)
+        g.request_body = b''.join(chunks)
+        return g.request_body
+
+    @classmethod
+    def validate_request(cls, model: type[Model], max_size: int = MAX_REQUEST_BODY_SIZE) -> Model | Error:
+        """
+        Тело текущего запроса Flask, прочитанное read_request
+
+        :raises RequestBodyTooLargeError: Тело больше max_size
+        """
+        return cls.validate(model, cls.read_request(max_size))
@@ -1,20 +1,123 @@
+from pymongo import ReturnDocument
+
 from utils.db_connector.base_structures import *
-from .models import ArticleShortModel
+from .models import ArticleShortModel, ArticlePartialModel
+from utils.metrics import span
+from config import WRITE_COALESCING, TEXT_SEARCH_LANGUAGE
+
+
+EPOCH = datetime.datetime(1970, 1, 1)
 
 
 class Article(AccountPostBaseModel):
     title: str
     text: str
 
+    not_deleted_filter: ClassVar[dict] = {'system.status': {'$ne': StatusEnum.DELETED.value}}
+
     collection_name: ClassVar[str] = MongoCollectionsEnum.ARTICLES
+    indexes: ClassVar[list[IndexSpec]] = [
+        IndexSpec(
+            name='valid_by_id',
+            keys=[('system.status', 1), ('_id', 1)],
+            partial_filter={'system.status': StatusEnum.VALID.value}
+        ),
+        IndexSpec(
+            name='valid_by_update_document',
+            keys=[('system.status', 1), ('system.update_document', 1), ('_id', 1)],
+            partial_filter={'system.status': StatusEnum.VALID.value}
+        ),
+        # Лента изменений идет по всем статусам, включая удаленные
+        IndexSpec(
+            name='changes_by_update_document',
+            keys=[('system.update_document', 1), ('_id', 1)]
+        ),
+        # Полнотекстовый поиск только по действующим статьям, совпадение в заголовке весит больше
+        IndexSpec(
+            name='valid_text',
+            keys=[('title', 'text'), ('text', 'text')],
+            partial_filter={'system.status': StatusEnum.VALID.value},
+            weights={'title': 3, 'text': 1},
+            default_language=TEXT_SEARCH_LANGUAGE
+        ),
+    ]
+    queries: ClassVar[list[QueryShape]] = [
+        QueryShape(name='get_by_id', equality={'_id': None}),
+        QueryShape(name='export_valid', equality={'system.status': StatusEnum.VALID.value}),
+        QueryShape(name='list_valid_by_id', equality={'system.status': StatusEnum.VALID.value}, sort=['_id'], range=['_id']),
+        QueryShape(
+            name='list_valid_by_update_document',
+            equality={'system.status': StatusEnum.VALID.value},
+            sort=['system.update_document', '_id'],
+            range=['system.update_document', '_id']
+        ),
+        QueryShape(name='changes_since', sort=['system.update_document', '_id'], range=['system.update_document', '_id']),
+        QueryShape(name='search_valid', equality={'system.status': StatusEnum.VALID.value}, text=['title', 'text']),
+    ]
+    # Поля ArticleShortModel и пути к ним в документе монги
+    short_fields: ClassVar[dict[str, str]] = {
+        'id': '_id',
+        'title': 'title',
+        'text': 'text',
+        'status': 'system.status',
+    }
 
     @classmethod
-    def get(cls, object_id):
-        collection = cls._db[cls.collection_name]
-        document = collection.find_one({"_id": ObjectId(object_id)})
-        if document:
+    def get(cls, object_id, fields: list[str] = None):
+        document = cls.get_document(object_id, fields)
+        if fields:
+            return cls.from_projection(document, fields)
+        with span('article_init'):
             return cls(**document)
-        raise UndefinedDocumentType
+
+    @classmethod
+    def get_document(cls, object_id, fields: list[str] = None) -> dict:
+        """Сырой документ статьи без создания моделей, для выдачи только на чтение"""
+        document = find_cached_document(
+            cls._db[cls.collection_name],
+            ObjectId(object_id),
+            projection=cls.projection(fields) if fields else None
+        )
+        if not document or cls.is_deleted(document):
+            raise UndefinedDocumentType
+        return document
+
+    @classmethod
+    async def aget(cls, object_id, fields: list[str] = None):
+        document = await afind_cached_document(
+            get_async_db()[cls.collection_name],
+            ObjectId(object_id),
+            projection=cls.projection(fields) if fields else None
+        )
+        if not document or cls.is_deleted(document):
+            raise UndefinedDocumentType
+        if fields:
+            return cls.from_projection(document, fields)
+        with span('article_init'):
+            return cls(**document)
+
+    @classmethod
+    def projection(cls, fields: list[str] = None) -> dict:
+        """
+        Проекция монги для полей ArticleShortModel
+
+        :param fields: Нужные поля, по умолчанию все поля короткой модели
+        """
+        fields = fields or list(cls.short_fields)
+        unknown = [field for field in fields if field not in cls.short_fields]
+        if unknown:
+            raise InvalidFieldsError(f"Fields not support: {', '.join(unknown)}")
+        projection = {cls.short_fields[field]: 1 for field in fields}
+        # версия нужна для ETag при любом наборе полей
+        projection['system.update_document'] = 1
+        projection['system.status'] = 1
+        if '_id' not in projection:
+            projection['_id'] = 0
+        return projection
+
+    @classmethod
+    def from_projection(cls, document: dict, fields: list[str]) -> ArticlePartialModel:
+        return ArticlePartialModel(**{field: get_document_path(document, cls.short_fields[field]) for field in fields})
 
     @classmethod
     def create(cls, title: str, text: str) -> object:
@@ -22,9 +125,21 @@ class Article(AccountPostBaseModel):
             title=title,
             text=text
         )
-        user.save()
+        if WRITE_COALESCING:
+            user.insert_coalesced()
+        else:
+            user.save()
         return user
 
+    @classmethod
+    async def acreate(cls, title: str, text: str) -> object:
+        article = cls(
+            title=title,
+            text=text
+        )
+        await article.asave()
+        return article
+
     def get_short_model(self) -> ArticleShortModel:
         return ArticleShortModel(
             id=self.id,
@@ -33,14 +148,166 @@ class Article(AccountPostBaseModel):
             status=self.system.status
         )
 
+    @classmethod
+    def short_document(cls, document: dict, fields: list[str] = None) -> dict:
+        """Плоское представление ArticleShortModel прямо из документа монги, без создания моделей"""
+        row = {field: get_document_path(document, cls.short_fields[field]) for field in fields or cls.short_fields}
+        if row.get('id') is not None:
+            row['id'] = str(row['id'])
+        return row
+
+    @classmethod
+    def short_json(cls, document: dict, fields: list[str] = None) -> dict:
+        """short_document для json ответа: как model_dump(exclude_none=True) у ArticleShortModel"""
+        return {key: value for key, value in cls.short_document(document, fields).items() if value is not None}
+
     # @MongoDBModel.mongo_transaction()
     # Можно использовать транзакции, если база монги поднятя в формате rs0 (нод)
-    def update(self, title: str = None, text: str = None):
+    def update(self, title: str = None, text: str = None, session=None):
         if title:
             self.title = title
         if text:
             self.text = text
-        self.save()
+        self.save(session=session)
+
+    @classmethod
+    def update_by_id(cls, object_id, title: str = None, text: str = None, if_match: list[str] = None):
+        """
+        Обновление одним запросом find_one_and_update, без предварительного чтения статьи
+
+        :param if_match: ETag из If-Match. Статья обновится, только если ее версия совпадает с одним из них
+        :return: Статья после обновления
+        """
+        object_id = ObjectId(object_id)
+        changes = {'system.update_document': utcnow_ms()}
+        if title:
+            changes['title'] = title
+        if text:
+            changes['text'] = text
+        document = cls._db[cls.collection_name].find_one_and_update(
+            {'_id': object_id, **cls.not_deleted_filter, **cls.version_filter(if_match)},
+            {'$set': changes},
+            return_document=ReturnDocument.AFTER
+        )
+        if document is None:
+            cls._raise_write_miss(object_id, if_match)
+        invalidate_document(cls.collection_name, document['_id'])
+        with span('article_init'):
+            return cls(**document)
+
+    @classmethod
+    def delete_by_id(cls, object_id, if_match: list[str] = None):
+        """
+        Мягкое удаление одним запросом update_one: статья получает статус deleted и новую дату обновления,
+        поэтому попадает в ленту изменений. Отсутствие статьи определяется по matched_count
+
+        :param if_match: ETag из If-Match, как в update_by_id
+        """
+        object_id = ObjectId(object_id)
+        result = cls._db[cls.collection_name].update_one(
+            {'_id': object_id, **cls.not_deleted_filter, **cls.version_filter(if_match)},
+            {'$set': cls.delete_changes()}
+        )
+        if result.matched_count == 0:
+            cls._raise_write_miss(object_id, if_match)
+        invalidate_document(cls.collection_name, object_id)
+
+    @staticmethod
+    def delete_changes() -> dict:
+        return {'system.status': StatusEnum.DELETED.value, 'system.update_document': utcnow_ms()}
+
+    @staticmethod
+    def is_deleted(document: dict) -> bool:
+        return get_document_path(document, 'system.status') == StatusEnum.DELETED
+
+    @staticmethod
+    def etag(document: dict) -> str:
+        """
+        ETag статьи - system.update_document в миллисекундах от эпохи. Меняется при каждой записи,
+        для документов без даты обновления равен 0
+        """
+        version = get_document_path(document, 'system.update_document')
+        if version is None:
+            return '0'
+        return str((version.replace(tzinfo=None) - EPOCH) // datetime.timedelta(milliseconds=1))
+
+    @staticmethod
+    def version_filter(tags: list[str] = None) -> dict:
+        """
+        Условие на версию документа для If-Match. Пустой список или * - без условия,
+        нераспознанные ETag не совпадают ни с одной версией
+        """
+        if not tags or '*' in tags:
+            return {}
+        versions = []
+        for tag in tags:
+            if tag == '0':
+                versions.append(None)
+            elif tag.isdigit():
+                versions.append(EPOCH + datetime.timedelta(milliseconds=int(tag)))
+        return {'system.update_document': {'$in': versions}}
+
+    @classmethod
+    def get_etag(cls, object_id) -> str:
+        """
+        ETag статьи без чтения всего документа, проекцией только на версию. Кэш не используется: он свой у каждого воркера,
+        и запись через другой воркер его не сбрасывает, поэтому по нему можно ответить 304 на уже замененную версию
+        """
+        document = cls._db[cls.collection_name].find_one(
+            {'_id': ObjectId(object_id)},
+            projection={'system.update_document': 1, 'system.status': 1}
+        )
+        if not document or cls.is_deleted(document):
+            raise UndefinedDocumentType
+        return cls.etag(document)
+
+    @classmethod
+    def _raise_write_miss(cls, object_id: ObjectId, if_match: list[str] = None):
+        """Запись ничего не нашла: если статья есть, значит не совпала версия из If-Match"""
+        if cls.version_filter(if_match) and cls._db[cls.collection_name].find_one({'_id': object_id, **cls.not_deleted_filter}, projection={'_id': 1}):
+            raise PreconditionFailedError
+        raise UndefinedDocumentType
+
+    async def aupdate(self, title: str = None, text: str = None):
+        if title:
+            self.title = title
+        if text:
+            self.text = text
+        await self.asave()
+
+    @classmethod
+    def bulk(cls, creates: list[tuple[str, str]] = (), updates: list[tuple[ObjectId, str, str]] = (), deletes: list[ObjectId] = ()) -> list[dict]:
+        """
+        Пакетное создание, обновление и удаление статей одним bulk_write
+
+        :param creates: Пары title, text новых статей
+        :param updates: Тройки _id, title, text. Пустые title и text не меняются, как в update
+        :param deletes: _id удаляемых статей, удаление мягкое, как в delete_by_id
+        :return: Результат по каждой операции из ObjectBroker.bulk
+        """
+        from utils.db_connector.brokers.objects import ObjectBroker
+
+        update_document = utcnow_ms()
+        documents = []
+        for title, text in creates:
+            article = cls(title=title, text=text)
+            article.system.update_document = update_document
+            documents.append(article.to_dict())
+
+        changes = []
+        for object_id, title, text in updates:
+            change = {'system.update_document': update_document}
+            if title:
+                change['title'] = title
+            if text:
+                change['text'] = text
+            changes.append((object_id, change))
+
+        return ObjectBroker(cls.collection_name).bulk(
+            documents, changes, list(deletes),
+            soft_delete=cls.delete_changes(),
+            exclude={'system.status': StatusEnum.DELETED.value}
+        )
 
     @classmethod
     def example(cls):
@@ -5,4 +5,12 @@ class ArticleShortModel(BaseModel):
     id: Annotated[ObjectId, ObjectIdPydanticAnnotation]
     title: str
     text: str
-    status: str
\ No newline at end of file
+    status: str
+
+
+class ArticlePartialModel(BaseModel):
+    """Часть ArticleShortModel для выдачи с проекцией, валидируются только пришедшие поля"""
+    id: Annotated[ObjectId, ObjectIdPydanticAnnotation] = None
+    title: str = None
+    text: str = None
+    status: str = None
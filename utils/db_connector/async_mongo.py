@@ -0,0 +1,75 @@
+import os
+
+from bson import ObjectId
+
+from config import *
+from .cache import get_document_cache, cache_key, invalidate_document, begin_fill, finish_fill
+from .client import client_options
+
+_client = None
+_client_pid = None
+
+
+def get_async_client():
+    """
+    Клиент motor для асинхронного режима. Создается при первом обращении внутри воркера,
+    motor импортируется только здесь, чтобы синхронный режим от него не зависел.
+    """
+    global _client, _client_pid
+    if _client is None or _client_pid != os.getpid():
+        from motor.motor_asyncio import AsyncIOMotorClient
+
+        _client = AsyncIOMotorClient(MONGO_DB_URI, **client_options())
+        _client_pid = os.getpid()
+    return _client
+
+
+def get_async_db():
+    return get_async_client()[MONGO_DB_NAME]
+
+
+async def afind_cached_document(collection, object_id: ObjectId, projection: dict = None) -> dict | None:
+    """Асинхронный find_cached_document: тот же кэш документов, чтение из монги через motor"""
+    cache = get_document_cache()
+    key = cache_key(collection.name, object_id)
+    document = cache.get(key)
+    if document is not None:
+        return document
+    if projection is not None:
+        return await collection.find_one({"_id": object_id}, projection=projection)
+    generation = begin_fill(key)
+    document = None
+    try:
+        document = await collection.find_one({"_id": object_id})
+    finally:
+        finish_fill(key, generation, document)
+    return document
+
+
+class AsyncMongoDBModel:
+    """Асинхронные аналоги save, soft_delete и full_delete из MongoDBModel"""
+
+    @property
+    def async_collection(self):
+        return get_async_db()[self.collection_name]
+
+    async def asave(self, remove_none=True):
+        document, update = self._prepare_save(remove_none)
+        if document is not None:
+            result = await self.async_collection.insert_one(document)
+            self.id = result.inserted_id
+        elif update:
+            await self.async_collection.update_one({'_id': self.id}, update)
+            invalidate_document(self.collection_name, self.id)
+        self._changed_fields.clear()
+
+    async def asoft_delete(self):
+        from .base_structures import StatusEnum
+
+        self.system.status = StatusEnum.DELETED
+        await self.asave()
+
+    async def afull_delete(self):
+        await self.async_collection.delete_one({"_id": self.id})
+        invalidate_document(self.collection_name, self.id)
+        return None
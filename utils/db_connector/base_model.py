@@ -6,9 +6,17 @@ from typing import Annotated, Any, ClassVar
 from pymongo import MongoClient
 from bson import ObjectId
 from config import *
+from .cache import invalidate_document
+from .client import LazyClientAttribute, get_client, get_db
 import datetime
 
 
+def utcnow_ms() -> datetime.datetime:
+    """Текущее время UTC с точностью до миллисекунд, как его хранит монга: версия документа не меняется после чтения"""
+    now = datetime.datetime.utcnow()
+    return now.replace(microsecond=now.microsecond // 1000 * 1000)
+
+
 class ObjectIdPydanticAnnotation:
     @classmethod
     def validate_object_id(cls, v: Any, handler) -> ObjectId:
@@ -36,8 +44,11 @@ class ObjectIdPydanticAnnotation:
 
 
 class MongoDBModel:
-    _client: ClassVar[MongoClient] = MongoClient(MONGO_DB_URI)
-    _db: ClassVar = _client[MONGO_DB_NAME]
+    _client: ClassVar[MongoClient] = LazyClientAttribute(get_client)
+    _db: ClassVar = LazyClientAttribute(get_db)
+    # Индексы коллекции (IndexSpec) и формы запросов (QueryShape) модели, создаются через indexes.ensure_indexes
+    indexes: ClassVar[list] = []
+    queries: ClassVar[list] = []
 
     @property
     def collection(self):
@@ -45,26 +56,80 @@ class MongoDBModel:
             self._collection: ClassVar = self._db[self.collection_name]
         return self._collection
 
-    def save(self, remove_none=True):
+    def save(self, remove_none=True, session=None):
+        """
+        Новый документ вставляется целиком, у существующего пишутся только измененные поля.
+
+        :param session: Сессия монги, передается только при работе внутри транзакции (mongo_transaction)
+        """
+        document, update = self._prepare_save(remove_none)
+        if document is not None:
+            result = self.collection.insert_one(document, session=session)
+            self.id = result.inserted_id
+        elif update:
+            self.collection.update_one({'_id': self.id}, update, session=session)
+            invalidate_document(self.collection_name, self.id)
+        self._changed_fields.clear()
+
+    def insert_coalesced(self):
+        """
+        Вставка нового документа через WriteCoalescer: вместе с вставками из других потоков одним insert_many.
+        Ошибка вставки этого документа пробрасывается так же, как из insert_one
+        """
+        from .coalescer import get_coalescer
+
+        document, _ = self._prepare_save()
+        if document is None:
+            raise ValueError('insert_coalesced is only for new documents, use save')
+        self.id = get_coalescer(self.collection_name).insert(document)
+        self._changed_fields.clear()
+
+    def _mark_changed(self, path: str):
+        """Отмечает поле для записи в следующем save. Для вложенных полей путь через точку: system.status"""
+        self._changed_fields.add(path)
+
+    def _prepare_save(self, remove_none=True) -> tuple[dict | None, dict]:
+        """
+        Общая часть save для синхронной и асинхронной записи
+
+        :return: Весь документ, если он новый, иначе None, и $set/$unset только по измененным полям
+        """
         if hasattr(self, 'system') and hasattr(self.system, 'update_document'):
-            self.system.update_document = datetime.datetime.utcnow()
-        with self._client.start_session() as session:
-            # with session.start_transaction():
-            current_data = self.to_dict(remove_none)
-            if current_data.get("id") is not None:
-                changes = {k: v for k, v in current_data.items() if self._original_data.get(k) != v}
-                if changes:
-                    self.collection.update_one({'_id': self.id}, {'$set': changes}, session=session)
-                self._original_data = current_data
+            self.system.update_document = utcnow_ms()
+            self._mark_changed('system.update_document')
+        if self.id is None:
+            return self.to_dict(remove_none), {}
+
+        to_set, to_unset = {}, {}
+        for path in self._changed_fields:
+            name, _, nested = path.partition('.')
+            value = getattr(self, name)
+            for attribute in nested.split('.') if nested else []:
+                value = getattr(value, attribute)
+            field = self.model_fields.get(name)
+            key = (field.alias or name) if field is not None else name
+            if nested:
+                key = f'{key}.{nested}'
+            if value is None and remove_none:
+                to_unset[key] = ''
             else:
-                result = self.collection.insert_one(current_data, session=session)
-                self.id = result.inserted_id
-                self._original_data = current_data
+                to_set[key] = self.serialize(value, remove_none)
+
+        # Если поле изменено целиком, отдельные вложенные пути внутри него не нужны, иначе монга вернет конфликт
+        for key in list(to_set):
+            if any(key.startswith(f'{parent}.') for parent in to_set if parent != key):
+                del to_set[key]
+        update = {}
+        if to_set:
+            update['$set'] = to_set
+        if to_unset:
+            update['$unset'] = to_unset
+        return None, update
 
     def to_dict(self, remove_none=True):
         result = {}
         for attribute, value in self.__dict__.items():
-            if value is not None and attribute not in ['_client', '_db', '_collection', '_original_data', '_mongo_model']:
+            if value is not None and attribute not in ['_client', '_db', '_collection', '_changed_fields', '_mongo_model']:
                 key = attribute
                 if attribute[-1] == '_':
                     key = attribute[0:-1]
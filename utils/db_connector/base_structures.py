@@ -1,8 +1,11 @@
 import datetime
 
-from pydantic import BaseModel, Field, create_model, NonNegativeInt, model_validator
+from pydantic import BaseModel, Field, PrivateAttr, create_model, NonNegativeInt, model_validator
 from bson.objectid import ObjectId
-from .base_model import MongoDBModel
+from .base_model import MongoDBModel, utcnow_ms
+from .cache import find_cached_document, invalidate_document
+from .async_mongo import AsyncMongoDBModel, afind_cached_document, get_async_db
+from .indexes import IndexSpec, QueryShape
 from utils.db_connector.base_model import ObjectIdPydanticAnnotation
 # from . import articles
 from .errors import *
@@ -12,6 +15,7 @@ from enum import Enum
 
 class MongoCollectionsEnum(str, Enum):
     ARTICLES = 'Articles'
+    IDEMPOTENCY_KEYS = 'IdempotencyKeys'
 
     @classmethod
     def contains(cls, value):
@@ -28,17 +32,73 @@ class StatusEnum(str, Enum):
         return value in cls._value2member_map_
 
 
-class System(BaseModel):
+def get_document_path(document: dict, path: str):
+    """Значение из документа монги по пути через точку, например system.status"""
+    value = document
+    for key in path.split('.'):
+        if not isinstance(value, dict):
+            return None
+        value = value.get(key)
+    return value
+
+
+class OwnerLink:
+    """Ссылка вложенной модели на владельца. Глубокая копия модели получается без владельца, а не с копией документа"""
+    __slots__ = ('owner', 'field')
+
+    def __init__(self, owner, field: str):
+        self.owner = owner
+        self.field = field
+
+    def __deepcopy__(self, memo):
+        return None
+
+
+class TrackedModel(BaseModel):
+    """
+    Вложенная модель документа, которая сообщает владельцу о присвоенных полях. Так save пишет
+    article.system.status = ... как $set по пути system.status без ручного _mark_changed
+    """
+    # Владелец (документ или другая вложенная модель) и имя поля, в котором лежит эта модель
+    _owner_link: OwnerLink | None = PrivateAttr(default=None)
+
+    def _bind(self, owner, field: str):
+        self._owner_link = OwnerLink(owner, field)
+        for name in self.model_fields:
+            value = getattr(self, name)
+            if isinstance(value, TrackedModel):
+                value._bind(self, name)
+
+    def _mark_changed(self, path: str):
+        if self._owner_link is not None:
+            self._owner_link.owner._mark_changed(f'{self._owner_link.field}.{path}')
+
+    def __setattr__(self, name: str, value: Any) -> None:
+        super().__setattr__(name, value)
+        if name in self.model_fields:
+            if isinstance(value, TrackedModel):
+                value._bind(self, name)
+            self._mark_changed(name)
+
+    def __eq__(self, other: Any) -> bool:
+        # pydantic сравнивает и приватные атрибуты, владелец в сравнение не входит
+        if not isinstance(other, BaseModel):
+            return NotImplemented
+        return type(self) is type(other) and self.__dict__ == other.__dict__
+
+
+class System(TrackedModel):
     status: StatusEnum = Field(default=StatusEnum.VALID)
     update_document: datetime.datetime = Field(
         default=datetime.datetime.utcnow())
 
 
-class AccountPostBaseModel(BaseModel, MongoDBModel):
+class AccountPostBaseModel(BaseModel, MongoDBModel, AsyncMongoDBModel):
     system: System = Field(default_factory=System)
     id: Annotated[ObjectId, ObjectIdPydanticAnnotation] = Field(
         default=None, alias='_id')
-    _original_data = None
+    # Поля, присвоенные после загрузки или прошлого save. По ним save собирает $set
+    _changed_fields: set[str] = PrivateAttr(default_factory=set)
 
     @property
     def created_at(self):
@@ -47,8 +107,27 @@ class AccountPostBaseModel(BaseModel, MongoDBModel):
         return int(self.id.generation_time.timestamp())
 
     def model_post_init(self, __context: Any) -> None:
-        self._original_data = self.model_dump(exclude_none=True)
         self._init_mongo()
+        self._bind_nested()
+
+    def __deepcopy__(self, memo: dict | None = None):
+        copied = super().__deepcopy__(memo)
+        # копии вложенных моделей приходят без владельца
+        copied._bind_nested()
+        return copied
+
+    def _bind_nested(self):
+        for name in self.model_fields:
+            value = getattr(self, name)
+            if isinstance(value, TrackedModel):
+                value._bind(self, name)
+
+    def __setattr__(self, name: str, value: Any) -> None:
+        super().__setattr__(name, value)
+        if name in self.model_fields:
+            if isinstance(value, TrackedModel):
+                value._bind(self, name)
+            self._changed_fields.add(name)
 
     def _init_mongo(self):
         self._mongo_model: ClassVar = MongoDBModel()
@@ -62,13 +141,22 @@ class AccountPostBaseModel(BaseModel, MongoDBModel):
 
     @classmethod
     def get(cls, object_id):
-        collection = cls._db[cls.collection_name]
-        document = collection.find_one({"_id": ObjectId(object_id)})
-        if document:
+        document = find_cached_document(cls._db[cls.collection_name], ObjectId(object_id))
+        if document and get_document_path(document, 'system.status') != StatusEnum.DELETED:
             return cls(**document)
         return None
 
+    def soft_delete(self):
+        """
+        Удаление с пометкой system.status = deleted. Документ остается в коллекции с новой датой обновления,
+        чтобы лента изменений сообщила об удалении
+        """
+        self.system.status = StatusEnum.DELETED
+        self.save()
+
     def full_delete(self):
+        """Физическое удаление без следа в ленте изменений, для очистки старых удаленных документов"""
         document = self.collection.delete_one({"_id": self.id})
+        invalidate_document(self.collection_name, self.id)
         return None
 
@@ -0,0 +1,61 @@
+from __future__ import annotations
+from bson.objectid import ObjectId
+from bson.errors import InvalidId
+from utils.db_connector.errors import *
+from config import *
+
+from utils.db_connector.articles import Article
+from utils.db_connector.base_structures import MongoCollectionsEnum
+from ..async_mongo import get_async_db, afind_cached_document
+from .objects import ObjectBroker
+from .pagination import keyset_filter, keyset_sort, encode_token
+
+
+class AsyncObjectBroker(ObjectBroker):
+    """Асинхронный ObjectBroker на motor. Разбор документов по моделям и проекции общие с синхронным"""
+
+    def __init__(self, collection_name: MongoCollectionsEnum):
+        self.collection_name = collection_name
+        self.collection = get_async_db()[collection_name]
+
+    async def list_page(self, filter: dict = dict(), limit: int = PAGE_DEFAULT_LIMIT, after: str = None, order_by: str = '_id', required_class: any[Article] = None, fields: list[str] = None) -> tuple[list[Article], str | None]:
+        """Асинхронный ObjectBroker.list_page"""
+        page_filter = filter
+        if after:
+            page_filter = {'$and': [filter, keyset_filter(order_by, after)]} if filter else keyset_filter(order_by, after)
+        projection = self._projection(fields)
+        if projection:
+            projection = {**projection, '_id': 1, order_by: 1}
+        cursor = self.collection.find(filter=page_filter, projection=projection, sort=keyset_sort(order_by), limit=limit + 1)
+        documents = await cursor.to_list(length=limit + 1)
+        next_token = None
+        if len(documents) > limit:
+            documents = documents[:limit]
+            next_token = encode_token(order_by, documents[-1])
+
+        temp = []
+        for document in documents:
+            obj = self._create_instance_from_document(document, fields)
+            if required_class is not None and not isinstance(obj, required_class):
+                continue
+            temp.append(obj)
+        return temp, next_token
+
+    async def iter_documents(self, filter: dict = dict(), projection: dict = None, sort_by: dict = dict(), batch_size: int = EXPORT_BATCH_SIZE):
+        """Асинхронный генератор сырых документов, курсор читается пачками по batch_size"""
+        cursor = self.collection.find(filter=filter, projection=projection, sort=sort_by or None, batch_size=batch_size)
+        try:
+            async for document in cursor:
+                yield document
+        finally:
+            await cursor.close()
+
+    async def find_object_by_id(self, object_id, fields: list[str] = None) -> any[Article]:
+        """Асинхронный ObjectBroker.find_object_by_id"""
+        try:
+            document = await afind_cached_document(self.collection, ObjectId(object_id), projection=self._projection(fields))
+            if document is None or self._is_deleted(document):
+                raise RootNotFoundError
+            return self._create_instance_from_document(document, fields)
+        except InvalidId:
+            raise InvalidObjectId
@@ -1,25 +1,33 @@
 
 from __future__ import annotations
+import datetime
+import hashlib
 from bson.objectid import ObjectId
 from bson.errors import InvalidId
-from pymongo import MongoClient
+from pymongo import InsertOne, UpdateOne, DeleteOne
+from pymongo.errors import BulkWriteError
 from utils.db_connector.errors import *
 from config import *
 
 from utils.db_connector.articles import Article
 from utils.db_connector.base_structures import MongoCollectionsEnum
 from ..filter_builder import FilterBuilder
+from ..cache import find_cached_document, invalidate_document
+from ..client import LazyClientAttribute, get_client, get_db
+from .pagination import keyset_filter, keyset_sort, encode_token
+from .search import snippet_expression
+from utils.metrics import span
 
 
 class ObjectBroker:
-    _client = MongoClient(MONGO_DB_URI)
-    _db = _client[MONGO_DB_NAME]
+    _client = LazyClientAttribute(get_client)
+    _db = LazyClientAttribute(get_db)
 
     def __init__(self, collection_name: MongoCollectionsEnum):
         self.collection_name = collection_name
         self.collection = self._db[collection_name]
 
-    def list_objects(self, filter: dict = dict(), skip: int = 0, limit: int = 0, required_class: any[Article] = None, sort_by: dict=dict(), randomizer=False, randomizer_size=0) -> list[Article] | list:
+    def list_objects(self, filter: dict = dict(), skip: int = 0, limit: int = 0, required_class: any[Article] = None, sort_by: dict=dict(), randomizer=False, randomizer_size=0, fields: list[str] = None) -> list[Article] | list:
         """
         Метод отдает массив найденных объектов в бд, при этом раскидывает в нужные нам модели записей.
 
@@ -27,8 +35,10 @@ class ObjectBroker:
         :param skip: Какое количество записей будет пропущено
         :param limit: Количество выводимых записей
         :param required_class: Можно задать, какой класс нам не обходим на выходе. По итогу у нас будет массив только с указанными элементами
+        :param fields: Забрать из монги только эти поля, на выходе будут частичные модели
         :return: Возвращает массив найденных элементов
         """
+        projection = self._projection(fields)
         if randomizer:
             pipeline = [
                 {'$match': filter},
@@ -36,12 +46,14 @@ class ObjectBroker:
             ]
             if sort_by:
                 pipeline.insert(1, {'$sort': sort_by})
+            if projection:
+                pipeline.append({'$project': projection})
             documents = self.collection.aggregate(pipeline)
         else:
-            documents = self.collection.find(filter=filter, sort=sort_by, limit=limit, skip=skip)
+            documents = self.collection.find(filter=filter, projection=projection, sort=sort_by, limit=limit, skip=skip)
         temp = []
         for document in documents:
-            obj = self._create_instance_from_document(document)
+            obj = self._create_instance_from_document(document, fields)
             if obj is None:
                 raise Exception('Тип объекта не определен')
             if required_class is not None and not isinstance(obj, required_class):
@@ -49,28 +61,262 @@ class ObjectBroker:
             temp.append(obj)
         return temp
 
-    def find_object_by_id(self, object_id) -> any[Article]:
+    def list_page(self, filter: dict = dict(), limit: int = PAGE_DEFAULT_LIMIT, after: str = None, order_by: str = '_id', required_class: any[Article] = None, fields: list[str] = None) -> tuple[list[Article], str | None]:
         """
-        Поиск любого элемента в коллекции по его _id и автоматическое определение его в модель
+        Постраничная выдача по ключу (keyset). Вместо skip следующая страница начинается строго после
+        последнего документа прошлой, поэтому время выдачи не зависит от номера страницы.
+
+        :param filter: Фильтр для монги в формате словаря. Для удобного его создание следует использовать FilterBuilder
+        :param limit: Количество записей на странице
+        :param after: Токен продолжения из прошлого ответа, для первой страницы None
+        :param order_by: Поле сортировки: _id или system.update_document
+        :param required_class: Можно задать, какой класс нам не обходим на выходе
+        :param fields: Забрать из монги только эти поля, на выходе будут частичные модели
+        :return: Массив найденных элементов и токен следующей страницы, если она есть
+        """
+        documents, next_token = self.list_page_documents(filter, limit, after, order_by, self._projection(fields))
+        temp = []
+        for document in documents:
+            obj = self._create_instance_from_document(document, fields)
+            if required_class is not None and not isinstance(obj, required_class):
+                continue
+            temp.append(obj)
+        return temp, next_token
+
+    def list_page_documents(self, filter: dict = dict(), limit: int = PAGE_DEFAULT_LIMIT, after: str = None, order_by: str = '_id', projection: dict = None) -> tuple[list[dict], str | None]:
+        """
+        То же что list_page, но без создания моделей: сырые документы и токен следующей страницы
+
+        :param projection: Проекция монги, None - весь документ
+        """
+        page_filter = filter
+        if after:
+            page_filter = {'$and': [filter, keyset_filter(order_by, after)]} if filter else keyset_filter(order_by, after)
+        if projection:
+            # Ключ страницы нужен для токена, даже если его не просили
+            projection = {**projection, '_id': 1, order_by: 1}
+        documents = list(self.collection.find(filter=page_filter, projection=projection, sort=keyset_sort(order_by), limit=limit + 1))
+        next_token = None
+        if len(documents) > limit:
+            documents = documents[:limit]
+            next_token = encode_token(order_by, documents[-1])
+        return documents, next_token
+
+    def list_changes(self, since: str = None, limit: int = PAGE_DEFAULT_LIMIT, projection: dict = None, lag_ms: int = CHANGES_SAFETY_LAG_MS) -> tuple[list[dict], str | None, bool]:
+        """
+        Документы, созданные или измененные после водяного знака, по возрастанию system.update_document и _id.
+        Мягко удаленные документы тоже попадают в выборку. Последние lag_ms миллисекунд не отдаются:
+        дату обновления ставит приложение до записи, и запись с более ранней датой может появиться в базе позже.
+
+        :param since: Водяной знак из прошлого ответа, None - с начала коллекции
+        :return: Документы, новый водяной знак и есть ли еще изменения
+        """
+        order_by = 'system.update_document'
+        horizon = datetime.datetime.utcnow() - datetime.timedelta(milliseconds=lag_ms)
+        documents, next_token = self.list_page_documents(
+            {order_by: {'$lte': horizon}},
+            limit=limit,
+            after=since,
+            order_by=order_by,
+            projection=projection
+        )
+        watermark = encode_token(order_by, documents[-1]) if documents else since
+        return documents, watermark, next_token is not None
+
+    def search_page_documents(self, query: str, filter: dict = dict(), limit: int = PAGE_DEFAULT_LIMIT, after: str = None, projection: dict = None, snippet_length: int = 0) -> tuple[list[dict], str | None]:
+        """
+        Полнотекстовый поиск по текстовому индексу коллекции, по убыванию релевантности. Релевантность
+        кладется в поле score, следующая страница начинается строго после последнего документа прошлой по (score, _id).
+
+        :param query: Строка поиска в синтаксисе $text: слова, "фразы", -исключения
+        :param filter: Дополнительные условия. Для partial текстового индекса обязательно его условие, иначе монга не найдет индекс
+        :param after: Токен продолжения из прошлого ответа с тем же query, для первой страницы None
+        :param projection: Проекция монги, None - весь документ
+        :param snippet_length: Длина фрагмента text в поле snippet, 0 - без фрагмента
+        :return: Документы и токен следующей страницы, если она есть
+        """
+        order_by = 'score'
+        # релевантность имеет смысл только внутри одного запроса, токен от другого q не принимается
+        scope = hashlib.sha256(query.encode()).hexdigest()[:16]
+        pipeline = [
+            {'$match': {'$text': {'$search': query}, **filter}},
+            {'$addFields': {order_by: {'$meta': 'textScore'}}},
+        ]
+        if after:
+            pipeline.append({'$match': keyset_filter(order_by, after, descending=True, scope=scope)})
+        pipeline += [
+            {'$sort': {order_by: -1, '_id': 1}},
+            {'$limit': limit + 1},
+        ]
+        # фрагмент считается уже после $limit, только для документов страницы
+        if snippet_length:
+            pipeline.append({'$addFields': {'snippet': snippet_expression(query, snippet_length)}})
+        if projection:
+            projection = {**projection, '_id': 1, order_by: 1}
+            if snippet_length:
+                projection['snippet'] = 1
+            pipeline.append({'$project': projection})
+        try:
+            documents = list(self.collection.aggregate(pipeline))
+        except NotImplementedError:
+            raise TextSearchNotSupported
+        next_token = None
+        if len(documents) > limit:
+            documents = documents[:limit]
+            next_token = encode_token(order_by, documents[-1], scope)
+        return documents, next_token
+
+    def iter_documents(self, filter: dict = dict(), projection: dict = None, sort_by: dict = dict(), batch_size: int = EXPORT_BATCH_SIZE):
+        """
+        Генератор сырых документов из монги. Курсор читается пачками по batch_size, модели не создаются,
+        поэтому память не зависит от размера коллекции.
+
+        :param filter: Фильтр для монги в формате словаря. Для удобного его создание следует использовать FilterBuilder
+        :param projection: Какие поля забирать из монги, по умолчанию весь документ
+        :param batch_size: Сколько документов монга отдает за один запрос курсора
+        :return: Итератор по документам
+        """
+        cursor = self.collection.find(filter=filter, projection=projection, sort=sort_by or None, batch_size=batch_size)
+        try:
+            yield from cursor
+        finally:
+            cursor.close()
+
+    def bulk(self, creates: list[dict] = (), updates: list[tuple[ObjectId, dict]] = (), deletes: list[ObjectId] = (),
+             soft_delete: dict = None, exclude: dict = None) -> list[dict]:
+        """
+        Пакетная запись одним неупорядоченным bulk_write. Ошибка одной операции не останавливает остальные.
+
+        :param creates: Документы для вставки, _id проставляется заранее, чтобы вернуть его по каждой записи
+        :param updates: Пары _id и словарь для $set
+        :param deletes: _id удаляемых документов
+        :param soft_delete: $set для мягкого удаления, без него документы удаляются из коллекции
+        :param exclude: Фильтр документов, которые считаются отсутствующими, например уже удаленных мягко
+        :return: Результат по каждой операции: op, index, id, status (created, updated, deleted, not_found, error) и error.
+            Для удаления без soft_delete deleted значит, что документа после вызова нет
+        """
+        results = []
+        requests = []
+        request_results = []
+
+        for index, document in enumerate(creates):
+            document.setdefault('_id', ObjectId())
+            requests.append(InsertOne(document))
+            request_results.append({'op': 'create', 'index': index, 'id': document['_id'], 'status': 'created'})
+
+        # Одним запросом узнаем какие документы существуют, чтобы вернуть not_found по конкретным записям
+        target_ids = [object_id for object_id, _ in updates] + list(deletes)
+        alive = {'$nor': [exclude]} if exclude else {}
+        existing_ids = set()
+        if target_ids:
+            existing_ids = {document['_id'] for document in self.collection.find({'_id': {'$in': target_ids}, **alive}, projection={'_id': 1})}
+
+        for index, (object_id, changes) in enumerate(updates):
+            if object_id not in existing_ids:
+                results.append({'op': 'update', 'index': index, 'id': object_id, 'status': 'not_found'})
+                continue
+            requests.append(UpdateOne({'_id': object_id, **alive}, {'$set': changes}))
+            request_results.append({'op': 'update', 'index': index, 'id': object_id, 'status': 'updated', 'set': changes})
+
+        for index, object_id in enumerate(deletes):
+            if object_id not in existing_ids:
+                results.append({'op': 'delete', 'index': index, 'id': object_id, 'status': 'not_found'})
+                continue
+            if soft_delete:
+                requests.append(UpdateOne({'_id': object_id, **alive}, {'$set': soft_delete}))
+                request_results.append({'op': 'delete', 'index': index, 'id': object_id, 'status': 'deleted', 'set': soft_delete})
+            else:
+                requests.append(DeleteOne({'_id': object_id}))
+                request_results.append({'op': 'delete', 'index': index, 'id': object_id, 'status': 'deleted'})
+
+        if requests:
+            try:
+                details = self.collection.bulk_write(requests, ordered=False).bulk_api_result
+            except BulkWriteError as e:
+                details = e.details
+                for error in e.details.get('writeErrors', []):
+                    result = request_results[error['index']]
+                    result['status'] = 'error'
+                    result['error'] = error.get('errmsg')
+            self._check_bulk_matches(request_results, details.get('nMatched', 0))
+            for result in request_results:
+                if result['op'] != 'create':
+                    invalidate_document(self.collection_name, result['id'])
+
+        for result in request_results:
+            result.pop('set', None)
+        results.extend(request_results)
+        op_order = {'create': 0, 'update': 1, 'delete': 2}
+        return sorted(results, key=lambda result: (op_order[result['op']], result['index']))
+
+    def _check_bulk_matches(self, request_results: list[dict], matched: int):
+        """
+        Документ могли удалить между проверкой существования и bulk_write, тогда его UpdateOne ничего не нашел.
+        Монга отдает только общее число найденных документов, поэтому если оно меньше числа обновлений,
+        каждое обновление проверяется по записанным значениям, и не записанные получают not_found
+
+        :param request_results: Результаты операций bulk, у обновлений в set лежит записанный $set
+        :param matched: nMatched из ответа bulk_write
+        """
+        updates = [result for result in request_results if 'set' in result and result['status'] != 'error']
+        if matched >= len(updates):
+            return
+        written = {
+            document['_id'] for document in self.collection.find(
+                {'$or': [{'_id': result['id'], **result['set']} for result in updates]},
+                projection={'_id': 1}
+            )
+        }
+        for result in updates:
+            if result['id'] not in written:
+                result['status'] = 'not_found'
+
+    def find_object_by_id(self, object_id, fields: list[str] = None) -> any[Article]:
+        """
+        Поиск любого элемента в коллекции по его _id и автоматическое определение его в модель.
+        Мягко удаленные записи считаются отсутствующими
 
         :param object_id: ID искомой записи
+        :param fields: Забрать из монги только эти поля, на выходе будет частичная модель
         :return: Возвращает найденную запись определенную в модель
         """
         try:
-            document = self.collection.find_one({"_id": ObjectId(object_id)})
-            if document is None:
+            document = find_cached_document(self.collection, ObjectId(object_id), projection=self._projection(fields))
+            if document is None or self._is_deleted(document):
                 raise RootNotFoundError
-            return self._create_instance_from_document(document)
+            return self._create_instance_from_document(document, fields)
         except InvalidId:
             raise InvalidObjectId
 
-    def _create_instance_from_document(self, document) -> any[Article]:
+    def _is_deleted(self, document: dict) -> bool:
+        """Документ удален мягко. Проекция из _projection всегда содержит статус"""
+        if self.collection_name == MongoCollectionsEnum.ARTICLES:
+            return Article.is_deleted(document)
+        return False
+
+    def _projection(self, fields: list[str] = None) -> dict | None:
+        """
+        Проекция монги для запрошенных полей модели коллекции
+
+        :param fields: Поля короткой модели, None - весь документ
+        """
+        if not fields:
+            return None
+        if self.collection_name == MongoCollectionsEnum.ARTICLES:
+            return Article.projection(fields)
+        raise UndefinedDocumentType
+
+    def _create_instance_from_document(self, document, fields: list[str] = None) -> any[Article]:
         """
         Этот метод раскидывает полученные записи из монги по своим классам, если ничего не найдено до выведет ошибку
 
         :param document: документ из монги, то есть словарь
+        :param fields: Если документ получен с проекцией, то создается частичная модель только с этими полями
 
         """
         if self.collection_name == MongoCollectionsEnum.ARTICLES:
-            return Article(**document)
+            if fields:
+                return Article.from_projection(document, fields)
+            with span('article_init'):
+                return Article(**document)
         raise UndefinedDocumentType
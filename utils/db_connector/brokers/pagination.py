@@ -0,0 +1,63 @@
+import base64
+import binascii
+
+from bson import json_util
+from pymongo import ASCENDING
+
+from utils.db_connector.base_structures import get_document_path
+from utils.db_connector.errors import *
+
+# Поля, по которым можно листать коллекцию. _id всегда добавляется последним ключом, чтобы порядок был однозначным
+KEYSET_FIELDS = ('_id', 'system.update_document')
+
+
+def keyset_sort(order_by: str) -> list[tuple[str, int]]:
+    if order_by not in KEYSET_FIELDS:
+        raise InvalidSortField
+    if order_by == '_id':
+        return [('_id', ASCENDING)]
+    return [(order_by, ASCENDING), ('_id', ASCENDING)]
+
+
+def encode_token(order_by: str, document: dict, scope: str = None) -> str:
+    """
+    Непрозрачный токен продолжения: поле сортировки и значения ключа последнего документа страницы.
+
+    :param order_by: Поле сортировки из KEYSET_FIELDS
+    :param document: Последний документ отданной страницы
+    :param scope: К чему привязан токен, например хэш поискового запроса. С другим scope токен не примется
+    """
+    payload = {'f': order_by, 'id': document['_id']}
+    if scope is not None:
+        payload['s'] = scope
+    if order_by != '_id':
+        payload['v'] = get_document_path(document, order_by)
+    return base64.urlsafe_b64encode(json_util.dumps(payload).encode()).decode().rstrip('=')
+
+
+def decode_token(token: str, order_by: str, scope: str = None) -> dict:
+    try:
+        raw = base64.urlsafe_b64decode(token + '=' * (-len(token) % 4))
+        payload = json_util.loads(raw)
+    except (binascii.Error, ValueError, TypeError):
+        raise InvalidContinuationToken
+    if not isinstance(payload, dict) or payload.get('f') != order_by or 'id' not in payload or payload.get('s') != scope:
+        raise InvalidContinuationToken
+    return payload
+
+
+def keyset_filter(order_by: str, token: str, descending: bool = False, scope: str = None) -> dict:
+    """
+    Условие "строго после" последнего документа прошлой страницы. Монга идет по индексу сразу
+    с нужного места, без пропуска документов как при skip.
+
+    :param descending: Поле order_by отсортировано по убыванию (например, релевантность поиска), _id всегда по возрастанию
+    :param scope: То же значение, что при encode_token
+    """
+    payload = decode_token(token, order_by, scope)
+    if order_by == '_id':
+        return {'_id': {'$gt': payload['id']}}
+    return {'$or': [
+        {order_by: {'$lt' if descending else '$gt': payload['v']}},
+        {order_by: payload['v'], '_id': {'$gt': payload['id']}},
+    ]}
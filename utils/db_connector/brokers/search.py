@@ -0,0 +1,20 @@
+import re
+
+
+def snippet_expression(query: str, length: int, field: str = 'text') -> dict:
+    """
+    Выражение aggregate: кусок поля длиной length, который начинается немного раньше первого вхождения
+    первого слова запроса. Если слово встречается только в другой форме (стемминг), кусок берется с начала
+
+    :param query: Поисковый запрос $text, слова с минусом в начале пропускаются
+    :param length: Длина куска в символах
+    :param field: Поле документа, из которого берется кусок
+    """
+    terms = [term.strip('"') for term in query.split() if not term.startswith('-')]
+    terms = [term for term in terms if term]
+    if not terms:
+        return {'$substrCP': [f'${field}', 0, length]}
+    found = {'$regexFind': {'input': f'${field}', 'regex': re.escape(terms[0]), 'options': 'i'}}
+    position = {'$let': {'vars': {'found': found}, 'in': {'$ifNull': ['$$found.idx', 0]}}}
+    start = {'$max': [0, {'$subtract': [position, length // 4]}]}
+    return {'$substrCP': [f'${field}', start, length]}
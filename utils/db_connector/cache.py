@@ -0,0 +1,197 @@
+import threading
+import time
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+
+from bson import ObjectId
+
+from config import DOCUMENT_CACHE_SIZE, DOCUMENT_CACHE_TTL
+
+
+class CacheBackend(ABC):
+    """
+    Интерфейс кэша документов монги. Значения - сырые документы, их нельзя изменять после get.
+    Для общего между воркерами кэша (redis, memcached) достаточно реализовать эти методы и передать
+    объект в set_document_cache.
+    """
+
+    @abstractmethod
+    def get(self, key: str) -> dict | None:
+        ...
+
+    @abstractmethod
+    def set(self, key: str, value: dict, ttl: float = None):
+        ...
+
+    @abstractmethod
+    def delete(self, key: str):
+        ...
+
+    @abstractmethod
+    def clear(self):
+        ...
+
+    @abstractmethod
+    def stats(self) -> dict:
+        ...
+
+
+class LRUCache(CacheBackend):
+    """Кэш в памяти процесса с ограничением размера, вытеснением давно неиспользуемых и TTL на запись"""
+
+    def __init__(self, max_size: int = DOCUMENT_CACHE_SIZE, ttl: float = DOCUMENT_CACHE_TTL):
+        self.max_size = max_size
+        self.ttl = ttl
+        self._data: OrderedDict[str, tuple[float, dict]] = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    def get(self, key: str) -> dict | None:
+        with self._lock:
+            item = self._data.get(key)
+            if item is None:
+                self.misses += 1
+                return None
+            expires_at, value = item
+            if expires_at < time.monotonic():
+                del self._data[key]
+                self.expirations += 1
+                self.misses += 1
+                return None
+            self._data.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def set(self, key: str, value: dict, ttl: float = None):
+        expires_at = time.monotonic() + (self.ttl if ttl is None else ttl)
+        with self._lock:
+            self._data[key] = (expires_at, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_size:
+                self._data.popitem(last=False)
+                self.evictions += 1
+
+    def delete(self, key: str):
+        with self._lock:
+            self._data.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def stats(self) -> dict:
+        with self._lock:
+            requests = self.hits + self.misses
+            return {
+                'backend': type(self).__name__,
+                'size': len(self._data),
+                'max_size': self.max_size,
+                'ttl': self.ttl,
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_ratio': self.hits / requests if requests else 0.0,
+                'evictions': self.evictions,
+                'expirations': self.expirations,
+            }
+
+
+class NullCache(CacheBackend):
+    """Выключенный кэш, каждый get - промах"""
+
+    def get(self, key: str) -> dict | None:
+        return None
+
+    def set(self, key: str, value: dict, ttl: float = None):
+        pass
+
+    def delete(self, key: str):
+        pass
+
+    def clear(self):
+        pass
+
+    def stats(self) -> dict:
+        return {'backend': type(self).__name__}
+
+
+_document_cache: CacheBackend = LRUCache() if DOCUMENT_CACHE_SIZE > 0 else NullCache()
+
+
+def get_document_cache() -> CacheBackend:
+    return _document_cache
+
+
+def set_document_cache(backend: CacheBackend):
+    global _document_cache
+    _document_cache = backend
+
+
+def cache_key(collection_name: str, object_id) -> str:
+    # MongoCollectionsEnum и имя коллекции из collection.name должны давать один ключ
+    return f"{getattr(collection_name, 'value', collection_name)}:{object_id}"
+
+
+# Чтения из монги, которые положат документ в кэш, по ключу: [число таких чтений, номер сброса].
+# Запись, которая сбросила ключ во время чтения, увеличивает номер, и прочитанный до нее документ в кэш не попадает
+_fills: dict[str, list[int]] = {}
+_fills_lock = threading.Lock()
+
+
+def begin_fill(key: str) -> int:
+    """Отмечает чтение документа для кэша, возвращает номер сброса ключа на момент начала чтения"""
+    with _fills_lock:
+        fill = _fills.setdefault(key, [0, 0])
+        fill[0] += 1
+        return fill[1]
+
+
+def finish_fill(key: str, generation: int, document: dict | None):
+    """
+    Кладет прочитанный документ в кэш, если ключ не сбрасывали после begin_fill.
+    Вызывается и при ошибке чтения с document=None, чтобы снять отметку
+    """
+    with _fills_lock:
+        fill = _fills[key]
+        fill[0] -= 1
+        if fill[0] == 0:
+            del _fills[key]
+        if document is not None and fill[1] == generation:
+            _document_cache.set(key, document)
+
+
+def find_cached_document(collection, object_id: ObjectId, projection: dict = None) -> dict | None:
+    """
+    Чтение документа по _id через кэш. Полный документ кладется в кэш, запрос с проекцией
+    берет документ из кэша если он там есть, иначе идет в монгу только за нужными полями и в кэш не пишет.
+
+    :param collection: Коллекция pymongo
+    :param object_id: _id документа
+    :param projection: Проекция монги, None - весь документ
+    """
+    key = cache_key(collection.name, object_id)
+    document = _document_cache.get(key)
+    if document is not None:
+        return document
+    if projection is not None:
+        return collection.find_one({"_id": object_id}, projection=projection)
+    generation = begin_fill(key)
+    document = None
+    try:
+        document = collection.find_one({"_id": object_id})
+    finally:
+        finish_fill(key, generation, document)
+    return document
+
+
+def invalidate_document(collection_name: str, object_id):
+    """Сбрасывает документ из кэша, вызывается после любой записи в него"""
+    if object_id is not None:
+        key = cache_key(collection_name, object_id)
+        with _fills_lock:
+            fill = _fills.get(key)
+            if fill is not None:
+                fill[1] += 1
+            _document_cache.delete(key)
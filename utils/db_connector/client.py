@@ -0,0 +1,180 @@
+import os
+import threading
+import time
+from typing import Callable
+
+from pymongo import MongoClient, monitoring
+
+from config import *
+
+_client: MongoClient | None = None
+_client_pid: int | None = None
+_client_lock = threading.Lock()
+_event_listeners: list = []
+_pool_observers: list[Callable[[str, dict], None]] = []
+
+
+def client_options() -> dict:
+    """Настройки пула и подключения из config, общие для pymongo и motor"""
+    options = {
+        'maxPoolSize': MONGO_MAX_POOL_SIZE,
+        'minPoolSize': MONGO_MIN_POOL_SIZE,
+        'connectTimeoutMS': MONGO_CONNECT_TIMEOUT_MS,
+        'serverSelectionTimeoutMS': MONGO_SERVER_SELECTION_TIMEOUT_MS,
+        'readPreference': MONGO_READ_PREFERENCE,
+    }
+    if MONGO_MAX_IDLE_TIME_MS:
+        options['maxIdleTimeMS'] = int(MONGO_MAX_IDLE_TIME_MS)
+    if MONGO_WAIT_QUEUE_TIMEOUT_MS:
+        options['waitQueueTimeoutMS'] = int(MONGO_WAIT_QUEUE_TIMEOUT_MS)
+    if MONGO_SOCKET_TIMEOUT_MS:
+        options['socketTimeoutMS'] = int(MONGO_SOCKET_TIMEOUT_MS)
+    if MONGO_COMPRESSORS:
+        options['compressors'] = MONGO_COMPRESSORS
+    if MONGO_WRITE_CONCERN:
+        options['w'] = int(MONGO_WRITE_CONCERN) if MONGO_WRITE_CONCERN.isdigit() else MONGO_WRITE_CONCERN
+    return options
+
+
+class PoolStatsListener(monitoring.ConnectionPoolListener):
+    """Статистика пула соединений: сколько занято сейчас и сколько запросы ждали свободное соединение"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self.checked_out = 0
+            self.max_checked_out = 0
+            self.checkouts = 0
+            self.checkout_failures = 0
+            self.wait_time_total = 0.0
+            self.wait_time_max = 0.0
+            self.connections_open = 0
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                'checked_out': self.checked_out,
+                'max_checked_out': self.max_checked_out,
+                'checkouts': self.checkouts,
+                'checkout_failures': self.checkout_failures,
+                'wait_time_total': self.wait_time_total,
+                'wait_time_max': self.wait_time_max,
+                'wait_time_avg': self.wait_time_total / self.checkouts if self.checkouts else 0.0,
+                'connections_open': self.connections_open,
+                'max_pool_size': MONGO_MAX_POOL_SIZE,
+            }
+
+    def _publish(self, event_name: str):
+        stats = self.stats()
+        for observer in _pool_observers:
+            observer(event_name, stats)
+
+    def connection_check_out_started(self, event):
+        # Начало и конец ожидания приходят в том же потоке, что и запрос
+        self._local.started_at = time.perf_counter()
+
+    def connection_checked_out(self, event):
+        wait = time.perf_counter() - getattr(self._local, 'started_at', time.perf_counter())
+        with self._lock:
+            self.checked_out += 1
+            self.max_checked_out = max(self.max_checked_out, self.checked_out)
+            self.checkouts += 1
+            self.wait_time_total += wait
+            self.wait_time_max = max(self.wait_time_max, wait)
+        self._publish('checked_out')
+
+    def connection_check_out_failed(self, event):
+        with self._lock:
+            self.checkout_failures += 1
+        self._publish('check_out_failed')
+
+    def connection_checked_in(self, event):
+        with self._lock:
+            self.checked_out -= 1
+        self._publish('checked_in')
+
+    def connection_created(self, event):
+        with self._lock:
+            self.connections_open += 1
+
+    def connection_closed(self, event):
+        with self._lock:
+            self.connections_open -= 1
+
+    def pool_created(self, event):
+        pass
+
+    def pool_ready(self, event):
+        pass
+
+    def pool_cleared(self, event):
+        pass
+
+    def pool_closed(self, event):
+        pass
+
+    def connection_ready(self, event):
+        pass
+
+
+pool_stats_listener = PoolStatsListener()
+
+
+def add_event_listener(listener):
+    """
+    Слушатель событий pymongo (CommandListener и т.п.). Регистрировать нужно до первого get_client,
+    pymongo принимает слушателей только при создании клиента.
+    """
+    _event_listeners.append(listener)
+
+
+def add_pool_observer(observer: Callable[[str, dict], None]):
+    """Хук для метрик: observer(event_name, stats) вызывается на каждое взятие и возврат соединения"""
+    _pool_observers.append(observer)
+
+
+def pool_stats() -> dict:
+    return pool_stats_listener.stats()
+
+
+def get_client() -> MongoClient:
+    """
+    Единый клиент монги процесса. Создается при первом обращении, а не при импорте, поэтому
+    pre-fork сервер не делит сокеты родителя с воркерами: после fork клиент создается заново.
+    """
+    global _client, _client_pid
+    pid = os.getpid()
+    if _client is None or _client_pid != pid:
+        with _client_lock:
+            if _client is None or _client_pid != pid:
+                pool_stats_listener.reset()
+                _client = MongoClient(
+                    MONGO_DB_URI,
+                    event_listeners=[pool_stats_listener, *_event_listeners],
+                    **client_options()
+                )
+                _client_pid = pid
+    return _client
+
+
+def get_db():
+    """База для моделей и брокеров: монга или другое хранилище из STORAGE_BACKEND"""
+    if STORAGE_BACKEND == 'mongo':
+        return get_client()[MONGO_DB_NAME]
+    from .storage import get_storage_database
+
+    return get_storage_database(STORAGE_BACKEND)
+
+
+class LazyClientAttribute:
+    """Атрибут класса, который отдает общий клиент или базу при обращении: _client = LazyClientAttribute(get_client)"""
+
+    def __init__(self, factory: Callable):
+        self.factory = factory
+
+    def __get__(self, instance, owner):
+        return self.factory()
@@ -0,0 +1,138 @@
+import os
+import queue
+import threading
+import time
+from concurrent.futures import Future, TimeoutError as FutureTimeoutError
+from typing import Callable
+
+from bson import ObjectId
+from pymongo.errors import BulkWriteError, DuplicateKeyError, WriteError, WriteConcernError
+
+from config import WRITE_COALESCING_MAX_BATCH, WRITE_COALESCING_WINDOW_MS, WRITE_COALESCING_TIMEOUT_MS
+from utils.db_connector.errors import CoalescedWriteTimeout
+from utils.metrics import registry
+
+batch_size_histogram = registry.histogram(
+    'write_coalescer_batch_size', 'Документов в одном insert_many', ('collection',),
+    buckets=(1, 2, 5, 10, 20, 50, 100, 200, 500, 1000)
+)
+flush_duration = registry.histogram(
+    'write_coalescer_flush_seconds', 'Время одного insert_many', ('collection',)
+)
+wait_duration = registry.histogram(
+    'write_coalescer_wait_seconds', 'Время от постановки документа в очередь до ответа вызывающему', ('collection',)
+)
+
+
+class WriteCoalescer:
+    """
+    Склеивает одиночные вставки из многих потоков в insert_many. Пачка уходит в монгу, когда набралось
+    max_batch документов или прошло window_ms с первого документа в ней. Вызывающий поток ждет своей пачки
+    и получает свой _id или свою ошибку, как от insert_one.
+    """
+
+    def __init__(self, collection_name: str, get_collection: Callable, max_batch: int = WRITE_COALESCING_MAX_BATCH,
+                 window_ms: float = WRITE_COALESCING_WINDOW_MS, timeout_ms: float = WRITE_COALESCING_TIMEOUT_MS):
+        self.collection_name = str(getattr(collection_name, 'value', collection_name))
+        self.get_collection = get_collection
+        self.max_batch = max_batch
+        self.window = window_ms / 1000
+        self.timeout = timeout_ms / 1000
+        self._queue: queue.Queue | None = None
+        self._pid: int | None = None
+        self._lock = threading.Lock()
+
+    def _ensure_worker(self) -> queue.Queue:
+        # Поток не переживает fork, в каждом воркере свои очередь и поток
+        pid = os.getpid()
+        if self._pid != pid:
+            with self._lock:
+                if self._pid != pid:
+                    self._queue = queue.Queue()
+                    threading.Thread(target=self._run, args=(self._queue,), name=f'coalescer-{self.collection_name}', daemon=True).start()
+                    self._pid = pid
+        return self._queue
+
+    def insert(self, document: dict) -> ObjectId:
+        """
+        Вставка документа в ближайшей пачке
+
+        :return: _id документа
+        :raises DuplicateKeyError, WriteError: Ошибка вставки именно этого документа
+        :raises WriteConcernError: Документ вставлен, но write concern не выполнен
+        :raises CoalescedWriteTimeout: Пачка не ответила за timeout_ms, документ может быть вставлен позже
+        """
+        document.setdefault('_id', ObjectId())
+        future = Future()
+        started_at = time.perf_counter()
+        self._ensure_worker().put((document, future))
+        try:
+            return future.result(timeout=self.timeout)
+        except FutureTimeoutError:
+            raise CoalescedWriteTimeout
+        finally:
+            wait_duration.observe(time.perf_counter() - started_at, self.collection_name)
+
+    def _run(self, batches: queue.Queue):
+        while True:
+            batch = [batches.get()]
+            deadline = time.monotonic() + self.window
+            while len(batch) < self.max_batch:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    batch.append(batches.get(timeout=remaining))
+                except queue.Empty:
+                    break
+            try:
+                self._flush(batch)
+            except Exception as e:
+                # поток один на воркер: если он упадет, все следующие вставки будут ждать впустую
+                for _, future in batch:
+                    if not future.done():
+                        future.set_exception(e)
+
+    def _flush(self, batch: list[tuple[dict, Future]]):
+        started_at = time.perf_counter()
+        errors = {}
+        write_concern_error = None
+        try:
+            # unordered: ошибка одного документа не мешает вставке остальных
+            self.get_collection().insert_many([document for document, _ in batch], ordered=False)
+        except BulkWriteError as e:
+            for error in e.details.get('writeErrors', []):
+                error_class = DuplicateKeyError if error.get('code') == 11000 else WriteError
+                errors[error['index']] = error_class(error.get('errmsg'), error.get('code'), error)
+            # write concern относится ко всей пачке: вставленные документы не подтверждены
+            concern_errors = e.details.get('writeConcernErrors', [])
+            if concern_errors:
+                write_concern_error = WriteConcernError(concern_errors[0].get('errmsg'), concern_errors[0].get('code'), concern_errors[0])
+        except Exception as e:
+            for _, future in batch:
+                future.set_exception(e)
+            return
+        finally:
+            flush_duration.observe(time.perf_counter() - started_at, self.collection_name)
+            batch_size_histogram.observe(len(batch), self.collection_name)
+
+        for index, (document, future) in enumerate(batch):
+            if index in errors:
+                future.set_exception(errors[index])
+            elif write_concern_error is not None:
+                future.set_exception(write_concern_error)
+            else:
+                future.set_result(document['_id'])
+
+
+_coalescers: dict[str, WriteCoalescer] = {}
+_coalescers_lock = threading.Lock()
+
+
+def get_coalescer(collection_name: str) -> WriteCoalescer:
+    from .client import get_db
+
+    with _coalescers_lock:
+        if collection_name not in _coalescers:
+            _coalescers[collection_name] = WriteCoalescer(collection_name, lambda: get_db()[collection_name])
+        return _coalescers[collection_name]
@@ -40,4 +40,94 @@ class InvalidRelationsNotFoundError(CustomError):
 class DocumentsNotFoundError(CustomError):
     """Документы не найдены"""
     def __init__(self, message="Documents not found"):
-        super().__init__(message)
\ No newline at end of file
+        super().__init__(message)
+
+
+class InvalidContinuationToken(CustomError):
+    """Токен продолжения пагинации не валиден"""
+    def __init__(self, message="Invalid continuation token", status_code=400):
+        super().__init__(message, status_code)
+
+
+class InvalidSortField(CustomError):
+    """Поле сортировки не поддерживается"""
+    def __init__(self, message="Sort field not support", status_code=400):
+        super().__init__(message, status_code)
+
+
+class InvalidFieldsError(CustomError):
+    """Запрошенные поля не поддерживаются"""
+    def __init__(self, message="Fields not support", status_code=400):
+        super().__init__(message, status_code)
+
+
+class BulkLimitError(CustomError):
+    """Слишком много операций в одном bulk запросе"""
+    def __init__(self, message="Too many items in bulk request", status_code=400):
+        super().__init__(message, status_code)
+
+
+class InvalidIdempotencyKey(CustomError):
+    """Idempotency-Key пустой или слишком длинный"""
+    def __init__(self, message="Invalid Idempotency-Key", status_code=400):
+        super().__init__(message, status_code)
+
+
+class IdempotencyKeyMismatchError(CustomError):
+    """Ключ уже использован с другим телом запроса"""
+    def __init__(self, message="Idempotency-Key already used with another request body", status_code=422):
+        super().__init__(message, status_code)
+
+
+class IdempotencyKeyInProgressError(CustomError):
+    """Запрос с этим ключом еще выполняется"""
+    def __init__(self, message="Request with this Idempotency-Key is still in progress", status_code=409):
+        super().__init__(message, status_code)
+
+
+class PreconditionFailedError(CustomError):
+    """If-Match не совпал с текущей версией документа"""
+    def __init__(self, message="Document was modified, ETag does not match", status_code=412):
+        super().__init__(message, status_code)
+
+
+class ExportJobNotFoundError(CustomError):
+    """Задача выгрузки не найдена или уже удалена"""
+    def __init__(self, message="Export job not found", status_code=404):
+        super().__init__(message, status_code)
+
+
+class ExportJobNotReadyError(CustomError):
+    """Файл выгрузки еще не готов"""
+    def __init__(self, message="Export job is not finished yet", status_code=409):
+        super().__init__(message, status_code)
+
+
+class UnsupportedExportFormat(CustomError):
+    """Формат выгрузки неизвестен, не принимается клиентом или для него не установлен pyarrow"""
+    def __init__(self, message="Export format is not supported", status_code=406):
+        super().__init__(message, status_code)
+
+
+class RequestBodyTooLargeError(CustomError):
+    """Тело запроса больше допустимого размера"""
+    def __init__(self, message="Request body is too large", status_code=413):
+        super().__init__(message, status_code)
+
+
+class InvalidSearchQuery(CustomError):
+    """Пустая или слишком длинная поисковая строка"""
+    def __init__(self, message="Search query is required", status_code=400):
+        super().__init__(message, status_code)
+
+
+class TextSearchNotSupported(CustomError):
+    """Хранилище не умеет полнотекстовый поиск: memory и sqlite не поддерживают $text и aggregate"""
+    def __init__(self, message="Text search is not supported by the storage backend", status_code=501):
+        super().__init__(message, status_code)
+
+
+class CoalescedWriteTimeout(CustomError):
+    """Пачка склейки вставок не ответила вовремя"""
+    def __init__(self, message="Insert was not confirmed in time", status_code=503):
+        super().__init__(message, status_code)
@@ -0,0 +1,109 @@
+import datetime
+import time
+import uuid
+
+from pymongo import ReturnDocument
+from pymongo.errors import DuplicateKeyError
+
+from config import IDEMPOTENCY_TTL, IDEMPOTENCY_LOCK_TIMEOUT, IDEMPOTENCY_WAIT_TIMEOUT
+from .base_model import MongoDBModel
+from .base_structures import MongoCollectionsEnum
+from .errors import *
+from .indexes import IndexSpec, QueryShape
+
+
+class IdempotencyStore:
+    """
+    Хранилище ключей Idempotency-Key. Ключ лежит в _id, поэтому уникальность гарантирует сама монга:
+    из нескольких одновременных запросов с одним ключом вставка получится только у одного,
+    остальные дождутся его ответа и вернут его же. Записи удаляются TTL индексом created_at_ttl через IDEMPOTENCY_TTL.
+    """
+    collection_name = MongoCollectionsEnum.IDEMPOTENCY_KEYS
+    indexes = [
+        IndexSpec(name='created_at_ttl', keys=[('created_at', 1)], expire_after_seconds=IDEMPOTENCY_TTL),
+    ]
+    queries = [
+        QueryShape(name='by_key', equality={'_id': None}),
+    ]
+    max_key_length = 255
+
+    def __init__(self, scope: str):
+        """
+        :param scope: Пространство ключей, например метод API. Один ключ в разных методах не пересекается
+        """
+        self.scope = scope
+        # Кто держит ключ: после перехвата зависшего ключа исходный запрос не должен записать или снять чужой
+        self.owner = uuid.uuid4().hex
+        self.collection = MongoDBModel._db[self.collection_name]
+
+    def _record_id(self, key: str) -> str:
+        if not key or len(key) > self.max_key_length:
+            raise InvalidIdempotencyKey
+        return f'{self.scope}:{key}'
+
+    def begin(self, key: str, request_hash: str) -> dict | None:
+        """
+        Захватывает ключ перед выполнением запроса.
+
+        :param key: Значение заголовка Idempotency-Key
+        :param request_hash: Хэш тела запроса, чтобы не отдать чужой ответ на другой запрос с тем же ключом
+        :return: None если ключ новый и запрос нужно выполнить, иначе сохраненная запись с полем response
+        """
+        record_id = self._record_id(key)
+        deadline = time.monotonic() + IDEMPOTENCY_WAIT_TIMEOUT
+        while True:
+            try:
+                self.collection.insert_one({
+                    '_id': record_id,
+                    'status': 'pending',
+                    'request_hash': request_hash,
+                    'owner': self.owner,
+                    'created_at': datetime.datetime.utcnow(),
+                })
+                return None
+            except DuplicateKeyError:
+                pass
+
+            record = self.collection.find_one({'_id': record_id})
+            if record is None:
+                # Первый запрос упал и освободил ключ, пробуем захватить заново
+                continue
+            if record['request_hash'] != request_hash:
+                raise IdempotencyKeyMismatchError
+            if record['status'] == 'completed':
+                return record
+            if self._take_over_stale(record_id, request_hash):
+                return None
+            if time.monotonic() > deadline:
+                raise IdempotencyKeyInProgressError
+            time.sleep(0.05)
+
+    def _take_over_stale(self, record_id: str, request_hash: str) -> bool:
+        """Забирает ключ, если воркер, который его захватил, не завершил запрос за IDEMPOTENCY_LOCK_TIMEOUT"""
+        now = datetime.datetime.utcnow()
+        record = self.collection.find_one_and_update(
+            {
+                '_id': record_id,
+                'status': 'pending',
+                'created_at': {'$lt': now - datetime.timedelta(seconds=IDEMPOTENCY_LOCK_TIMEOUT)},
+            },
+            {'$set': {'created_at': now, 'request_hash': request_hash, 'owner': self.owner}},
+            return_document=ReturnDocument.AFTER,
+        )
+        return record is not None
+
+    def complete(self, key: str, body: dict, status_code: int) -> bool:
+        """
+        Сохраняет ответ, его получат все повторы запроса с этим ключом
+
+        :return: False если ключ за время запроса перехватили как зависший, тогда сохраняется ответ нового владельца
+        """
+        result = self.collection.update_one(
+            {'_id': self._record_id(key), 'status': 'pending', 'owner': self.owner},
+            {'$set': {'status': 'completed', 'response': {'body': body, 'status_code': status_code}}}
+        )
+        return result.matched_count > 0
+
+    def release(self, key: str):
+        """Освобождает ключ, если запрос не удалось выполнить, чтобы клиент мог его повторить"""
+        self.collection.delete_one({'_id': self._record_id(key), 'status': 'pending', 'owner': self.owner})
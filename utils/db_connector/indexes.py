@@ -0,0 +1,176 @@
+import argparse
+from typing import Any
+
+from pydantic import BaseModel, Field
+from pymongo import IndexModel
+
+from .base_model import MongoDBModel
+
+
+class IndexSpec(BaseModel):
+    """
+    Описание индекса монги, которое модель объявляет в ClassVar indexes.
+    По нему ensure_indexes создает индекс или пересоздает, если параметры в базе отличаются.
+    """
+    name: str
+    keys: list[tuple[str, int | str]]
+    unique: bool = False
+    partial_filter: dict | None = None
+    expire_after_seconds: int | None = None
+    # Только для текстовых индексов: вес полей (по умолчанию 1) и язык стемминга
+    weights: dict[str, int] | None = None
+    default_language: str | None = None
+
+    @property
+    def is_text(self) -> bool:
+        return any(kind == 'text' for _, kind in self.keys)
+
+    def text_weights(self) -> dict[str, int]:
+        return {field: (self.weights or {}).get(field, 1) for field, kind in self.keys if kind == 'text'}
+
+    def to_index_model(self) -> IndexModel:
+        options: dict[str, Any] = {'name': self.name}
+        if self.unique:
+            options['unique'] = True
+        if self.partial_filter is not None:
+            options['partialFilterExpression'] = self.partial_filter
+        if self.expire_after_seconds is not None:
+            options['expireAfterSeconds'] = self.expire_after_seconds
+        if self.weights is not None:
+            options['weights'] = self.weights
+        if self.default_language is not None:
+            options['default_language'] = self.default_language
+        return IndexModel(self.keys, **options)
+
+    def matches(self, info: dict) -> bool:
+        """Совпадает ли индекс из index_information с описанием"""
+        if self.is_text:
+            # монга хранит текстовый индекс как ключи _fts/_ftsx, поля и их веса лежат в weights
+            if info.get('weights') != self.text_weights():
+                return False
+            if self.default_language is not None and info.get('default_language') != self.default_language:
+                return False
+        elif [tuple(key) for key in info.get('key', [])] != [tuple(key) for key in self.keys]:
+            return False
+        return (
+            bool(info.get('unique', False)) == self.unique
+            and info.get('partialFilterExpression') == self.partial_filter
+            and info.get('expireAfterSeconds') == self.expire_after_seconds
+        )
+
+
+class QueryShape(BaseModel):
+    """
+    Форма запроса, который модель делает в монгу. Нужна только для отчета о покрытии индексами.
+
+    equality - поля с условием равенства и значением, по значению проверяется partial_filter индекса
+    sort - поля сортировки по порядку
+    range - поля с условиями $gt/$lt
+    text - поля, по которым идет полнотекстовый поиск $text
+    """
+    name: str
+    equality: dict[str, Any] = Field(default_factory=dict)
+    sort: list[str] = Field(default_factory=list)
+    range: list[str] = Field(default_factory=list)
+    text: list[str] = Field(default_factory=list)
+
+
+# Индекс по _id монга создает сама, его не нужно объявлять
+ID_INDEX = IndexSpec(name='_id_', keys=[('_id', 1)])
+
+
+def registered_models() -> list:
+    """Модели и хранилища, которые объявляют индексы"""
+    from .articles import Article
+    from .idempotency import IdempotencyStore
+
+    return [Article, IdempotencyStore]
+
+
+def ensure_indexes(models: list = None, drop_unknown: bool = False) -> list[dict]:
+    """
+    Сверяет объявленные индексы с индексами в коллекциях MongoCollectionsEnum.
+
+    :param models: Классы с collection_name и indexes, по умолчанию registered_models
+    :param drop_unknown: Удалять индексы, которые не объявлены ни одной моделью коллекции
+    :return: Что сделано с каждым индексом: created, recreated, unchanged, dropped
+    """
+    specs_by_collection: dict[str, list[IndexSpec]] = {}
+    for model in models or registered_models():
+        specs_by_collection.setdefault(model.collection_name, []).extend(model.indexes)
+
+    report = []
+    for collection_name, specs in specs_by_collection.items():
+        collection = MongoDBModel._db[collection_name]
+        existing = collection.index_information()
+        to_create = []
+        for spec in specs:
+            info = existing.get(spec.name)
+            if info is None:
+                action = 'created'
+            elif spec.matches(info):
+                action = 'unchanged'
+            else:
+                collection.drop_index(spec.name)
+                action = 'recreated'
+            if action != 'unchanged':
+                to_create.append(spec.to_index_model())
+            report.append({'collection': collection_name, 'index': spec.name, 'action': action})
+        if to_create:
+            collection.create_indexes(to_create)
+
+        if drop_unknown:
+            declared = {spec.name for spec in specs} | {ID_INDEX.name}
+            for name in existing:
+                if name not in declared:
+                    collection.drop_index(name)
+                    report.append({'collection': collection_name, 'index': name, 'action': 'dropped'})
+    return report
+
+
+def index_supports(spec: IndexSpec, query: QueryShape) -> bool:
+    """
+    Может ли индекс обслужить запрос без полного скана: сначала поля равенства, затем сортировка, затем диапазоны.
+    Partial индекс подходит, только если запрос сам содержит его условие.
+    """
+    for field, value in (spec.partial_filter or {}).items():
+        if query.equality.get(field) != value:
+            return False
+
+    # $text обслуживает только текстовый индекс, и только он сам
+    if query.text or spec.is_text:
+        return bool(query.text) and spec.is_text and set(query.text) <= set(spec.text_weights())
+
+    fields = [key for key, _ in spec.keys]
+    prefix = len(query.equality)
+    if set(fields[:prefix]) != set(query.equality):
+        return False
+    rest = fields[prefix:]
+    sort = [field for field in query.sort if field not in query.equality]
+    if rest[:len(sort)] != sort:
+        return False
+    return all(field in rest for field in query.range)
+
+
+def coverage_report(models: list = None) -> list[dict]:
+    """Для каждого объявленного запроса модели - индекс, который его покрывает, или None"""
+    report = []
+    for model in models or registered_models():
+        specs = [ID_INDEX, *model.indexes]
+        for query in getattr(model, 'queries', []):
+            covered_by = next((spec.name for spec in specs if index_supports(spec, query)), None)
+            report.append({'collection': model.collection_name, 'query': query.name, 'index': covered_by})
+    return report
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Создание и сверка индексов монги по описанию в моделях')
+    parser.add_argument('--drop-unknown', action='store_true', help='Удалить индексы, которые не объявлены в моделях')
+    parser.add_argument('--report', action='store_true', help='Только вывести, какие запросы покрыты индексами')
+    args = parser.parse_args()
+
+    if not args.report:
+        for row in ensure_indexes(drop_unknown=args.drop_unknown):
+            print(f"{row['collection']}.{row['index']}: {row['action']}")
+    for row in coverage_report():
+        print(f"{row['collection']} {row['query']}: {row['index'] or 'НЕ ПОКРЫТ'}")
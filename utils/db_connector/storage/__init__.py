@@ -0,0 +1,36 @@
+import os
+import threading
+
+from config import STORAGE_BACKEND, SQLITE_PATH, MONGO_DB_NAME
+from .base import StorageCollection, StorageDatabase, StorageCursor
+from .memory import MemoryCollection, MemoryDatabase
+from .sqlite import SQLiteCollection, SQLiteDatabase
+from .mongo import mongo_database
+
+_database: StorageDatabase | None = None
+_database_pid: int | None = None
+_database_backend: str | None = None
+_database_lock = threading.Lock()
+
+
+def get_storage_database(backend: str = None):
+    """
+    База выбранного хранилища: mongo, memory или sqlite (STORAGE_BACKEND).
+    memory живет в памяти процесса, у каждого воркера своя. sqlite общая для процессов через файл SQLITE_PATH.
+    """
+    global _database, _database_pid, _database_backend
+    backend = backend or STORAGE_BACKEND
+    if backend == 'mongo':
+        return mongo_database()
+    pid = os.getpid()
+    with _database_lock:
+        if _database is None or _database_pid != pid or _database_backend != backend:
+            if backend == 'memory':
+                _database = MemoryDatabase(MONGO_DB_NAME)
+            elif backend == 'sqlite':
+                _database = SQLiteDatabase(MONGO_DB_NAME, SQLITE_PATH)
+            else:
+                raise ValueError(f'Unknown storage backend: {backend}')
+            _database_pid = pid
+            _database_backend = backend
+        return _database
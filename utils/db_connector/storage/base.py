@@ -0,0 +1,271 @@
+import threading
+from abc import ABC, abstractmethod
+from typing import Iterable, Iterator
+
+from pymongo import InsertOne, UpdateOne, UpdateMany, DeleteOne, DeleteMany, ReplaceOne
+from pymongo.errors import BulkWriteError, DuplicateKeyError
+from pymongo.results import InsertOneResult, InsertManyResult, UpdateResult, DeleteResult, BulkWriteResult
+from bson import ObjectId
+
+from .matcher import matches, apply_update, apply_projection, sort_documents, _MISSING
+
+
+def equality_values(filter: dict | None, path: str) -> list | None:
+    """
+    Значения, которым по фильтру обязано равняться поле: {path: v}, {path: {'$eq': v}}, {path: {'$in': [...]}},
+    в том числе внутри $and. None - фильтр не ограничивает поле равенством и индекс по нему не поможет.
+    """
+    if not filter:
+        return None
+    condition = filter.get(path, _MISSING)
+    if condition is not _MISSING:
+        if isinstance(condition, dict) and condition and all(key.startswith('$') for key in condition):
+            if '$eq' in condition:
+                return [condition['$eq']]
+            if '$in' in condition:
+                return list(condition['$in'])
+        elif not isinstance(condition, dict):
+            return [condition]
+    for item in filter.get('$and', []):
+        values = equality_values(item, path)
+        if values is not None:
+            return values
+    return None
+
+
+class StorageCursor:
+    """Курсор поверх итератора документов с теми методами pymongo курсора, которые использует код"""
+
+    def __init__(self, documents: Iterator[dict]):
+        self._documents = iter(documents)
+
+    def __iter__(self):
+        return self
+
+    def __next__(self) -> dict:
+        return next(self._documents)
+
+    def close(self):
+        self._documents = iter(())
+
+    def batch_size(self, batch_size: int):
+        return self
+
+
+class StorageCollection(ABC):
+    """
+    Коллекция хранилища с интерфейсом pymongo Collection в объеме, который используют ObjectBroker и модели:
+    find/find_one/insert/update/delete/find_one_and_update/bulk_write и фильтры FilterBuilder.
+    Реализации определяют только хранение документов по _id и выборку кандидатов по индексам.
+    """
+
+    def __init__(self, name: str):
+        self.name = name
+        self._lock = threading.RLock()
+        self._indexes = {'_id_': {'key': [('_id', 1)], 'v': 2}}
+
+    @abstractmethod
+    def _get(self, object_id) -> dict | None:
+        ...
+
+    @abstractmethod
+    def _candidates(self, filter: dict | None) -> Iterable[dict]:
+        """Документы, среди которых есть все подходящие под фильтр. Итоговую проверку делает matches"""
+        ...
+
+    @abstractmethod
+    def _put(self, document: dict, old_document: dict | None = None):
+        ...
+
+    @abstractmethod
+    def _remove(self, document: dict):
+        ...
+
+    def _atomic(self):
+        """
+        Контекст, внутри которого проверка фильтра и запись выполняются как одна операция.
+        В памяти достаточно блокировки коллекции, хранилища общие для нескольких процессов переопределяют его транзакцией
+        """
+        return self._lock
+
+    def _duplicate(self, object_id) -> DuplicateKeyError:
+        return DuplicateKeyError(f"E11000 duplicate key error collection: {self.name} dup key: {{ _id: {object_id!r} }}", 11000)
+
+    def _insert(self, document: dict):
+        """Добавляет новый документ, DuplicateKeyError если документ с таким _id уже есть"""
+        if self._get(document['_id']) is not None:
+            raise self._duplicate(document['_id'])
+        self._put(document)
+
+    def _matching(self, filter: dict | None) -> Iterator[dict]:
+        for document in self._candidates(filter):
+            if matches(document, filter):
+                yield document
+
+    def find(self, filter: dict = None, projection: dict = None, sort=None, limit: int = 0, skip: int = 0, **kwargs) -> StorageCursor:
+        documents = self._matching(filter)
+        if sort:
+            documents = iter(sort_documents(list(documents), sort))
+
+        def select():
+            for index, document in enumerate(documents):
+                if index < skip:
+                    continue
+                if limit and index >= skip + limit:
+                    return
+                yield apply_projection(document, projection)
+
+        return StorageCursor(select())
+
+    def find_one(self, filter: dict = None, projection: dict = None, sort=None, **kwargs) -> dict | None:
+        return next(self.find(filter, projection=projection, sort=sort, limit=1), None)
+
+    def count_documents(self, filter: dict = None, **kwargs) -> int:
+        return sum(1 for _ in self._matching(filter))
+
+    def insert_one(self, document: dict, **kwargs) -> InsertOneResult:
+        document.setdefault('_id', ObjectId())
+        with self._atomic():
+            self._insert(apply_projection(document, None))
+        return InsertOneResult(document['_id'], True)
+
+    def insert_many(self, documents: list[dict], ordered: bool = True, **kwargs) -> InsertManyResult:
+        result = self.bulk_write([InsertOne(document) for document in documents], ordered=ordered)
+        return InsertManyResult([document['_id'] for document in documents], result.acknowledged)
+
+    def _update(self, filter: dict, update: dict, upsert: bool = False, many: bool = False) -> tuple[int, int, object]:
+        matched = modified = 0
+        upserted_id = None
+        with self._atomic():
+            targets = list(self._matching(filter))
+            for document in targets if many else targets[:1]:
+                updated = apply_update(document, update)
+                matched += 1
+                if updated != document:
+                    self._put(updated, document)
+                    modified += 1
+            if not targets and upsert:
+                document = {key: value for key, value in (filter or {}).items() if not key.startswith('$') and not isinstance(value, dict)}
+                document = apply_update(document, update)
+                document.setdefault('_id', ObjectId())
+                self._put(document)
+                upserted_id = document['_id']
+        return matched, modified, upserted_id
+
+    def update_one(self, filter: dict, update: dict, upsert: bool = False, **kwargs) -> UpdateResult:
+        matched, modified, upserted_id = self._update(filter, update, upsert)
+        raw = {'n': matched + (1 if upserted_id is not None else 0), 'nModified': modified}
+        if upserted_id is not None:
+            raw['upserted'] = upserted_id
+        return UpdateResult(raw, True)
+
+    def update_many(self, filter: dict, update: dict, upsert: bool = False, **kwargs) -> UpdateResult:
+        matched, modified, upserted_id = self._update(filter, update, upsert, many=True)
+        raw = {'n': matched + (1 if upserted_id is not None else 0), 'nModified': modified}
+        if upserted_id is not None:
+            raw['upserted'] = upserted_id
+        return UpdateResult(raw, True)
+
+    def find_one_and_update(self, filter: dict, update: dict, projection: dict = None, sort=None, return_document: bool = False, **kwargs) -> dict | None:
+        with self._atomic():
+            document = self.find_one(filter, sort=sort)
+            if document is None:
+                return None
+            updated = apply_update(document, update)
+            self._put(updated, document)
+        return apply_projection(updated if return_document else document, projection)
+
+    def _delete(self, filter: dict, many: bool = False) -> int:
+        with self._atomic():
+            targets = list(self._matching(filter))
+            targets = targets if many else targets[:1]
+            for document in targets:
+                self._remove(document)
+        return len(targets)
+
+    def delete_one(self, filter: dict, **kwargs) -> DeleteResult:
+        return DeleteResult({'n': self._delete(filter)}, True)
+
+    def delete_many(self, filter: dict, **kwargs) -> DeleteResult:
+        return DeleteResult({'n': self._delete(filter, many=True)}, True)
+
+    def bulk_write(self, requests: list, ordered: bool = True, **kwargs) -> BulkWriteResult:
+        result = {'nInserted': 0, 'nUpserted': 0, 'nMatched': 0, 'nModified': 0, 'nRemoved': 0, 'upserted': [], 'writeErrors': []}
+        for index, request in enumerate(requests):
+            try:
+                if isinstance(request, InsertOne):
+                    self.insert_one(request._doc)
+                    result['nInserted'] += 1
+                elif isinstance(request, (UpdateOne, UpdateMany)):
+                    matched, modified, upserted_id = self._update(request._filter, request._doc, request._upsert, many=isinstance(request, UpdateMany))
+                    result['nMatched'] += matched
+                    result['nModified'] += modified
+                    if upserted_id is not None:
+                        result['nUpserted'] += 1
+                        result['upserted'].append({'index': index, '_id': upserted_id})
+                elif isinstance(request, ReplaceOne):
+                    with self._atomic():
+                        document = self.find_one(request._filter)
+                        if document is not None:
+                            replacement = {**request._doc, '_id': document['_id']}
+                            self._put(replacement, document)
+                            result['nMatched'] += 1
+                            result['nModified'] += 1
+                elif isinstance(request, (DeleteOne, DeleteMany)):
+                    result['nRemoved'] += self._delete(request._filter, many=isinstance(request, DeleteMany))
+                else:
+                    raise NotImplementedError(f'Bulk operation {type(request).__name__} is not supported by this storage backend')
+            except DuplicateKeyError as e:
+                result['writeErrors'].append({'index': index, 'code': 11000, 'errmsg': str(e), 'op': request})
+                if ordered:
+                    break
+        if result['writeErrors']:
+            raise BulkWriteError(result)
+        return BulkWriteResult(result, True)
+
+    def aggregate(self, pipeline: list, **kwargs):
+        raise NotImplementedError(f'aggregate is not supported by {type(self).__name__}')
+
+    def index_information(self) -> dict:
+        return dict(self._indexes)
+
+    def create_indexes(self, indexes: list, **kwargs) -> list[str]:
+        names = []
+        for index in indexes:
+            document = dict(index.document)
+            name = document.pop('name')
+            document['key'] = list(document['key'].items())
+            self._indexes[name] = document
+            names.append(name)
+        return names
+
+    def create_index(self, keys, **kwargs) -> str:
+        from pymongo import IndexModel
+
+        return self.create_indexes([IndexModel(keys, **kwargs)])[0]
+
+    def drop_index(self, name: str, **kwargs):
+        self._indexes.pop(name, None)
+
+
+class StorageDatabase:
+    """База хранилища: коллекции создаются при первом обращении, как в pymongo"""
+    collection_class: type[StorageCollection]
+
+    def __init__(self, name: str):
+        self.name = name
+        self._collections: dict[str, StorageCollection] = {}
+        self._lock = threading.Lock()
+
+    def _create_collection(self, name: str) -> StorageCollection:
+        return self.collection_class(name)
+
+    def __getitem__(self, name: str) -> StorageCollection:
+        name = str(getattr(name, 'value', name))
+        with self._lock:
+            if name not in self._collections:
+                self._collections[name] = self._create_collection(name)
+            return self._collections[name]
+
+    def get_collection(self, name: str) -> StorageCollection:
+        return self[name]
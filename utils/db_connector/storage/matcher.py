@@ -0,0 +1,203 @@
+import copy
+import re
+from functools import cmp_to_key
+
+from bson import ObjectId
+
+_MISSING = object()
+
+
+def get_path(document: dict, path: str):
+    value = document
+    for key in path.split('.'):
+        if not isinstance(value, dict) or key not in value:
+            return _MISSING
+        value = value[key]
+    return value
+
+
+def set_path(document: dict, path: str, value):
+    *parents, last = path.split('.')
+    for key in parents:
+        document = document.setdefault(key, {})
+    document[last] = value
+
+
+def unset_path(document: dict, path: str):
+    *parents, last = path.split('.')
+    for key in parents:
+        document = document.get(key)
+        if not isinstance(document, dict):
+            return
+    document.pop(last, None)
+
+
+def _type_order(value) -> int:
+    # Упрощенный порядок типов BSON: null < числа < строки < объекты < ObjectId < bool < даты
+    if value is None or value is _MISSING:
+        return 0
+    if isinstance(value, bool):
+        return 5
+    if isinstance(value, (int, float)):
+        return 1
+    if isinstance(value, str):
+        return 2
+    if isinstance(value, dict):
+        return 3
+    if isinstance(value, ObjectId):
+        return 4
+    return 6
+
+
+def compare(left, right) -> int:
+    left_order, right_order = _type_order(left), _type_order(right)
+    if left_order != right_order:
+        return -1 if left_order < right_order else 1
+    if left_order == 0:
+        return 0
+    if left == right:
+        return 0
+    try:
+        return -1 if left < right else 1
+    except TypeError:
+        return -1 if str(left) < str(right) else 1
+
+
+def _comparable(value, operand) -> bool:
+    return value is not _MISSING and _type_order(value) == _type_order(operand)
+
+
+def _match_operator(value, operator: str, operand) -> bool:
+    if operator == '$eq':
+        return _equals(value, operand)
+    if operator == '$ne':
+        return not _equals(value, operand)
+    if operator == '$gt':
+        return _comparable(value, operand) and compare(value, operand) > 0
+    if operator == '$gte':
+        return _comparable(value, operand) and compare(value, operand) >= 0
+    if operator == '$lt':
+        return _comparable(value, operand) and compare(value, operand) < 0
+    if operator == '$lte':
+        return _comparable(value, operand) and compare(value, operand) <= 0
+    if operator == '$in':
+        return any(_equals(value, item) for item in operand)
+    if operator == '$nin':
+        return not any(_equals(value, item) for item in operand)
+    if operator == '$exists':
+        return (value is not _MISSING) == bool(operand)
+    if operator == '$regex':
+        return isinstance(value, str) and re.search(operand, value) is not None
+    if operator == '$not':
+        return not _match_value(value, operand)
+    raise NotImplementedError(f'Operator {operator} is not supported by this storage backend')
+
+
+def _equals(value, operand) -> bool:
+    if value is _MISSING:
+        return operand is None
+    if isinstance(value, list) and not isinstance(operand, list):
+        return operand in value
+    return value == operand
+
+
+def _match_value(value, condition) -> bool:
+    if isinstance(condition, dict) and condition and all(key.startswith('$') for key in condition):
+        options = condition.get('$options', '')
+        for operator, operand in condition.items():
+            if operator == '$options':
+                continue
+            if operator == '$regex' and options:
+                flags = re.IGNORECASE if 'i' in options else 0
+                if not (isinstance(value, str) and re.search(operand, value, flags)):
+                    return False
+                continue
+            if not _match_operator(value, operator, operand):
+                return False
+        return True
+    if isinstance(condition, re.Pattern):
+        return isinstance(value, str) and condition.search(value) is not None
+    return _equals(value, condition)
+
+
+def matches(document: dict, filter: dict | None) -> bool:
+    """Проверка документа фильтром монги: подмножество операторов, которые строит FilterBuilder и брокеры"""
+    for key, condition in (filter or {}).items():
+        if key == '$and':
+            if not all(matches(document, item) for item in condition):
+                return False
+        elif key == '$or':
+            if not any(matches(document, item) for item in condition):
+                return False
+        elif key == '$nor':
+            if any(matches(document, item) for item in condition):
+                return False
+        elif key.startswith('$'):
+            raise NotImplementedError(f'Operator {key} is not supported by this storage backend')
+        elif not _match_value(get_path(document, key), condition):
+            return False
+    return True
+
+
+def apply_update(document: dict, update: dict) -> dict:
+    """Применяет $set/$unset/$inc к копии документа"""
+    result = copy.deepcopy(document)
+    for operator, fields in update.items():
+        for path, value in fields.items():
+            if operator == '$set':
+                set_path(result, path, value)
+            elif operator == '$unset':
+                unset_path(result, path)
+            elif operator == '$inc':
+                current = get_path(result, path)
+                set_path(result, path, (0 if current is _MISSING else current) + value)
+            else:
+                raise NotImplementedError(f'Update operator {operator} is not supported by this storage backend')
+    return result
+
+
+def apply_projection(document: dict, projection: dict | None) -> dict:
+    if not projection:
+        return copy.deepcopy(document)
+    include_id = projection.get('_id', 1)
+    fields = {path: value for path, value in projection.items() if path != '_id'}
+    if fields and all(value for value in fields.values()):
+        result = {}
+        for path in fields:
+            value = get_path(document, path)
+            if value is not _MISSING:
+                set_path(result, path, copy.deepcopy(value))
+    else:
+        result = copy.deepcopy(document)
+        for path in fields:
+            unset_path(result, path)
+    if include_id and '_id' in document:
+        result['_id'] = document['_id']
+    else:
+        result.pop('_id', None)
+    return result
+
+
+def normalize_sort(sort) -> list[tuple[str, int]]:
+    if not sort:
+        return []
+    if isinstance(sort, dict):
+        return list(sort.items())
+    if isinstance(sort, str):
+        return [(sort, 1)]
+    return [tuple(item) for item in sort]
+
+
+def sort_documents(documents: list[dict], sort) -> list[dict]:
+    keys = normalize_sort(sort)
+    if not keys:
+        return documents
+
+    def compare_documents(left: dict, right: dict) -> int:
+        for path, direction in keys:
+            result = compare(get_path(left, path), get_path(right, path))
+            if result:
+                return result * (1 if direction >= 0 else -1)
+        return 0
+
+    return sorted(documents, key=cmp_to_key(compare_documents))
@@ -0,0 +1,67 @@
+from typing import Iterable
+
+from .base import StorageCollection, StorageDatabase, equality_values
+from .matcher import get_path, _MISSING
+
+
+class MemoryCollection(StorageCollection):
+    """
+    Коллекция в памяти процесса. Документы лежат в словаре по _id, для полей из indexed_paths
+    держится отдельный индекс значение -> _id, поэтому выборка по статусу не обходит всю коллекцию.
+    """
+    indexed_paths = ('system.status',)
+
+    def __init__(self, name: str):
+        super().__init__(name)
+        self._documents: dict = {}
+        self._paths: dict[str, dict] = {path: {} for path in self.indexed_paths}
+
+    def _index_add(self, document: dict):
+        for path, index in self._paths.items():
+            value = get_path(document, path)
+            if value is not _MISSING:
+                index.setdefault(value, {})[document['_id']] = None
+
+    def _index_remove(self, document: dict):
+        for path, index in self._paths.items():
+            value = get_path(document, path)
+            if value is not _MISSING and value in index:
+                index[value].pop(document['_id'], None)
+                if not index[value]:
+                    del index[value]
+
+    def _get(self, object_id) -> dict | None:
+        return self._documents.get(object_id)
+
+    def _candidates(self, filter: dict | None) -> Iterable[dict]:
+        with self._lock:
+            ids = equality_values(filter, '_id')
+            if ids is None:
+                for path, index in self._paths.items():
+                    values = equality_values(filter, path)
+                    if values is not None:
+                        ids = [object_id for value in values for object_id in index.get(value, {})]
+                        break
+            if ids is None:
+                snapshot = list(self._documents.values())
+            else:
+                snapshot = [self._documents[object_id] for object_id in ids if object_id in self._documents]
+        return snapshot
+
+    def _put(self, document: dict, old_document: dict | None = None):
+        with self._lock:
+            previous = self._documents.get(document['_id'])
+            if previous is not None:
+                self._index_remove(previous)
+            self._documents[document['_id']] = document
+            self._index_add(document)
+
+    def _remove(self, document: dict):
+        with self._lock:
+            previous = self._documents.pop(document['_id'], None)
+            if previous is not None:
+                self._index_remove(previous)
+
+
+class MemoryDatabase(StorageDatabase):
+    collection_class = MemoryCollection
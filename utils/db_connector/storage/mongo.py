@@ -0,0 +1,13 @@
+from pymongo.database import Database
+
+from config import MONGO_DB_NAME
+
+
+def mongo_database() -> Database:
+    """
+    Основное хранилище - сама монга: pymongo Database и Collection и задают интерфейс,
+    который повторяют MemoryCollection и SQLiteCollection.
+    """
+    from ..client import get_client
+
+    return get_client()[MONGO_DB_NAME]
@@ -0,0 +1,123 @@
+import os
+import sqlite3
+import threading
+from contextlib import contextmanager
+from typing import Iterable
+
+from bson import json_util
+
+from .base import StorageCollection, StorageDatabase, equality_values
+from .matcher import get_path, _MISSING
+
+
+class SQLiteCollection(StorageCollection):
+    """
+    Коллекция в таблице SQLite: документ хранится в extended json (ObjectId и даты не теряются),
+    _id и system.status вынесены в отдельные колонки с индексами. По ним делается выборка в SQL,
+    остальные условия фильтра проверяются после чтения.
+    """
+    status_path = 'system.status'
+    fetch_size = 500
+
+    def __init__(self, database: 'SQLiteDatabase', name: str):
+        super().__init__(name)
+        self.database = database
+        self.table = '"' + name.replace('"', '""') + '"'
+        with self.database.connection() as connection:
+            connection.execute(f'CREATE TABLE IF NOT EXISTS {self.table} (id TEXT PRIMARY KEY, status TEXT, document TEXT NOT NULL)')
+            connection.execute(f'CREATE INDEX IF NOT EXISTS "{name}_status" ON {self.table} (status)')
+
+    @staticmethod
+    def _key(object_id) -> str:
+        return json_util.dumps(object_id)
+
+    def _status(self, document: dict) -> str | None:
+        value = get_path(document, self.status_path)
+        return None if value is _MISSING else str(getattr(value, 'value', value))
+
+    def _get(self, object_id) -> dict | None:
+        row = self.database.connection().execute(f'SELECT document FROM {self.table} WHERE id = ?', (self._key(object_id),)).fetchone()
+        return json_util.loads(row[0]) if row else None
+
+    def _candidates(self, filter: dict | None) -> Iterable[dict]:
+        query = f'SELECT document FROM {self.table}'
+        parameters: list = []
+        ids = equality_values(filter, '_id')
+        statuses = equality_values(filter, self.status_path)
+        if ids is not None:
+            query += f" WHERE id IN ({', '.join('?' * len(ids))})"
+            parameters = [self._key(object_id) for object_id in ids]
+        elif statuses is not None:
+            query += f" WHERE status IN ({', '.join('?' * len(statuses))})"
+            parameters = [str(getattr(status, 'value', status)) for status in statuses]
+        query += ' ORDER BY rowid'
+        cursor = self.database.connection().execute(query, parameters)
+        while True:
+            rows = cursor.fetchmany(self.fetch_size)
+            if not rows:
+                return
+            for row in rows:
+                yield json_util.loads(row[0])
+
+    @contextmanager
+    def _atomic(self):
+        """
+        Транзакция BEGIN IMMEDIATE: запись в файл сразу блокируется для других соединений, в том числе из других
+        процессов, поэтому проверка фильтра и запись не перемежаются с чужими. Вложенные вызовы идут в открытой транзакции
+        """
+        with self._lock:
+            connection = self.database.connection()
+            if connection.in_transaction:
+                yield connection
+                return
+            connection.execute('BEGIN IMMEDIATE')
+            try:
+                yield connection
+            except BaseException:
+                connection.rollback()
+                raise
+            connection.commit()
+
+    def _values(self, document: dict) -> tuple:
+        return self._status(document), json_util.dumps(document), self._key(document['_id'])
+
+    def _insert(self, document: dict):
+        with self._atomic() as connection:
+            try:
+                connection.execute(f'INSERT INTO {self.table} (status, document, id) VALUES (?, ?, ?)', self._values(document))
+            except sqlite3.IntegrityError:
+                raise self._duplicate(document['_id']) from None
+
+    def _put(self, document: dict, old_document: dict | None = None):
+        with self._atomic() as connection:
+            values = self._values(document)
+            if connection.execute(f'UPDATE {self.table} SET status = ?, document = ? WHERE id = ?', values).rowcount == 0:
+                connection.execute(f'INSERT INTO {self.table} (status, document, id) VALUES (?, ?, ?)', values)
+
+    def _remove(self, document: dict):
+        with self._atomic() as connection:
+            connection.execute(f'DELETE FROM {self.table} WHERE id = ?', (self._key(document['_id']),))
+
+
+class SQLiteDatabase(StorageDatabase):
+    """База в одном файле SQLite. У каждого потока свое соединение, файл в режиме WAL для параллельного чтения"""
+
+    def __init__(self, name: str, path: str):
+        super().__init__(name)
+        self.path = path
+        self._local = threading.local()
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+    def connection(self) -> sqlite3.Connection:
+        connection = getattr(self._local, 'connection', None)
+        if connection is None:
+            connection = sqlite3.connect(self.path, timeout=30)
+            connection.execute('PRAGMA journal_mode=WAL')
+            connection.execute('PRAGMA synchronous=NORMAL')
+            self._local.connection = connection
+        return connection
+
+    def _create_collection(self, name: str) -> StorageCollection:
+        return SQLiteCollection(self, name)
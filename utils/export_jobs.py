@@ -0,0 +1,166 @@
+import datetime
+import gzip
+import io
+import json
+import os
+import re
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, TextIO
+
+from config import EXPORT_JOBS_DIR, EXPORT_JOBS_WORKERS, EXPORT_JOBS_TTL, EXPORT_JOBS_STALE_TIMEOUT, EXPORT_JOBS_PENDING_TIMEOUT
+from utils.db_connector.errors import ExportJobNotFoundError
+
+JOB_ID_PATTERN = re.compile(r'^[0-9a-f]{32}$')
+# Имя файла внутри gzip, его восстанавливает gunzip -N
+ARCHIVE_MEMBER_NAME = 'articles.csv'
+
+
+class ExportJobStatus:
+    PENDING = 'pending'
+    RUNNING = 'running'
+    DONE = 'done'
+    FAILED = 'failed'
+
+
+class ExportJobs:
+    """
+    Фоновые выгрузки в файлы на диске. Задача пишет gzip файл во временный путь и переименовывает его по готовности,
+    состояние лежит рядом в json. Поэтому статус и скачивание обслуживает любой воркер gunicorn,
+    а повторные и докачиваемые скачивания читают готовый файл без обращений к монге.
+    """
+
+    def __init__(self, directory: str = EXPORT_JOBS_DIR, workers: int = EXPORT_JOBS_WORKERS):
+        # send_file считает относительные пути от каталога приложения, а не от рабочего
+        self.directory = os.path.abspath(directory)
+        self.workers = workers
+        self._executor: ThreadPoolExecutor | None = None
+        self._executor_pid: int | None = None
+        self._lock = threading.Lock()
+
+    @property
+    def executor(self) -> ThreadPoolExecutor:
+        # Пул потоков не переживает fork, в каждом воркере создается свой
+        pid = os.getpid()
+        with self._lock:
+            if self._executor is None or self._executor_pid != pid:
+                self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix='export')
+                self._executor_pid = pid
+            return self._executor
+
+    def _path(self, job_id: str, suffix: str) -> str:
+        if not JOB_ID_PATTERN.match(job_id):
+            raise ExportJobNotFoundError
+        return os.path.join(self.directory, job_id + suffix)
+
+    def meta_path(self, job_id: str) -> str:
+        return self._path(job_id, '.json')
+
+    def file_path(self, job_id: str) -> str:
+        return self._path(job_id, '.csv.gz')
+
+    def _write_meta(self, job: dict):
+        path = self.meta_path(job['id'])
+        temporary = f'{path}.{os.getpid()}.tmp'
+        with open(temporary, 'w') as file:
+            json.dump(job, file)
+        os.replace(temporary, path)
+
+    def _update(self, job: dict, **changes) -> dict:
+        job.update(changes, updated_at=datetime.datetime.now(datetime.timezone.utc).isoformat())
+        self._write_meta(job)
+        return job
+
+    def start(self, write: Callable[[TextIO], int], params: dict = None) -> dict:
+        """
+        Ставит выгрузку в очередь
+
+        :param write: Функция, которая пишет csv в переданный текстовый файл и возвращает число строк.
+            Выполняется в фоновом потоке, поэтому все параметры запроса должны быть собраны заранее
+        :param params: Параметры выгрузки, сохраняются в состоянии задачи для клиента
+        :return: Состояние задачи
+        """
+        os.makedirs(self.directory, exist_ok=True)
+        self.cleanup()
+        now = datetime.datetime.now(datetime.timezone.utc).isoformat()
+        job = {
+            'id': uuid.uuid4().hex,
+            'status': ExportJobStatus.PENDING,
+            'params': params or {},
+            'rows': None,
+            'size': None,
+            'error': None,
+            'created_at': now,
+            'updated_at': now,
+        }
+        self._write_meta(job)
+        self.executor.submit(self._run, job, write)
+        return job
+
+    @staticmethod
+    def _pending_expired(job: dict) -> bool:
+        created_at = datetime.datetime.fromisoformat(job['created_at']).timestamp()
+        return time.time() - created_at > EXPORT_JOBS_PENDING_TIMEOUT
+
+    def _run(self, job: dict, write: Callable[[TextIO], int]):
+        if self._pending_expired(job):
+            # клиенту уже ответили, что задача не запустилась, выгружать ее поздно
+            self._update(job, status=ExportJobStatus.FAILED, error='Export was not started in time')
+            return
+        path = self.file_path(job['id'])
+        temporary = path + '.tmp'
+        self._update(job, status=ExportJobStatus.RUNNING)
+        try:
+            with open(temporary, 'wb') as raw, \
+                    gzip.GzipFile(filename=ARCHIVE_MEMBER_NAME, mode='wb', fileobj=raw) as compressed, \
+                    io.TextIOWrapper(compressed, encoding='utf-8', newline='') as file:
+                rows = write(file)
+            os.replace(temporary, path)
+        except Exception as e:
+            if os.path.exists(temporary):
+                os.remove(temporary)
+            self._update(job, status=ExportJobStatus.FAILED, error=str(e))
+            return
+        self._update(job, status=ExportJobStatus.DONE, rows=rows, size=os.path.getsize(path))
+
+    def get(self, job_id: str) -> dict:
+        """
+        Состояние задачи. Идущая задача, которая давно не обновлялась, считается упавшей:
+        ее воркер был перезапущен посреди выгрузки. Ожидающая в очереди задача считается упавшей через
+        EXPORT_JOBS_PENDING_TIMEOUT от создания: очередь пула живет в памяти воркера и теряется при его перезапуске
+        """
+        try:
+            with open(self.meta_path(job_id)) as file:
+                job = json.load(file)
+        except FileNotFoundError:
+            raise ExportJobNotFoundError
+        if job['status'] == ExportJobStatus.RUNNING:
+            updated_at = datetime.datetime.fromisoformat(job['updated_at']).timestamp()
+            try:
+                # идущая выгрузка постоянно дописывает временный файл
+                updated_at = max(updated_at, os.path.getmtime(self.file_path(job_id) + '.tmp'))
+            except FileNotFoundError:
+                pass
+            if time.time() - updated_at > EXPORT_JOBS_STALE_TIMEOUT:
+                job['status'] = ExportJobStatus.FAILED
+                job['error'] = 'Export was interrupted'
+        elif job['status'] == ExportJobStatus.PENDING and self._pending_expired(job):
+            job['status'] = ExportJobStatus.FAILED
+            job['error'] = 'Export was not started in time'
+        return job
+
+    def cleanup(self):
+        """Удаляет файлы и состояния задач старше EXPORT_JOBS_TTL"""
+        deadline = time.time() - EXPORT_JOBS_TTL
+        for name in os.listdir(self.directory):
+            path = os.path.join(self.directory, name)
+            try:
+                if os.path.getmtime(path) < deadline:
+                    os.remove(path)
+            except FileNotFoundError:
+                pass
+
+
+export_jobs = ExportJobs()
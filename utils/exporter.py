@@ -0,0 +1,211 @@
+import csv
+import zlib
+from dataclasses import dataclass
+from io import StringIO
+from typing import AsyncIterable, AsyncIterator, Callable, Iterable, Iterator
+
+from werkzeug.datastructures import MIMEAccept
+
+from config import EXPORT_BATCH_SIZE, EXPORT_GZIP_LEVEL
+from utils import fast_json
+from utils.db_connector.errors import UnsupportedExportFormat
+
+try:
+    import pyarrow
+    import pyarrow.ipc
+    import pyarrow.parquet
+except ImportError:
+    pyarrow = None
+
+
+def stream_csv(rows: Iterable[dict], fieldnames: list[str], chunk_rows: int = EXPORT_BATCH_SIZE) -> Iterator[str]:
+    """
+    Построчно собирает csv и отдает его кусками по chunk_rows строк. В памяти держится только текущий кусок.
+
+    :param rows: Итератор по строкам в формате словаря
+    :param fieldnames: Колонки csv, лишние ключи в строках игнорируются
+    :param chunk_rows: Сколько строк отдается клиенту за один раз
+    """
+    buffer = StringIO()
+    writer = csv.DictWriter(buffer, fieldnames=fieldnames, extrasaction='ignore')
+    writer.writeheader()
+    for index, row in enumerate(rows, start=1):
+        writer.writerow(row)
+        if index % chunk_rows == 0:
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate(0)
+    if buffer.tell():
+        yield buffer.getvalue()
+
+
+async def astream_csv(rows: AsyncIterable[dict], fieldnames: list[str], chunk_rows: int = EXPORT_BATCH_SIZE) -> AsyncIterator[str]:
+    """Асинхронный stream_csv для курсора motor"""
+    buffer = StringIO()
+    writer = csv.DictWriter(buffer, fieldnames=fieldnames, extrasaction='ignore')
+    writer.writeheader()
+    index = 0
+    async for row in rows:
+        index += 1
+        writer.writerow(row)
+        if index % chunk_rows == 0:
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate(0)
+    if buffer.tell():
+        yield buffer.getvalue()
+
+
+def stream_ndjson(rows: Iterable[dict], fieldnames: list[str] = None, chunk_rows: int = EXPORT_BATCH_SIZE) -> Iterator[bytes]:
+    """
+    Построчный json: один объект на строку, отдается кусками по chunk_rows строк
+
+    :param fieldnames: Не используется, оставлен для единой сигнатуры форматов
+    """
+    lines = []
+    for row in rows:
+        lines.append(fast_json.dumps(row))
+        if len(lines) == chunk_rows:
+            lines.append(b'')
+            yield b'\n'.join(lines)
+            lines = []
+    if lines:
+        lines.append(b'')
+        yield b'\n'.join(lines)
+
+
+def gzip_stream(chunks: Iterable[str | bytes], level: int = EXPORT_GZIP_LEVEL) -> Iterator[bytes]:
+    """Сжимает поток кусков в gzip на лету, в памяти только внутренний буфер zlib"""
+    compressor = zlib.compressobj(level, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+    for chunk in chunks:
+        data = compressor.compress(chunk.encode() if isinstance(chunk, str) else chunk)
+        if data:
+            yield data
+    yield compressor.flush()
+
+
+class _ChunkSink:
+    """Файл для pyarrow, который копит записанные байты до следующего drain"""
+
+    def __init__(self):
+        self.closed = False
+        self._chunks: list[bytes] = []
+        self._position = 0
+
+    def write(self, data) -> int:
+        data = bytes(data)
+        self._chunks.append(data)
+        self._position += len(data)
+        return len(data)
+
+    def tell(self) -> int:
+        return self._position
+
+    def flush(self):
+        pass
+
+    def close(self):
+        self.closed = True
+
+    def drain(self) -> bytes:
+        data = b''.join(self._chunks)
+        self._chunks = []
+        return data
+
+
+def _record_batches(rows: Iterable[dict], fieldnames: list[str], chunk_rows: int) -> Iterator:
+    """Строки пачками по chunk_rows в RecordBatch, все колонки строковые"""
+    columns = {name: [] for name in fieldnames}
+    count = 0
+    for row in rows:
+        for name in fieldnames:
+            value = row.get(name)
+            columns[name].append(None if value is None else str(getattr(value, 'value', value)))
+        count += 1
+        if count == chunk_rows:
+            yield pyarrow.record_batch([pyarrow.array(columns[name], pyarrow.string()) for name in fieldnames], names=fieldnames)
+            columns = {name: [] for name in fieldnames}
+            count = 0
+    if count:
+        yield pyarrow.record_batch([pyarrow.array(columns[name], pyarrow.string()) for name in fieldnames], names=fieldnames)
+
+
+def _arrow_schema(fieldnames: list[str]):
+    return pyarrow.schema([(name, pyarrow.string()) for name in fieldnames])
+
+
+def stream_parquet(rows: Iterable[dict], fieldnames: list[str], chunk_rows: int = EXPORT_BATCH_SIZE) -> Iterator[bytes]:
+    """Parquet, где каждая пачка из chunk_rows строк - отдельная row group, записанная и отданная сразу"""
+    sink = _ChunkSink()
+    with pyarrow.parquet.ParquetWriter(pyarrow.PythonFile(sink, mode='w'), _arrow_schema(fieldnames), compression='zstd') as writer:
+        for batch in _record_batches(rows, fieldnames, chunk_rows):
+            writer.write_batch(batch, row_group_size=chunk_rows)
+            data = sink.drain()
+            if data:
+                yield data
+    # футер parquet пишется при закрытии
+    yield sink.drain()
+
+
+def stream_arrow(rows: Iterable[dict], fieldnames: list[str], chunk_rows: int = EXPORT_BATCH_SIZE) -> Iterator[bytes]:
+    """Arrow IPC stream: схема и затем пачки по chunk_rows строк, читается потоково через pyarrow.ipc.open_stream"""
+    sink = _ChunkSink()
+    with pyarrow.ipc.new_stream(pyarrow.PythonFile(sink, mode='w'), _arrow_schema(fieldnames)) as writer:
+        for batch in _record_batches(rows, fieldnames, chunk_rows):
+            writer.write_batch(batch)
+            data = sink.drain()
+            if data:
+                yield data
+    yield sink.drain()
+
+
+@dataclass(frozen=True)
+class ExportFormat:
+    name: str
+    mimetype: str
+    extension: str
+    # stream(rows, fieldnames) -> куски str или bytes
+    stream: Callable[..., Iterator[str | bytes]]
+    # строки с None (json без пустых полей) или плоские строки со всеми колонками
+    drop_none: bool = False
+    requires_pyarrow: bool = False
+
+    @property
+    def available(self) -> bool:
+        return not self.requires_pyarrow or pyarrow is not None
+
+
+EXPORT_FORMATS = {
+    export_format.name: export_format for export_format in (
+        ExportFormat('csv', 'text/csv', 'csv', stream_csv),
+        ExportFormat('csv.gz', 'application/gzip', 'csv.gz', lambda rows, fieldnames: gzip_stream(stream_csv(rows, fieldnames))),
+        ExportFormat('ndjson', 'application/x-ndjson', 'ndjson', stream_ndjson, drop_none=True),
+        ExportFormat('parquet', 'application/vnd.apache.parquet', 'parquet', stream_parquet, requires_pyarrow=True),
+        ExportFormat('arrow', 'application/vnd.apache.arrow.stream', 'arrows', stream_arrow, requires_pyarrow=True),
+    )
+}
+
+
+def select_export_format(name: str | None, accepted: MIMEAccept, formats: dict[str, ExportFormat] = EXPORT_FORMATS) -> ExportFormat:
+    """
+    Формат выгрузки: явный параметр format, иначе лучший по Accept. Если Accept нет или ни один формат в нем
+    не назван (например, клиент по умолчанию шлет application/json) - csv, как и до появления других форматов
+
+    :param name: Значение параметра format
+    :param accepted: Разобранный заголовок Accept
+    :param formats: Форматы, которые умеет отдавать маршрут
+    :raises UnsupportedExportFormat: Явно запрошенный формат неизвестен или для него не установлен pyarrow
+    """
+    available = {export_format.name: export_format for export_format in formats.values() if export_format.available}
+    if name is None:
+        mimetypes = {export_format.mimetype: export_format.name for export_format in available.values()}
+        name = 'csv'
+        if accepted and accepted.best != '*/*':
+            name = mimetypes.get(accepted.best_match(list(mimetypes)), 'csv')
+    selected = available.get(name)
+    if selected is None:
+        supported = f"Supported formats: {', '.join(available)}"
+        if name in formats:
+            raise UnsupportedExportFormat(f'Format {name} requires pyarrow. {supported}')
+        raise UnsupportedExportFormat(supported)
+    return selected
@@ -0,0 +1,30 @@
+import datetime
+import json
+from enum import Enum
+
+from bson import ObjectId
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+
+def _default(value):
+    if isinstance(value, ObjectId):
+        return str(value)
+    if isinstance(value, (datetime.datetime, datetime.date)):
+        return value.isoformat()
+    if isinstance(value, Enum):
+        return value.value
+    raise TypeError(f'Type is not JSON serializable: {type(value).__name__}')
+
+
+def dumps(data) -> bytes:
+    """
+    Сериализация ответа сразу в байты. ObjectId и datetime кодируются на лету, без предварительного
+    обхода DataValidator.object_ids_to_string. Если установлен orjson - используется он.
+    """
+    if orjson is not None:
+        return orjson.dumps(data, default=_default)
+    return json.dumps(data, default=_default, ensure_ascii=False, separators=(',', ':')).encode()
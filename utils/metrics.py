@@ -0,0 +1,233 @@
+import bisect
+import logging
+import threading
+import time
+from contextlib import contextmanager
+from functools import wraps
+from typing import Callable
+
+from flask import Flask, Response, g, request
+from pymongo import monitoring
+
+from config import METRICS_ENABLED, METRICS_SPANS, SLOW_REQUEST_THRESHOLD_MS
+
+# Границы корзин в секундах: от долей миллисекунды для чтения из кэша до десятков секунд для выгрузки
+DEFAULT_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+slow_request_logger = logging.getLogger('slow_requests')
+
+
+def _escape(value) -> str:
+    return str(value).replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"')
+
+
+def _labels(names: tuple, values: tuple, extra: str = '') -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return '{' + ','.join(pairs) + '}' if pairs else ''
+
+
+class Histogram:
+    """Гистограмма в формате Prometheus: накопленные корзины, сумма и количество на каждый набор меток"""
+
+    def __init__(self, name: str, description: str, label_names: tuple = (), buckets: tuple = DEFAULT_BUCKETS):
+        self.name = name
+        self.description = description
+        self.label_names = tuple(label_names)
+        self.buckets = tuple(sorted(buckets))
+        self._lock = threading.Lock()
+        self._series: dict[tuple, list] = {}
+
+    def observe(self, value: float, *label_values):
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(label_values)
+            if series is None:
+                # счетчики по корзинам (последняя +Inf), сумма, количество
+                series = self._series[label_values] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            series[0][index] += 1
+            series[1] += value
+            series[2] += 1
+
+    def render(self) -> list[str]:
+        lines = [f'# HELP {self.name} {self.description}', f'# TYPE {self.name} histogram']
+        with self._lock:
+            series = [(labels, list(counts), total, count) for labels, (counts, total, count) in self._series.items()]
+        for label_values, counts, total, count in series:
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets + (float('inf'),), counts):
+                cumulative += bucket_count
+                le = '+Inf' if bound == float('inf') else repr(bound)
+                bucket_label = f'le="{le}"'
+                lines.append(f'{self.name}_bucket{_labels(self.label_names, label_values, bucket_label)} {cumulative}')
+            lines.append(f'{self.name}_sum{_labels(self.label_names, label_values)} {total}')
+            lines.append(f'{self.name}_count{_labels(self.label_names, label_values)} {count}')
+        return lines
+
+
+class Gauge:
+    """Значения, которые снимаются в момент запроса /metrics: collect() -> {(значения меток): число}"""
+
+    def __init__(self, name: str, description: str, label_names: tuple, collect: Callable[[], dict]):
+        self.name = name
+        self.description = description
+        self.label_names = tuple(label_names)
+        self.collect = collect
+
+    def render(self) -> list[str]:
+        lines = [f'# HELP {self.name} {self.description}', f'# TYPE {self.name} gauge']
+        for label_values, value in self.collect().items():
+            lines.append(f'{self.name}{_labels(self.label_names, label_values)} {value}')
+        return lines
+
+
+class MetricsRegistry:
+    def __init__(self):
+        self._metrics: dict[str, Histogram | Gauge] = {}
+        self._lock = threading.Lock()
+
+    def register(self, metric):
+        with self._lock:
+            return self._metrics.setdefault(metric.name, metric)
+
+    def histogram(self, name: str, description: str, label_names: tuple = (), buckets: tuple = DEFAULT_BUCKETS) -> Histogram:
+        return self.register(Histogram(name, description, label_names, buckets))
+
+    def gauge(self, name: str, description: str, label_names: tuple, collect: Callable[[], dict]) -> Gauge:
+        return self.register(Gauge(name, description, label_names, collect))
+
+    def render(self) -> str:
+        with self._lock:
+            metrics = list(self._metrics.values())
+        lines = []
+        for metric in metrics:
+            lines.extend(metric.render())
+        return '\n'.join(lines) + '\n'
+
+
+registry = MetricsRegistry()
+
+request_duration = registry.histogram(
+    'http_request_duration_seconds', 'Время обработки HTTP запроса', ('method', 'route', 'status')
+)
+mongo_command_duration = registry.histogram(
+    'mongo_command_duration_seconds', 'Время выполнения команды монги', ('collection', 'command', 'outcome')
+)
+span_duration = registry.histogram(
+    'app_span_duration_seconds', 'Время участков обработки запроса: валидация, сборка моделей, сериализация', ('span',)
+)
+
+
+@contextmanager
+def span(name: str):
+    """
+    Замер участка кода в app_span_duration_seconds{span=name}. Включается METRICS_SPANS,
+    иначе это пустой контекст: замеры на горячем пути не должны стоить ничего, когда не нужны.
+    """
+    if not METRICS_SPANS:
+        yield
+        return
+    started_at = time.perf_counter()
+    try:
+        yield
+    finally:
+        span_duration.observe(time.perf_counter() - started_at, name)
+
+
+def timed(name: str):
+    """Декоратор для span: @timed('export.csv')"""
+
+    def decorator(function):
+        @wraps(function)
+        def wrapper(*args, **kwargs):
+            with span(name):
+                return function(*args, **kwargs)
+
+        return wrapper
+
+    return decorator
+
+
+class MongoCommandListener(monitoring.CommandListener):
+    """Время команд монги по коллекциям. Имя коллекции есть только в started, поэтому запоминаем его по request_id"""
+
+    def __init__(self):
+        self._collections: dict[tuple, str] = {}
+
+    @staticmethod
+    def _key(event) -> tuple:
+        return event.connection_id, event.request_id, event.operation_id
+
+    def started(self, event):
+        collection = event.command.get(event.command_name)
+        self._collections[self._key(event)] = collection if isinstance(collection, str) else ''
+
+    def _observe(self, event, outcome: str):
+        collection = self._collections.pop(self._key(event), '')
+        mongo_command_duration.observe(event.duration_micros / 1_000_000, collection, event.command_name, outcome)
+
+    def succeeded(self, event):
+        self._observe(event, 'success')
+
+    def failed(self, event):
+        self._observe(event, 'failure')
+
+
+mongo_command_listener = MongoCommandListener()
+
+
+def _pool_gauges() -> dict:
+    from utils.db_connector.client import pool_stats
+
+    stats = pool_stats()
+    return {(name,): stats[name] for name in ('checked_out', 'max_checked_out', 'connections_open', 'checkout_failures', 'wait_time_max')}
+
+
+def _cache_gauges() -> dict:
+    from utils.db_connector.cache import get_document_cache
+
+    return {(name,): value for name, value in get_document_cache().stats().items() if isinstance(value, (int, float))}
+
+
+registry.gauge('mongo_pool', 'Состояние пула соединений монги', ('stat',), _pool_gauges)
+registry.gauge('document_cache', 'Статистика кэша документов', ('stat',), _cache_gauges)
+
+
+def init_metrics(app: Flask) -> MetricsRegistry:
+    """
+    Подключает замеры к приложению: время каждого запроса по шаблону маршрута, лог медленных запросов
+    (дольше SLOW_REQUEST_THRESHOLD_MS), слушатель команд монги и маршрут /metrics в формате Prometheus.
+    Вызывать до первого обращения к монге: слушатели pymongo передаются только при создании клиента.
+    Метрики собираются в памяти процесса, у каждого воркера gunicorn свои.
+    """
+    if not METRICS_ENABLED:
+        return registry
+
+    from utils.db_connector.client import add_event_listener
+
+    add_event_listener(mongo_command_listener)
+
+    @app.before_request
+    def start_timer():
+        g.request_started_at = time.perf_counter()
+
+    @app.after_request
+    def record_request(response):
+        started_at = g.pop('request_started_at', None)
+        if started_at is None:
+            return response
+        elapsed = time.perf_counter() - started_at
+        route = request.url_rule.rule if request.url_rule else 'unmatched'
+        request_duration.observe(elapsed, request.method, route, response.status_code)
+        if SLOW_REQUEST_THRESHOLD_MS and elapsed * 1000 >= SLOW_REQUEST_THRESHOLD_MS:
+            slow_request_logger.warning(
+                'Slow request %s %s -> %s in %.1f ms', request.method, request.full_path.rstrip('?'), response.status_code, elapsed * 1000
+            )
+        return response
+
+    def metrics_view():
+        return Response(registry.render(), mimetype='text/plain; version=0.0.4')
+
+    app.add_url_rule('/metrics', 'metrics', metrics_view)
+    return registry
@@ -0,0 +1,138 @@
+import hashlib
+import json
+import logging
+import os
+import threading
+
+from flask import Flask, Response, request, send_from_directory
+
+from config import SWAGGER_SPEC_PATH, DOCS_ROUTE
+
+logger = logging.getLogger(__name__)
+
+# Модели, схемы которых попадут в definitions спецификации. Регистрируются только при сборке спецификации
+_deferred_models: list = []
+
+DOCS_PAGE = '''<!DOCTYPE html>
+<html>
+<head>
+    <meta charset="utf-8">
+    <title>API docs</title>
+    <link rel="stylesheet" href="{static}/swagger-ui.css">
+</head>
+<body>
+<div id="swagger-ui"></div>
+<script src="{static}/swagger-ui-bundle.js"></script>
+<script src="{static}/swagger-ui-standalone-preset.js"></script>
+<script>
+    SwaggerUIBundle({{
+        url: "{spec_url}",
+        dom_id: "#swagger-ui",
+        presets: [SwaggerUIBundle.presets.apis, SwaggerUIStandalonePreset],
+        layout: "StandaloneLayout"
+    }});
+</script>
+</body>
+</html>
+'''
+
+
+def defer_schema(model):
+    """Замена register_schema при импорте модулей: схема модели строится только при сборке спецификации"""
+    _deferred_models.append(model)
+    return model
+
+
+def build_spec(app: Flask) -> dict:
+    """
+    Собирает спецификацию так же, как раньше при старте приложения: регистрирует схемы моделей,
+    поднимает flasgger и забирает готовый документ по всем @swag_from
+
+    :param app: Приложение с уже импортированными handler
+    """
+    from utils.init_swagger import init_swagger
+    from utils.register_modeles import register_schema
+
+    for model in _deferred_models:
+        register_schema(app, model)
+    swag = init_swagger(app)
+    with app.test_request_context():
+        return swag.get_apispecs(swag.config['specs'][0]['endpoint'])
+
+
+def write_spec(app: Flask, path: str = SWAGGER_SPEC_PATH) -> str:
+    spec = build_spec(app)
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    with open(path, 'w') as file:
+        json.dump(spec, file, ensure_ascii=False, sort_keys=True, default=str)
+    return path
+
+
+class SpecFile:
+    """Готовая спецификация в памяти: читается с диска при первом запросе и дальше отдается одними и теми же байтами"""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+        self._body: bytes | None = None
+        self._etag: str | None = None
+
+    def set(self, spec: dict):
+        self._store(json.dumps(spec, ensure_ascii=False, sort_keys=True, default=str).encode())
+
+    def _store(self, body: bytes):
+        self._body = body
+        self._etag = hashlib.sha1(body).hexdigest()
+
+    def load(self) -> tuple[bytes, str]:
+        if self._body is None:
+            with self._lock:
+                if self._body is None:
+                    with open(self.path, 'rb') as file:
+                        self._store(file.read())
+        return self._body, self._etag
+
+
+def init_docs(app: Flask, path: str = SWAGGER_SPEC_PATH) -> SpecFile:
+    """
+    Документация без сборки спецификации в каждом воркере: json из шага сборки
+    (python -m utils.swagger_spec) отдается с диска с ETag и Cache-Control, страница swagger ui -
+    статикой flasgger. Если файла нет, спецификация собирается сразу, как раньше делал init_swagger.
+    """
+    spec_file = SpecFile(path)
+    spec_url = DOCS_ROUTE.rstrip('/') + '/spec.json'
+    static_url = DOCS_ROUTE.rstrip('/') + '/static'
+
+    if not os.path.exists(path):
+        logger.warning('Swagger spec %s not found, building it on startup', path)
+        spec_file.set(build_spec(app))
+
+    def docs_spec():
+        body, etag = spec_file.load()
+        response = Response(body, mimetype='application/json')
+        response.set_etag(etag)
+        response.cache_control.public = True
+        response.cache_control.max_age = 3600
+        return response.make_conditional(request)
+
+    def docs_page():
+        return Response(DOCS_PAGE.format(static=static_url, spec_url=spec_url), mimetype='text/html')
+
+    def docs_static(filename):
+        import flasgger
+
+        return send_from_directory(os.path.join(os.path.dirname(flasgger.__file__), 'ui3', 'static'), filename, max_age=24 * 60 * 60)
+
+    app.add_url_rule(DOCS_ROUTE, 'docs', docs_page)
+    app.add_url_rule(spec_url, 'docs_spec', docs_spec)
+    app.add_url_rule(f'{static_url}/<path:filename>', 'docs_static', docs_static)
+    return spec_file
+
+
+if __name__ == '__main__':
+    import handler
+    from loader import app
+
+    print(write_spec(app))
@@ -0,0 +1,13 @@
+import handler
+from loader import app
+from utils.swagger_spec import init_docs
+from utils.metrics import init_metrics
+from utils.admission import init_admission
+
+# Точка входа для gunicorn: gunicorn -c gunicorn.conf.py wsgi:app
+# Модуль импортируется в каждом воркере после fork, клиенты монги создаются там же при первом запросе
+init_metrics(app)
+# Ограничения нагрузки и сроки запросов считаются в каждом воркере отдельно
+init_admission(app)
+# Спецификация собирается один раз в Dockerfile (python -m utils.swagger_spec), воркеры только отдают файл
+init_docs(app)